@@ -14,7 +14,7 @@ globalClock = core.MonotonicClock(0)
 logging.setDefaultClock(globalClock)
 
 from . import config  # import first separately
-from . import fmri, eyetracking, utils, meg, eeg, config
+from . import fmri, eyetracking, utils, meg, eeg, config, texture_cache, text_cache, mirror
 from ..tasks import task_base, video
 
 
@@ -30,7 +30,8 @@ def listen_shortcuts():
 
 def run_task_loop(task, loop, exp_win, eyetracker=None, gaze_drawer=None, record_movie=False):
     for frameN, _ in enumerate(loop):
-        if gaze_drawer:
+        # ctl_win is not flipped on retained frames
+        if gaze_drawer and not task.retaining_frame:
             gaze = eyetracker.get_gaze()
             if not gaze is None:
                 gaze_drawer.draw_gazepoint(gaze)
@@ -51,9 +52,13 @@ def run_task_loop(task, loop, exp_win, eyetracker=None, gaze_drawer=None, record
 
 
 def run_task(
-    task, exp_win, ctl_win=None, eyetracker=None, gaze_drawer=None, record_movie=False
+    task, exp_win, ctl_win=None, eyetracker=None, gaze_drawer=None, record_movie=False,
+    ctl_status=None,
 ):
     print("Next task: %s" % str(task))
+    if ctl_status:
+        ctl_status.set_task(task)
+        ctl_status.phase = "instructions"
 
     # show instruction
     shortcut_evt = run_task_loop(
@@ -66,13 +71,21 @@ def run_task(
     )
 
     if task.use_fmri and not shortcut_evt:
+        if ctl_status:
+            ctl_status.triggers = "waiting for fMRI TTL"
         for _ in fmri.wait_for_ttl():
             shortcut_evt = listen_shortcuts()
             if shortcut_evt:
                 return shortcut_evt
+        # the display paused until the scanner started
+        mirror.expect_gap()
+        if ctl_status:
+            ctl_status.triggers = "fMRI TTL received"
 
     logging.info("GO")
-    if eyetracker and not shortcut_evt and task.use_eyetracking:
+    recording = eyetracker and not shortcut_evt and task.use_eyetracking
+    if recording:
+        # only queued, confirmed by Pupil during the task
         eyetracker.start_recording(task.name)
     # send start trigger/marker to MEG + Biopac (or anything else on parallel port)
     if task.use_meg and not shortcut_evt:
@@ -81,6 +94,8 @@ def run_task(
         exp_win.callOnFlip(eeg.send_signal, eeg.EEG_settings["TASK_START_CODE"])
 
     try:
+        if ctl_status:
+            ctl_status.phase = "run"
         if not shortcut_evt:
             shortcut_evt = run_task_loop(
                 task,
@@ -98,9 +113,11 @@ def run_task(
             exp_win.callOnFlip(eeg.send_signal, eeg.EEG_settings["TASK_STOP_CODE"])
 
 
-        if eyetracker:
+        if recording:
             eyetracker.stop_recording()
 
+        if ctl_status:
+            ctl_status.phase = "stop"
         run_task_loop(
             task,
             task.stop(exp_win, ctl_win),
@@ -109,6 +126,8 @@ def run_task(
             gaze_drawer,
             record_movie=exp_win if record_movie else False,
         )
+        if recording:
+            task.sidecar["eyetracking_recording"] = eyetracker.recording_times()
 
     except Exception as e:
         raise e
@@ -162,14 +181,43 @@ def main_loop(
     logfile_path = os.path.join(log_path, log_name_prefix + ".log")
     log_file = logging.LogFile(logfile_path, level=logging.INFO, filemode="w")
 
-    exp_win = visual.Window(**config.EXP_WINDOW, monitor=config.EXP_MONITOR)
+    eyetracker_client = None
+    if enable_eyetracker:
+        # pupil starts up in the background while windows are created
+        print("creating et client")
+        eyetracker_client = eyetracking.EyeTrackerClient(
+            output_path=log_path,
+            output_fname_base=log_name_prefix,
+            profile=False,
+            debug=False,
+            use_targets = calibration_targets,
+            validate_calib = validate_eyetrack,
+        )
+        print("starting et client")
+        eyetracker_client.start()
+        print("done")
+
+    use_mirror = show_ctl_win and config.CTL_MIRROR
+    if use_mirror:
+        mirror.init_threads()
+    exp_win = visual.Window(
+        **config.EXP_WINDOW, monitor=config.EXP_MONITOR, useFBO=use_mirror)
     exp_win.mouseVisible = False
+    text_cache.warmup_glyphs(exp_win)
 
     if show_ctl_win:
         ctl_win = visual.Window(**config.CTL_WINDOW)
         ctl_win.name = "Stimuli"
     else:
         ctl_win = None
+    # windows passed to tasks, which draw only on exp_win when it is mirrored
+    task_ctl_win = ctl_win
+    ctl_status = None
+    if use_mirror:
+        ctl_mirror = mirror.start(exp_win, ctl_win)
+        ctl_status = mirror.StatusOverlay(ctl_win, ctl_mirror)
+        ctl_mirror.overlays.append(ctl_status)
+        task_ctl_win = None
 
     ptt = None
     if enable_ptt:
@@ -177,22 +225,8 @@ def main_loop(
 
         ptt = PushToTalk()
 
-    eyetracker_client = None
     gaze_drawer = None
     if enable_eyetracker:
-        print("creating et client")
-        eyetracker_client = eyetracking.EyeTrackerClient(
-            output_path=log_path,
-            output_fname_base=log_name_prefix,
-            profile=False,
-            debug=False,
-            use_targets = calibration_targets,
-            validate_calib = validate_eyetrack,
-        )
-        print("starting et client")
-        eyetracker_client.start()
-        print("done")
-
         all_tasks = itertools.chain(
             [eyetracking.EyetrackerSetup(eyetracker=eyetracker_client, name='eyetracker_setup'),],
             all_tasks
@@ -201,6 +235,14 @@ def main_loop(
 
         if show_ctl_win:
             gaze_drawer = eyetracking.GazeDrawer(ctl_win)
+            if use_mirror:
+                # gaze is drawn over the mirrored frames
+                mirror.get_mirror().overlays.insert(
+                    0, mirror.GazeOverlay(eyetracker_client, gaze_drawer))
+                gaze_drawer = None
+    if use_mirror:
+        # ctl_win belongs to the mirror thread from now on
+        ctl_mirror.start()
     if use_fmri:
 
         all_tasks = itertools.chain(
@@ -266,6 +308,8 @@ Thanks for your participation!"""
                 use_meg=use_meg,
                 use_eeg=use_eeg,
             )
+            if isinstance(task.instruction, str) and task.instruction:
+                text_cache.warmup(exp_win, [task.instruction], **text_cache.INSTRUCTION_STYLE)
             print("READY")
 
             while True:
@@ -278,10 +322,11 @@ Thanks for your participation!"""
                     shortcut_evt = run_task(
                         task,
                         exp_win,
-                        ctl_win,
+                        task_ctl_win,
                         eyetracker_client,
                         gaze_drawer,
                         record_movie=record_movie,
+                        ctl_status=ctl_status,
                     )
                 except Exception:
                     task
@@ -309,6 +354,8 @@ Thanks for your participation!"""
                 print(f"saving movie as {out_fname}")
                 exp_win.saveMovieFrames(out_fname, fps=10)
             task.unload()
+            texture_cache.log_stats()
+            text_cache.log_stats()
 
             if shortcut_evt == "q":
                 print("quit")
@@ -337,5 +384,6 @@ Thanks for your participation!"""
             eeg.send_signal(0)
 
     finally:
+        mirror.stop()
         if enable_eyetracker:
             eyetracker_client.join(TIMEOUT)
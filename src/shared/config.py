@@ -31,6 +31,8 @@ EXP_WINDOW = dict(
     gammaErrorPolicy="warn",
     #waitBlanking=False,
     waitBlanking=True,
+    # mirroring is applied to the whole view, for all stimuli and units
+    viewScale=(-1, 1) if MIRROR_X else None,
 )
 
 EXP_MONITOR.setSizePix(EXP_WINDOW['size'])
@@ -46,11 +48,23 @@ CTL_WINDOW = dict(
 
 FRAME_RATE = 120
 
+# render tasks once in an exp_win FBO and mirror it to ctl_win, opt-in until
+# validated on the scanner setup: tasks then get no ctl_win to draw on
+CTL_MIRROR = False
+# refresh rate (Hz) of the mirrored control window
+CTL_WINDOW_RATE = 30
+
 # task parameters
 INSTRUCTION_DURATION = 3
 
 WRAP_WIDTH = 2
 
+# GPU memory budget of the image textures shared across tasks
+TEXTURE_CACHE_BUDGET_MB = 512
+
+# packed stimulus store (see shared/stimstore.py), used if it exists
+STIMULI_STORE = "data/stimuli.tsst"
+
 # port for meg setup
 PARALLEL_PORT_ADDRESS = "/dev/parport1"
 
@@ -1,21 +1,25 @@
 import os, sys, datetime, time
-import threading
+import threading, queue
+from collections import deque
+# concurrent.futures.TimeoutError is the builtin TimeoutError only from python 3.11
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 from .zmq_tools import *
 import msgpack
 
 import numpy as np
-from scipy.spatial.distance import pdist
 from psychopy import visual, core, data, logging, event
 from .ellipse import Ellipse
 
 from ..tasks.task_base import Task
-from . import config
+from . import config, text_cache
 
 INSTRUCTION_DURATION = 2
 STARTCUE_DURATION = 2
 FEEDBACK_DURATION = 3
 CALIBRATE_HOTKEY = "c"
+# maximum time (s) waiting for the calibration result from Pupil
+CALIBRATION_TIMEOUT = 10
 
 MARKER_FILL_COLOR = (0.8, 0, 0.5)
 
@@ -53,6 +57,23 @@ MARKER_POSITIONS_9 = np.asarray(
 
 # Pupil settings
 PUPIL_REMOTE_PORT = 50123
+# startup timeouts (s): launching the pupil process, then each other step
+PUPIL_LAUNCH_TIMEOUT = 30
+STARTUP_STEP_TIMEOUT = 5
+# data topics are only subscribed while the client is resumed
+DATA_TOPICS = ("gaze", "pupil", "fixations")
+NOTIFICATION_TOPICS = (
+    "notify.calibration.successful",
+    "notify.calibration.failed",
+    "notify.aravis",
+    "notify.eye_process.started",
+    "notify.recording.started",
+    "notify.recording.stopped",
+)
+# listener poll timeout (ms), bounds the latency of pause/resume and stop
+LISTENER_POLL_TIMEOUT = 10
+# maximum number of messages handled between polls of the other sockets
+LISTENER_BATCH_SIZE = 64
 CAPTURE_SETTINGS = {
     "frame_size": [640, 480],
     "frame_rate": 250,
@@ -63,8 +84,192 @@ CAPTURE_SETTINGS = {
     #"uid": "MRC Systems GmbH-GVRD-MRC HighSpeed-MR_CAM_HS_0019",
 }
 
+# samples kept in the gaze/pupil ring buffers (~4 min at 500Hz)
+SAMPLE_BUFFER_SIZE = 2 ** 17
+SAMPLE_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("norm_pos", "f8", 2),
+    ("confidence", "f8"),
+    ("diameter", "f8"),  # NaN for gaze
+])
+
+
+class SampleBuffer(object):
+    """Preallocated ring buffer of SAMPLE_DTYPE records.
+
+    Written by a single thread (the eyetracker listener): a record is filled
+    before the sample count is incremented, so readers of other threads only
+    see complete records, as long as they are not overwritten `size` samples
+    later.
+    """
+
+    def __init__(self, size=SAMPLE_BUFFER_SIZE):
+        self.size = size
+        self._data = np.zeros(size, dtype=SAMPLE_DTYPE)
+        self.count = 0
+
+    def append(self, timestamp, norm_pos, confidence, diameter=np.nan):
+        record = self._data[self.count % self.size]
+        record["timestamp"] = timestamp
+        record["norm_pos"] = norm_pos
+        record["confidence"] = confidence
+        record["diameter"] = diameter
+        self.count += 1
+
+    def latest(self):
+        """Return a view on the last record, or None if empty."""
+        count = self.count
+        if not count:
+            return None
+        return self._data[(count - 1) % self.size]
+
+    def _segments(self):
+        # buffered records as chronological contiguous views
+        count = self.count
+        if count <= self.size:
+            return [self._data[:count]]
+        split = count % self.size
+        return [self._data[split:], self._data[:split]]
+
+    def ordered(self):
+        """Return a copy of the buffered records, oldest first."""
+        return np.concatenate(self._segments())
+
+    def window(self, start=-np.inf, stop=np.inf):
+        """Return a copy of the records with start < timestamp <= stop."""
+        return np.concatenate([
+            segment[slice(*np.searchsorted(segment["timestamp"], [start, stop], side="right"))]
+            for segment in self._segments()])
+
+    def received_since(self, start):
+        latest = self.latest()
+        return latest is not None and latest["timestamp"] > start
+
+
+class LatestSample(object):
+    """Keep the last serialized payload of a topic, only decoded (once) when
+    read.
+
+    `raw` is replaced by the listener thread, `get` is called by a single
+    consumer thread.
+    """
+
+    def __init__(self):
+        self.raw = None
+        self._decoded_raw = None
+        self._record = None
+
+    def get(self):
+        """Return the last sample as a SAMPLE_DTYPE record, or None."""
+        raw = self.raw
+        if raw is None:
+            return None
+        if raw is not self._decoded_raw:
+            payload = msgpack.loads(raw)
+            record = np.zeros(1, dtype=SAMPLE_DTYPE)[0]
+            record["timestamp"] = payload["timestamp"]
+            record["norm_pos"] = payload["norm_pos"]
+            record["confidence"] = payload["confidence"]
+            record["diameter"] = payload.get("diameter", np.nan)
+            self._record, self._decoded_raw = record, raw
+        return self._record
+
+
+def as_samples(samples):
+    """Return samples as a SAMPLE_DTYPE array, converting Pupil datum dicts."""
+    if isinstance(samples, np.ndarray) and samples.dtype == SAMPLE_DTYPE:
+        return samples
+    records = np.zeros(len(samples), dtype=SAMPLE_DTYPE)
+    records["diameter"] = np.nan
+    for field in ("timestamp", "norm_pos", "confidence") if len(samples) else ():
+        records[field] = [sample[field] for sample in samples]
+    return records
+
+
+# estimated eye-to-screen distance in pixels, based on screen dim in pixels
+# and screen deg of visual angle (17.5, 14)
+QC_SCREEN_SIZE = (1280, 1024)
+QC_EYE_TO_SCREEN_PIX = 4164
+# Good < 0.5 deg ; Fair = [0.5, 1.5[ deg ; Poor >= 1.5 deg
+
+
+def gaze_marker_angles(gaze_norm_pos, marker_norm_pos):
+    """Angles (deg of visual angle) between gaze and marker normalized
+    positions (N x 2 arrays, or broadcastable)."""
+    gaze_vec = (np.asarray(gaze_norm_pos, dtype=float) - 0.5) * QC_SCREEN_SIZE
+    marker_vec = (np.asarray(marker_norm_pos, dtype=float) - 0.5) * QC_SCREEN_SIZE
+    # vectors from the eye to the screen positions, eye on the screen normal
+    dist2 = QC_EYE_TO_SCREEN_PIX ** 2
+    dot = np.sum(gaze_vec * marker_vec, axis=-1) + dist2
+    norms = np.sqrt((np.sum(gaze_vec ** 2, axis=-1) + dist2) * (np.sum(marker_vec ** 2, axis=-1) + dist2))
+    return np.rad2deg(np.arccos(np.clip(dot / norms, -1, 1)))
+
+
+def await_calibration(task, exp_win, timeout=CALIBRATION_TIMEOUT):
+    """Display the calibration progress until Pupil notifies its result or
+    `timeout` (s) is reached, log the result and latency in the task events
+    and return whether the calibration succeeded."""
+    eyetracker = task.eyetracker
+    text = text_cache.get_text_stim(
+        exp_win,
+        text="Computing calibration...",
+        alignText="center",
+        color="white",
+        wrapWidth=config.WRAP_WIDTH,
+    )
+    progress_bar = visual.Rect(
+        exp_win, width=0, height=.02, pos=(0, -.2), units="norm",
+        lineWidth=0, fillColor=(1, 1, 1), autoLog=False)
+
+    notification = None
+    elapsed = 0
+    while notification is None and elapsed < timeout:
+        progress = elapsed / timeout
+        progress_bar.width = progress
+        progress_bar.pos = (progress / 2 - .5, -.2)
+        text.draw(exp_win)
+        progress_bar.draw(exp_win)
+        yield True
+        notification = eyetracker.calibration_result()
+        elapsed = time.monotonic() - eyetracker.calibration_sent_time
+
+    if notification is None:
+        result = "timeout"
+    elif notification["topic"].startswith("notify.calibration.successful"):
+        result = "successful"
+    else:
+        result = "failed"
+    task._log_event({"trial_type": "calibration", "result": result, "latency": elapsed})
+    logging.info(f"calibration {result} after {elapsed:.3f}s")
+    if result == "successful":
+        print('##### CALIBRATION SUCCESSFUL')
+    else:
+        print(f'#### CALIBRATION {result.upper()}: restart with <c> ####')
+    return result == "successful"
+
+
+class EyetrackerBufferingTask(Task):
+    """Base of the calibration tasks, which buffer the eyetracker samples
+    from `_start_buffering` until the task stops."""
+
+    def _start_buffering(self):
+        self.eyetracker.resume()
+        self.eyetracker.start_buffering()
+        self._buffering = True
+
+    def stop(self, exp_win, ctl_win):
+        self._stop_buffering()
+        yield
+
+    def _stop_buffering(self):
+        # also run when aborted or restarted, the buffering count is shared
+        if getattr(self, "_buffering", False):
+            self.eyetracker.stop_buffering()
+            self.eyetracker.pause()
+            self._buffering = False
+
 
-class EyetrackerCalibration_targets(Task):
+class EyetrackerCalibration_targets(EyetrackerBufferingTask):
     def __init__(
         self,
         eyetracker,
@@ -96,7 +301,7 @@ class EyetrackerCalibration_targets(Task):
             instruction_text = """Eyetracker Calibration
 
     Roll your eyes, then fixate on the CENTER of the markers"""
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=instruction_text,
             alignText="center",
@@ -121,23 +326,9 @@ class EyetrackerCalibration_targets(Task):
         self.fixation_dot = fixation_dot(exp_win, radius=self.marker_size)
         self.startcue = visual.Circle(exp_win, units='pix', pos=(0,0), radius=self.marker_size*0.5, lineWidth=2, fillColor=(1, 1, 1))
 
-    def _pupil_cb(self, pupil):
-        if pupil["timestamp"] > self.task_stop:
-            self.eyetracker.unset_pupil_cb()
-            return
-        if pupil["timestamp"] > self.task_start:
-            self._pupils_list.append(pupil)
-
-    def _gaze_cb(self, gaze):
-        if gaze["timestamp"] > self.task_stop:
-            self.eyetracker.unset_gaze_cb()
-            return
-        if gaze["timestamp"] > self.task_start:
-            self._gaze_list.append(gaze)
-
     def _run(self, exp_win, ctl_win):
 
-        self.eyetracker.resume()
+        self._start_buffering()
         roll_eyes_text = "Roll your eyes"
 
         text_roll = visual.TextStim(
@@ -172,15 +363,10 @@ class EyetrackerCalibration_targets(Task):
                 markers_order = np.random.permutation(markers_order)
 
             self.all_refs_per_flip = []
-            self._pupils_list = []
-            self._gaze_list = []
 
             self.task_start = time.monotonic()
-            self.task_stop = np.inf
-            self.eyetracker.set_pupil_cb(self._pupil_cb)
-            self.eyetracker.set_gaze_cb(self._gaze_cb)
-
-            while not len(self._pupils_list):  # wait until we get at least a pupil
+            # wait until we get at least a pupil
+            while not self.eyetracker.pupils.received_since(self.task_start):
                 yield False
 
             if self.validation:
@@ -239,16 +425,18 @@ class EyetrackerCalibration_targets(Task):
             yield True
             print("completed markers")
             self.task_stop = time.monotonic()
+            self._pupils = self.eyetracker.pupils.window(self.task_start, self.task_stop)
+            self._gaze = self.eyetracker.gazes.window(self.task_start, self.task_stop)
             print("completed markers 2")
 
 
             if self.validation:
                 logging.info(
-                    f"validating on {len(self._pupils_list)} pupils and {len(self.all_refs_per_flip)} markers"
+                    f"validating on {len(self._pupils)} pupils and {len(self.all_refs_per_flip)} markers"
                 )
 
-                print('Ǹumber of received gaze: ', str(len(self._gaze_list)))
-                val_qc = self.eyetracker.validate(self._gaze_list,
+                print('Ǹumber of received gaze: ', str(len(self._gaze)))
+                val_qc = self.eyetracker.validate(self._gaze,
                                                   self.all_refs_per_flip,
                                                   self.marker_duration_frames - (self.calibration_lead_in + self.calibration_lead_out),
                                                   )
@@ -288,7 +476,7 @@ class EyetrackerCalibration_targets(Task):
 
             else:
                 logging.info(
-                    f"calibrating on {len(self._pupils_list)} pupils and {len(self.all_refs_per_flip)} markers"
+                    f"calibrating on {len(self._pupils)} pupils and {len(self.all_refs_per_flip)} markers"
                 )
                 logging.flush()
 
@@ -301,37 +489,21 @@ class EyetrackerCalibration_targets(Task):
                     black_bgd.draw(exp_win)
                     yield True
 
-                self.eyetracker.calibrate(self._pupils_list, self.all_refs_per_flip)
-
-                while True:
-                    notes = getattr(self.eyetracker, '_last_calibration_notification',None)
-                    if notes:
-                        calibration_success = notes['topic'].startswith("notify.calibration.successful")
-                        if not calibration_success:
-                            print('#### CALIBRATION FAILED: restart with <c> ####')
-                        else:
-                            print('##### CALIBRATION SUCCESSFUL')
-                        break
-        self.eyetracker.pause()
-
-
-    def stop(self, exp_win, ctl_win):
-        self.eyetracker.unset_pupil_cb()
-        self.eyetracker.unset_gaze_cb()
-        yield
+                self.eyetracker.calibrate(self._pupils, self.all_refs_per_flip)
+                calibration_success = yield from await_calibration(self, exp_win)
 
     def _save(self):
-        if hasattr(self, "_pupils_list"):
+        if hasattr(self, "_pupils"):
             if self.validation:
                 fname = self._generate_unique_filename("valid-data", "npz")
             else:
                 fname = self._generate_unique_filename("calib-data", "npz")
-            np.savez(fname, pupils=self._pupils_list,
-                            gaze=self._gaze_list,
+            np.savez(fname, pupils=self._pupils,
+                            gaze=self._gaze,
                             markers=self.all_refs_per_flip)
 
 
-class EyetrackerCalibration(Task):
+class EyetrackerCalibration(EyetrackerBufferingTask):
     def __init__(
         self,
         eyetracker,
@@ -357,7 +529,7 @@ class EyetrackerCalibration(Task):
         instruction_text = """We're going to calibrate the eyetracker.
 Please look at the markers that appear on the screen.
 While awaiting for the calibration to start you will be asked to roll your eyes."""
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=instruction_text,
             alignText="center",
@@ -376,13 +548,6 @@ While awaiting for the calibration to start you will be asked to roll your eyes.
         self.eyetracker.start_capture()
         super()._setup(exp_win)
 
-    def _pupil_cb(self, pupil):
-        if pupil["timestamp"] > self.task_stop:
-            self.eyetracker.unset_pupil_cb()
-            return
-        if pupil["timestamp"] > self.task_start:
-            self._pupils_list.append(pupil)
-
     def _run(self, exp_win, ctl_win):
 
         roll_eyes_text = "Please roll your eyes ~2-3 times in clockwise and counterclockwise directions"
@@ -395,7 +560,7 @@ While awaiting for the calibration to start you will be asked to roll your eyes.
             wrapWidth=config.WRAP_WIDTH,
             )
 
-        self.eyetracker.resume()
+        self._start_buffering()
 
         calibration_success = False
         while not calibration_success:
@@ -427,7 +592,6 @@ While awaiting for the calibration to start you will be asked to roll your eyes.
                 markers_order = np.random.permutation(markers_order)
 
             self.all_refs_per_flip = []
-            self._pupils_list = []
 
             radius_anim = np.hstack(
                 [
@@ -437,14 +601,13 @@ While awaiting for the calibration to start you will be asked to roll your eyes.
             )
 
             self.task_start = time.monotonic()
-            self.task_stop = np.inf
-            self.eyetracker.set_pupil_cb(self._pupil_cb)
 
             instructions.text = "Waiting for pupil"
             for _ in range(2):
                 instructions.draw(exp_win)
                 yield True
-            while not len(self._pupils_list):  # wait until we get at least a pupil
+            # wait until we get at least a pupil
+            while not self.eyetracker.pupils.received_since(self.task_start):
                 yield False
 
             exp_win.logOnFlip(
@@ -482,29 +645,17 @@ While awaiting for the calibration to start you will be asked to roll your eyes.
                     yield True
             yield True
             self.task_stop = time.monotonic()
+            self._pupils = self.eyetracker.pupils.window(self.task_start, self.task_stop)
             logging.info(
-                f"calibrating on {len(self._pupils_list)} pupils and {len(self.all_refs_per_flip)} markers"
+                f"calibrating on {len(self._pupils)} pupils and {len(self.all_refs_per_flip)} markers"
             )
-            self.eyetracker.calibrate(self._pupils_list, self.all_refs_per_flip)
-            while True:
-                notes = getattr(self.eyetracker, '_last_calibration_notification',None)
-                if notes:
-                    calibration_success = notes['topic'].startswith("notify.calibration.successful")
-                    if not calibration_success:
-                        print('#### CALIBRATION FAILED: restart with <c> ####')
-                    break
-
-
-
-    def stop(self, exp_win, ctl_win):
-        self.eyetracker.unset_pupil_cb()
-        self.eyetracker.pause()
-        yield
+            self.eyetracker.calibrate(self._pupils, self.all_refs_per_flip)
+            calibration_success = yield from await_calibration(self, exp_win)
 
     def _save(self):
-        if hasattr(self, "_pupils_list"):
+        if hasattr(self, "_pupils"):
             fname = self._generate_unique_filename("calib-data", "npz")
-            np.savez(fname, pupils=self._pupils_list, markers=self.all_refs_per_flip)
+            np.savez(fname, pupils=self._pupils, markers=self.all_refs_per_flip)
 
 
 class EyetrackerSetup(Task):
@@ -521,7 +672,6 @@ class EyetrackerSetup(Task):
 
     def _run(self, exp_win, ctl_win):
 
-        self.eyetracker.resume()
         con_text_str = "Trying to establish connection to the eyetracker %s"
 
         con_text = visual.TextStim(
@@ -531,6 +681,24 @@ class EyetrackerSetup(Task):
             color="white",
             wrapWidth=config.WRAP_WIDTH,
             )
+
+        # wait for the remaining startup steps
+        startup_step = None
+        while not self.eyetracker.startup_done.is_set():
+            if startup_step != self.eyetracker.startup_step:
+                startup_step = self.eyetracker.startup_step
+                con_text.text = con_text_str % f'({startup_step})'
+            con_text.draw(exp_win)
+            yield True
+        if self.eyetracker.startup_error:
+            con_text.text = "Eyetracker startup failed while %s" % self.eyetracker.startup_step
+            for _ in range(config.FRAME_RATE * INSTRUCTION_DURATION):
+                con_text.draw(exp_win)
+                yield True
+            return
+
+        self.eyetracker.resume()
+        con_text.text = con_text_str % ' ...'
         con_text.draw(exp_win)
         yield True
 
@@ -552,18 +720,6 @@ class EyetrackerSetup(Task):
 
 from subprocess import Popen
 
-from contextlib import contextmanager
-
-
-@contextmanager
-def nonblocking(lock):
-    locked = lock.acquire(False)
-    try:
-        yield locked
-    finally:
-        if locked:
-            lock.release()
-
 
 class EyeTrackerClient(threading.Thread):
 
@@ -574,15 +730,23 @@ class EyeTrackerClient(threading.Thread):
         super(EyeTrackerClient, self).__init__()
         self.stoprequest = threading.Event()
         self.paused = True
-        self.pause_cond = threading.Condition(threading.Lock())
-        self.pause_cond.acquire()
+        self._resume_time = None
+        self.com_stats = None
+        # pupil intervals above 3 camera frames are counted as gaps
+        self._gap_threshold = 3. / CAPTURE_SETTINGS["frame_rate"]
         self.lock = threading.Lock()
         self._pupil_cb = self._gaze_cb = self._fix_cb = None
 
         self.pupil_monitor = None
 
-        self.pupil = None
-        self.gaze = None
+        # full-rate samples, only decoded and buffered while buffering
+        self.pupils = SampleBuffer()
+        self.gazes = SampleBuffer()
+        self._buffering = 0
+        # latest samples, decoded on demand (eg. for display)
+        self._latest_pupil = LatestSample()
+        self._latest_gaze = LatestSample()
+        self._last_calibration_notification = None
         self.unset_pupil_cb()
         self.unset_gaze_cb()
 
@@ -623,28 +787,99 @@ class EyeTrackerClient(threading.Thread):
         )
 
         self._ctx = zmq.Context()
-        self._req_socket = self._ctx.socket(zmq.REQ)
-        self._req_socket.connect(f"tcp://localhost:{PUPIL_REMOTE_PORT}")
+        self._aravis_notification = None
+        self._eye_process_started = threading.Event()
+        self._recording_times = {}
+
+        # all sockets are owned by the listener thread: other threads queue
+        # commands (requests, notifications) and get replies through futures
+        self._commands = queue.SimpleQueue()
+        self._pending_replies = deque()
+        wake_url = f"inproc://eyetracker-wake-{id(self)}"
+        self._wake_pull = self._ctx.socket(zmq.PULL)
+        self._wake_pull.bind(wake_url)
+        self._wake_push = self._ctx.socket(zmq.PUSH)
+        self._wake_push.connect(wake_url)
+        self._wake_lock = threading.Lock()
+        self._notify_pub = None
+
+        # Pupil is configured in a background thread, concurrently with the
+        # windows and tasks setup, replies are received once the listener
+        # thread is started.
+        self.startup_step = None
+        self.startup_error = None
+        self.startup_done = threading.Event()
+        self._startup_thread = threading.Thread(
+            target=self._startup, name="eyetracker-startup", daemon=True)
+        self._startup_thread.start()
+
+    def _startup(self):
+        steps = [
+            ("launching pupil", self._connect_remote, PUPIL_LAUNCH_TIMEOUT),
+            ("starting eye process", self._start_eye_process, STARTUP_STEP_TIMEOUT),
+            ("starting plugins", self._start_plugins, STARTUP_STEP_TIMEOUT),
+        ]
+        startup_start = time.monotonic()
+        try:
+            for name, step, timeout in steps:
+                self.startup_step = name
+                step_start = time.monotonic()
+                step(timeout)
+                logging.info(
+                    f"eyetracker startup: {name} done in {time.monotonic() - step_start:.3f}s")
+            logging.info(
+                f"eyetracker startup: ready in {time.monotonic() - startup_start:.3f}s")
+        except Exception as e:
+            self.startup_error = e
+            logging.error(f"eyetracker startup failed while {self.startup_step}: {e!r}")
+        finally:
+            self.startup_done.set()
+
+    def _enqueue(self, *command):
+        self._commands.put(command)
+        with self._wake_lock:
+            try:
+                self._wake_push.send(b"", zmq.NOBLOCK)
+            except zmq.Again:
+                pass  # commands are anyway run on the next poll timeout
+
+    def _request(self, *frames):
+        """Send a Pupil Remote request, return a Future of its reply."""
+        future = Future()
+        self._enqueue("request", frames, future)
+        return future
+
+    def _connect_remote(self, timeout):
+        # the first reply waits for the pupil process to be up
+        self._ipc_sub_port = int(self._request(b"SUB_PORT").result(timeout))
+        logging.info(f"ipc_sub_port: {self._ipc_sub_port}")
+        # notifications published on the IPC backbone do not wait for a reply
+        self._ipc_pub_port = int(self._request(b"PUB_PORT").result(STARTUP_STEP_TIMEOUT))
+        self._enqueue("connect")
+        self.resume()
 
+    def _start_eye_process(self, timeout):
         # stop eye1 if started: monocular eyetracking in the MRI
-        notif = self.send_recv_notification(
-            {"subject": "eye_process.should_stop.1", "eye_id": 1, "args": {}}
-        )
-
+        self.send_recv_notification(
+            {"subject": "eye_process.should_stop.1", "eye_id": 1, "args": {}},
+            timeout)
         # start eye0 if not started yet (from pupil saved config)
-        notif = self.send_recv_notification(
-            {"subject": "eye_process.should_start.0", "eye_id": 0, "args": {}}
-        )
-
-        # wait for eye process to start before starting plugins
-        time.sleep(1)
-
+        self.send_recv_notification(
+            {"subject": "eye_process.should_start.0", "eye_id": 0, "args": {}},
+            timeout)
+        # eye0 is ready once it notifies its start or publishes pupils
+        # (if it was already started from pupil saved config)
+        if not self._eye_process_started.wait(timeout):
+            logging.warning("eyetracker startup: eye process start not notified")
+
+    def _start_plugins(self, timeout):
         # quit existing recorder plugin
         self.send_recv_notification(
             {
                 "subject": "stop_plugin",
                 "name": "Recorder",
-            }
+            },
+            timeout,
         )
         # restart recorder plugin with custom output settings
         self.send_recv_notification(
@@ -657,7 +892,8 @@ class EyeTrackerClient(threading.Thread):
                     "raw_jpeg": False,
                     "record_eye": True,
                 },
-            }
+            },
+            timeout,
         )
 
         # restart 2d detector plugin with custom output settings
@@ -671,7 +907,8 @@ class EyeTrackerClient(threading.Thread):
                         "intensity_range": 4,
                     }
                 },
-            }
+            },
+            timeout,
         )
 
         # stop a bunch of eye plugins for performance
@@ -681,17 +918,13 @@ class EyeTrackerClient(threading.Thread):
                     "subject": "stop_eye_plugin",
                     "target": self.EYE,
                     "name": plugin,
-                }
+                },
+                timeout,
             )
-        self.start_source()
-
-        self._req_socket.send_string("SUB_PORT")
-        self._ipc_sub_port = int(self._req_socket.recv())
-        logging.info(f"ipc_sub_port: {self._ipc_sub_port}")
-        self.resume()
+        self.start_source().result(timeout)
 
     def start_source(self):
-        self.send_recv_notification(
+        return self.request_notification(
             {
                 "subject": "start_eye_plugin",
                 "name": "Aravis_Source",
@@ -702,7 +935,7 @@ class EyeTrackerClient(threading.Thread):
 
 
     def start_capture(self):
-        self.send_recv_notification(
+        return self.request_notification(
             {
                 "subject": "capture.should_start",
                 "target": self.EYE
@@ -710,7 +943,7 @@ class EyeTrackerClient(threading.Thread):
         )
 
     def stop_capture(self):
-        self.send_recv_notification(
+        return self.request_notification(
             {
                 "subject": "capture.should_stop",
                 "target": self.EYE
@@ -718,96 +951,263 @@ class EyeTrackerClient(threading.Thread):
         )
 
 
-    def send_recv_notification(self, n):
-        # REQ REP requires lock step communication with multipart msg (topic,msgpack_encoded dict)
-        self._req_socket.send_multipart(
-            (bytes("notify.%s" % n["subject"], "utf-8"), msgpack.dumps(n))
-        )
-        return self._req_socket.recv()
+    def notify(self, n):
+        # publish on the IPC backbone, no reply
+        self._enqueue("publish", {"topic": "notify.%s" % n["subject"], **n})
 
-    def get_pupil_timestamp(self):
-        self._req_socket.send("t")  # see Pupil Remote Plugin for details
-        return float(self._req_socket.recv())
+    def request_notification(self, n):
+        # Pupil Remote multipart msg (topic,msgpack_encoded dict), return a Future of the reply
+        return self._request(bytes("notify.%s" % n["subject"], "utf-8"), msgpack.dumps(n))
+
+    def send_recv_notification(self, n, timeout=None):
+        return self.request_notification(n).result(timeout)
+
+    def get_pupil_timestamp(self, timeout=None):
+        # see Pupil Remote Plugin for details
+        return float(self._request(b"t").result(timeout))
+
+    def get_pupil_clock_offset(self, timeout=None):
+        """Return the offset (s) from the psychopy clock to the Pupil clock."""
+        request_time = core.monotonicClock.getTime()
+        pupil_time = self.get_pupil_timestamp(timeout)
+        reply_time = core.monotonicClock.getTime()
+        return pupil_time - (request_time + reply_time) / 2
 
     def start_recording(self, recording_name):
+        """Request Pupil to start recording without waiting: request and
+        confirmation times are returned by `recording_times`."""
         logging.info("starting eyetracking recording")
-        return self.send_recv_notification(
+        with self.lock:
+            self._recording_times = {
+                "recording_name": recording_name,
+                "start_request_time": core.monotonicClock.getTime(),
+            }
+        return self.request_notification(
             {"subject": "recording.should_start", "session_name": recording_name}
         )
 
     def stop_recording(self):
         logging.info("stopping eyetracking recording")
-        return self.send_recv_notification({"subject": "recording.should_stop"})
+        with self.lock:
+            self._recording_times["stop_request_time"] = core.monotonicClock.getTime()
+        return self.request_notification({"subject": "recording.should_stop"})
+
+    def recording_times(self):
+        """Return the request and confirmation times (psychopy clock) of the
+        last recording, the Pupil recording start time (Pupil clock) and the
+        offsets from the psychopy clock to the Pupil clock measured when the
+        start and stop were confirmed, as far as received."""
+        with self.lock:
+            times = dict(self._recording_times)
+        if "stop_confirmed_time" not in times:
+            logging.warning("eyetracking recording stop not confirmed yet")
+        return times
+
+    def _measure_clock_offset(self, key):
+        # run by the listener thread, which owns the remote socket and
+        # receives the reply: sets the offset (s) from the psychopy clock to
+        # the Pupil clock as `key` of the recording times
+        times = self._recording_times
+        request_time = core.monotonicClock.getTime()
+
+        def set_offset(future):
+            reply_time = core.monotonicClock.getTime()
+            with self.lock:
+                times[key] = float(future.result()) - (request_time + reply_time) / 2
+
+        future = Future()
+        future.add_done_callback(set_offset)
+        self._pending_replies.append(future)
+        self._remote.send_multipart((b"", b"t"))
 
     def join(self, timeout=None):
-        self.stoprequest.set()
-        # stop recording
-        self.send_recv_notification(
-            {
-                "subject": "recording.should_stop",
-            }
-        )
-        # stop world and children process
-        self.send_recv_notification({"subject": "world_process.should_stop"})
-        self.send_recv_notification({"subject": "launcher_process.should_stop"})
+        try:
+            if not self.startup_done.wait(timeout):
+                logging.warning(
+                    f"eyetracker: startup still {self.startup_step} after {timeout}s, stopping anyway")
+            # stop recording, world and children process
+            for subject in [
+                "recording.should_stop",
+                "world_process.should_stop",
+                "launcher_process.should_stop",
+            ]:
+                try:
+                    self.send_recv_notification({"subject": subject}, STARTUP_STEP_TIMEOUT)
+                except FutureTimeoutError:
+                    logging.warning(f"eyetracker: no reply to {subject}")
+        finally:
+            # the listener thread is not a daemon, it would block exiting
+            self.stoprequest.set()
         self._pupil_process.wait(timeout)
         self._pupil_process.terminate()
         time.sleep(1 / 60.0)
         super(EyeTrackerClient, self).join(timeout)
 
     def pause(self):
+        """Stop receiving gaze/pupil data, notifications are still received."""
         self.paused = True
         print('pause eyetracking coms')
-        self.pause_cond.acquire()
-        del self.pupil_monitor
 
     def resume(self):
         if self.paused:
             print('resume eyetracking coms')
-            self.pupil_monitor = Msg_Receiver(
-
-                self._ctx, f"tcp://localhost:{self._ipc_sub_port}",
-                topics=(
-                    "gaze", "pupil", "fixations",
-                    "notify.calibration.successful",
-                    "notify.calibration.failed",
-                    "notify.aravis")
-
-            )
+            self._resume_time = time.monotonic()
             self.paused = False
-            self.pause_cond.notify()
-            self.pause_cond.release()
+            self._enqueue("sync")
+
+    def _toggle_data_topics(self, subscribe):
+        # only called from the listener thread, which owns the socket
+        for topic in DATA_TOPICS:
+            if subscribe:
+                self.pupil_monitor.subscribe(topic)
+            else:
+                self.pupil_monitor.unsubscribe(topic)
+        if subscribe:
+            self.com_stats = {
+                "resume_latency": None, "n_pupils": 0, "max_gap": 0., "n_gaps": 0,
+                "cpu": None}
+            self._last_pupil_timestamp = None
+            self._subscribe_times = (time.monotonic(), time.thread_time())
+        elif self.com_stats is not None:
+            wall_start, cpu_start = self._subscribe_times
+            self.com_stats["cpu"] = \
+                (time.thread_time() - cpu_start) / max(time.monotonic() - wall_start, 1e-6)
+            logging.info(
+                "eyetracker coms: resumed in %s, %d pupils, max gap %.1fms, %d gaps > %.1fms, "
+                "listener cpu %.1f%%" % (
+                    "%.1fms" % (self.com_stats["resume_latency"] * 1e3)
+                    if self.com_stats["resume_latency"] is not None else "-",
+                    self.com_stats["n_pupils"], self.com_stats["max_gap"] * 1e3,
+                    self.com_stats["n_gaps"], self._gap_threshold * 1e3,
+                    self.com_stats["cpu"] * 100))
+
+    def _update_com_stats(self, timestamp=None):
+        # pupil timestamps (for gaps) are only known when decoded
+        stats = self.com_stats
+        if stats["resume_latency"] is None:
+            stats["resume_latency"] = time.monotonic() - self._resume_time
+        stats["n_pupils"] += 1
+        if timestamp is None:
+            return
+        if self._last_pupil_timestamp is not None:
+            gap = timestamp - self._last_pupil_timestamp
+            stats["max_gap"] = max(stats["max_gap"], gap)
+            stats["n_gaps"] += gap > self._gap_threshold
+        self._last_pupil_timestamp = timestamp
 
     def run(self):
+        # event loop multiplexing Pupil Remote requests, IPC subscription and
+        # commands from other threads
+        self._remote = self._ctx.socket(zmq.DEALER)
+        self._remote.connect(f"tcp://localhost:{PUPIL_REMOTE_PORT}")
+        poller = zmq.Poller()
+        poller.register(self._wake_pull, zmq.POLLIN)
+        poller.register(self._remote, zmq.POLLIN)
+        subscribed = False
+
+        while not self.stoprequest.is_set():
+            if self.pupil_monitor is not None and subscribed == self.paused:
+                subscribed = not self.paused
+                self._toggle_data_topics(subscribed)
+            events = dict(poller.poll(LISTENER_POLL_TIMEOUT))
+            if self._wake_pull in events:
+                while self._wake_pull.poll(0):
+                    self._wake_pull.recv()
+            self._run_commands(poller)
+            if self._remote in events:
+                while self._remote.poll(0):
+                    # REP replies come in order of the requests
+                    *_, reply = self._remote.recv_multipart()
+                    self._pending_replies.popleft().set_result(reply)
+            if self.pupil_monitor is not None and self.pupil_monitor.socket in events:
+                for _ in range(LISTENER_BATCH_SIZE):
+                    if not self.pupil_monitor.new_data:
+                        break
+                    topic = self.pupil_monitor.recv_topic()
+                    self._handle_message(topic, *self.pupil_monitor.recv_remaining_frames())
+        if subscribed:
+            self._toggle_data_topics(False)
+        logging.info("eyetracker listener: stopping")
 
-        self._aravis_notification = None
+    def _run_commands(self, poller):
+        while True:
+            try:
+                command, *args = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if command == "request":
+                frames, future = args
+                self._pending_replies.append(future)
+                self._remote.send_multipart((b"",) + frames)
+            elif command == "publish":
+                self._notify_pub.send(args[0])
+            elif command == "calibrate":
+                self._notify_pub.send(self._calibration_notification(*args))
+            elif command == "connect":
+                self._notify_pub = Msg_Streamer(
+                    self._ctx, f"tcp://localhost:{self._ipc_pub_port}")
+                # single subscriber for the whole session, pause/resume only toggle data topics
+                self.pupil_monitor = Msg_Receiver(
+                    self._ctx, f"tcp://localhost:{self._ipc_sub_port}",
+                    topics=NOTIFICATION_TOPICS,
+                    block_until_connected=False,
+                )
+                poller.register(self.pupil_monitor.socket, zmq.POLLIN)
+            # "sync" only wakes the loop to apply pause/resume
 
-        while not self.stoprequest.isSet():
-            if self.paused:
-                time.sleep(1e-3)
-                continue
-            with self.pause_cond:
-                msg = self.pupil_monitor.recv()
-                if not msg is None:
-                    topic, tmp = msg
-                    with self.lock:
-                        if topic.startswith("pupil"):
-                            self.pupil = tmp
-                            if self._pupil_cb:
-                                self._pupil_cb(tmp)
-                        elif topic.startswith("gaze"):
-                            self.gaze = tmp
-                            if self._gaze_cb:
-                                self._gaze_cb(tmp)
-                        elif topic.startswith("fixations"):
-                            self.fixation = tmp
-                            if self._fix_cb:
-                                self._fix_cb(tmp)
-                        elif topic.startswith("notify.calibration"):
-                            self._last_calibration_notification = tmp
-                        elif topic.startswith("notify.aravis.start_capture"):
-                            self._aravis_notification = tmp
-        logging.info("eyetracker listener: stopping")
+    def _handle_message(self, topic, payload, *extra_frames):
+        if self.paused and topic.startswith(DATA_TOPICS):
+            # drain data queued before unsubscribing
+            return
+        # data payloads are only deserialized if buffered or passed to callbacks
+        with self.lock:
+            if topic.startswith("pupil"):
+                self._latest_pupil.raw = payload
+                self._eye_process_started.set()
+                if self._buffering or self._pupil_cb:
+                    tmp = msgpack.loads(payload)
+                    if self._buffering:
+                        self.pupils.append(
+                            tmp["timestamp"], tmp["norm_pos"], tmp["confidence"],
+                            tmp.get("diameter", np.nan))
+                    self._update_com_stats(tmp["timestamp"])
+                    if self._pupil_cb:
+                        self._pupil_cb(tmp)
+                else:
+                    self._update_com_stats()
+            elif topic.startswith("gaze"):
+                self._latest_gaze.raw = payload
+                if self._buffering or self._gaze_cb:
+                    tmp = msgpack.loads(payload)
+                    if self._buffering:
+                        self.gazes.append(
+                            tmp["timestamp"], tmp["norm_pos"], tmp["confidence"])
+                    if self._gaze_cb:
+                        self._gaze_cb(tmp)
+            elif topic.startswith("fixations"):
+                if self._fix_cb:
+                    self.fixation = msgpack.loads(payload)
+                    self._fix_cb(self.fixation)
+            elif topic.startswith("notify.calibration"):
+                self._last_calibration_notification = \
+                    self.pupil_monitor.deserialize_payload(payload, *extra_frames)
+            elif topic.startswith("notify.aravis.start_capture"):
+                self._aravis_notification = \
+                    self.pupil_monitor.deserialize_payload(payload, *extra_frames)
+            elif topic.startswith("notify.recording.started"):
+                notification = self.pupil_monitor.deserialize_payload(payload, *extra_frames)
+                self._recording_times.update({
+                    "start_confirmed_time": core.monotonicClock.getTime(),
+                    "pupil_start_time": notification.get("start_time_synced"),
+                })
+                self._measure_clock_offset("start_pupil_clock_offset")
+            elif topic.startswith("notify.recording.stopped"):
+                self._recording_times["stop_confirmed_time"] = core.monotonicClock.getTime()
+                self._measure_clock_offset("stop_pupil_clock_offset")
+            elif topic.startswith("notify.eye_process.started"):
+                notification = self.pupil_monitor.deserialize_payload(payload, *extra_frames)
+                if notification.get("eye_id") == int(self.EYE[-1]):
+                    self._eye_process_started.set()
 
 
 
@@ -824,127 +1224,129 @@ class EyeTrackerClient(threading.Thread):
     def unset_gaze_cb(self):
         self._gaze_cb = None
 
+    def start_buffering(self):
+        """Decode and buffer all pupil/gaze samples until `stop_buffering`."""
+        self._buffering += 1
+
+    def stop_buffering(self):
+        self._buffering = max(0, self._buffering - 1)
+
     def get_pupil(self):
-        with nonblocking(self.lock) as locked:
-            if locked:
-                return self.pupil
+        """Return the latest pupil as a SAMPLE_DTYPE record or None."""
+        return self._latest_pupil.get()
 
     def get_gaze(self):
-        with nonblocking(self.lock) as locked:
-            if locked:
-                return self.gaze
+        """Return the latest gaze as a SAMPLE_DTYPE record or None."""
+        return self._latest_gaze.get()
 
 
     def get_marker_dictionary(self, ref_list):
-        position_list = []
+        '''
+        Segment refs into markers: runs of consecutive refs at the same position
+        '''
         markers_dict = {}
-        count = 0
-
-        for i in range(len(ref_list)):
-            m = ref_list[i]
-            if not (m['norm_pos']) in position_list:
-                markers_dict[count] = {
-                    'norm_pos': m['norm_pos'],
-                    'screen_pos': m['screen_pos'],
-                    'onset': m['timestamp'],
-                    'offset': -1.0,
-                }
-                count += 1
-                position_list.append(m['norm_pos'])
-            elif m['timestamp'] > markers_dict[count-1]['offset']:
-                markers_dict[count-1]['offset'] = m['timestamp']
+        if not len(ref_list):
+            return markers_dict
+        timestamps = np.array([m['timestamp'] for m in ref_list], dtype=float)
+        norm_pos = np.array([m['norm_pos'] for m in ref_list], dtype=float)
+        # run-length encoding of position changes
+        starts = np.flatnonzero(np.concatenate(
+            [[True], np.any(norm_pos[1:] != norm_pos[:-1], axis=1)]))
+        ends = np.append(starts[1:], len(ref_list)) - 1
+
+        for count, (start, end) in enumerate(zip(starts, ends)):
+            markers_dict[count] = {
+                'norm_pos': ref_list[start]['norm_pos'],
+                'screen_pos': ref_list[start]['screen_pos'],
+                'onset': timestamps[start],
+                'offset': timestamps[end] if end > start else -1.0,
+            }
 
         return markers_dict
 
 
-    def assign_gaze_to_markers(self, gaze_list, markers_dict):
+    def assign_gaze_to_markers(self, gaze_samples, markers_dict):
         '''
-        Assign gaze to markers based on their timestamp
+        Assign gaze to markers based on their timestamp: samples with
+        onset <= timestamp < offset, gaze timestamps being sorted
         '''
-        i = 0
-        #print(markers_dict[0]['onset'], fixation_list[0]['timestamp'])
-        for count in range(len(markers_dict.keys())):
-            marker = markers_dict[count]
-            gaze_data = {'timestamps': [],
-                         'norm_pos': [],
-                         'confidence': [],
-                        }
-
-            while i < len(gaze_list) and gaze_list[i]['timestamp'] < marker['onset']:
-                i += 1
-
-            while i < len(gaze_list) and gaze_list[i]['timestamp'] < marker['offset']:
-                gaze = gaze_list[i]
-                gaze_data['timestamps'].append(gaze['timestamp'])
-                gaze_data['norm_pos'].append(gaze['norm_pos'])
-                gaze_data['confidence'].append(gaze['confidence'])
-                i += 1
-
-            markers_dict[count]['gaze_data'] = gaze_data
+        gaze_samples = as_samples(gaze_samples)
+        n_markers = len(markers_dict.keys())
+        timestamps = gaze_samples['timestamp']
+        firsts = np.searchsorted(
+            timestamps, [markers_dict[count]['onset'] for count in range(n_markers)])
+        lasts = np.maximum(firsts, np.searchsorted(
+            timestamps, [markers_dict[count]['offset'] for count in range(n_markers)]))
+
+        for count, (first, last) in enumerate(zip(firsts, lasts)):
+            markers_dict[count]['gaze_data'] = {
+                'timestamps': timestamps[first:last],
+                'norm_pos': gaze_samples['norm_pos'][first:last],
+                'confidence': gaze_samples['confidence'][first:last],
+            }
 
         return markers_dict
 
 
     def gaze_qc_per_marker(self, markers_dict, frames_per_marker, conf_thresh = 0.80):
         '''
-        estimated eye-to-screen distance in pixels
-        based on screen dim in pixels ((1280, 1024)) and screen deg of visual angle (17.5, 14)
+        Angular distance between gaze and markers, computed for the samples of
+        all markers at once
         '''
-        dist_in_pix = 4164 # in pixels
+        n_markers = len(markers_dict.keys())
+        gaze_data = [markers_dict[count]['gaze_data'] for count in range(n_markers)]
+        num_gz = np.array([len(g['timestamps']) for g in gaze_data], dtype=int)
+        expected_gz_count = 250*(frames_per_marker/60)
+
+        # samples of all markers, in marker order
+        marker_idx = np.repeat(np.arange(n_markers), num_gz)
+        g_conf = np.concatenate(
+            [np.asarray(g['confidence'], dtype=float).reshape(-1) for g in gaze_data] + [[]])
+        g_pos = np.concatenate(
+            [np.asarray(g['norm_pos'], dtype=float).reshape(-1, 2) for g in gaze_data]
+            + [np.empty((0, 2))])
+        g_times = np.concatenate(
+            [np.asarray(g['timestamps'], dtype=float).reshape(-1) for g in gaze_data] + [[]])
+        m_pos = np.array(
+            [markers_dict[count]['norm_pos'] for count in range(n_markers)], dtype=float
+        ).reshape(-1, 2)
+
+        # filtrate gaze based on confidence threshold
+        g_filter = g_conf > conf_thresh
+        filtered_idx = marker_idx[g_filter]
+        distances = gaze_marker_angles(g_pos[g_filter], m_pos[filtered_idx])
+        num_dist = np.bincount(filtered_idx, minlength=n_markers)
+        splits = np.cumsum(num_dist)[:-1]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            good = np.bincount(filtered_idx, distances < 0.5, n_markers) / num_dist
+            fair = np.bincount(
+                filtered_idx, (distances >= 0.5) & (distances < 1.5), n_markers) / num_dist
+            poor = np.bincount(filtered_idx, distances >= 1.5, n_markers) / num_dist
+            conf_ratios = {
+                thresh: np.bincount(marker_idx, g_conf > thresh / 100, n_markers) / num_gz
+                for thresh in (70, 80, 90)}
 
         val_qc = []
-        #print('Distance between gaze and target in degrees of visual angle')
-        #print('Good < 0.5 deg ; Fair = [0.5, 1.5[ deg ; Poor >= 1.5 deg')
-
-        for count in range(len(markers_dict.keys())):
+        for count, (m_distances, m_times) in enumerate(
+                zip(np.split(distances, splits), np.split(g_times[g_filter], splits))):
             m = markers_dict[count]
-            #print(f"Marker {count}, Normalized position: {m['norm_pos']}")
-
-            num_gz = len(m['gaze_data']['timestamps'])
-            expected_gz_count = 250*(frames_per_marker/60)
-
-            if num_gz:
-                # transform marker's normalized position into dim = (3,) vector in pixel space
-                m_vecpos = np.concatenate(((np.array(m['norm_pos']) - 0.5)*(1280, 1024), np.array([dist_in_pix])), axis=0)
-
-                g_conf = np.array(m['gaze_data']['confidence'])
-                # filtrate gaze based on confidence threshold
-                g_filter = g_conf > conf_thresh
-                g_pos = np.array(m['gaze_data']['norm_pos'])[g_filter]
-                g_times = np.array(m['gaze_data']['timestamps'])[g_filter]
-
-                gaze = (g_pos - 0.5)*(1280, 1024)
-                gaze_vecpos = np.concatenate((gaze, np.repeat(dist_in_pix, len(gaze)).reshape((-1, 1))), axis=1)
-
-                distances = []
-                for gz_vec in gaze_vecpos:
-                    vectors = np.stack((m_vecpos, gz_vec), axis=0)
-                    distance = np.rad2deg(np.arccos(1.0 - pdist(vectors, metric='cosine')))
-                    distances.append(distance[0])
-
-                distances = np.array(distances)
-                markers_dict[count]['gaze_data']['distances'] = {'distances': distances,
-                                                                 'timestamps': g_times,
-                                                                 }
-
-                num_dist = len(distances)
-                good = np.sum(distances < 0.5) / num_dist
-                fair = np.sum((distances >= 0.5)*(distances < 1.5)) / num_dist
-                poor = np.sum(distances >= 1.5) / num_dist
-
-                #print('Total gaze:' + str(num_gz) + ' , Good:' + str(good) + ' , Fair:' + str(fair) + ' , Poor:' + str(poor))
+            if num_gz[count]:
+                m['gaze_data']['distances'] = {'distances': m_distances,
+                                               'timestamps': m_times,
+                                               }
                 val_qc.append({
                     'marker': count,
                     'norm_pos': m['norm_pos'],
-                    'num_gz': num_gz,
-                    'gz_count_ratio': num_gz/expected_gz_count,
-                    'above_70conf_ratio': np.sum(g_conf > 0.7)/num_gz,
-                    'above_80conf_ratio': np.sum(g_conf > 0.8)/num_gz,
-                    'above_90conf_ratio': np.sum(g_conf > 0.9)/num_gz,
-                    'median_distance': np.median(distances),
-                    'good': good,
-                    'fair': fair,
-                    'poor': poor,
+                    'num_gz': int(num_gz[count]),
+                    'gz_count_ratio': float(num_gz[count]/expected_gz_count),
+                    'above_70conf_ratio': conf_ratios[70][count],
+                    'above_80conf_ratio': conf_ratios[80][count],
+                    'above_90conf_ratio': conf_ratios[90][count],
+                    'median_distance': np.median(m_distances) if len(m_distances) else np.nan,
+                    'good': good[count],
+                    'fair': fair[count],
+                    'poor': poor[count],
                 })
             else:
                 val_qc.append({
@@ -1005,27 +1407,51 @@ class EyeTrackerClient(threading.Thread):
                     validation=True
                     )
 
-    def calibrate(self, pupil_list, ref_list):
-        if len(pupil_list) < 100:
+    def calibrate(self, pupils, ref_list):
+        """Send calibration data without waiting for the result, which is
+        returned by `calibration_result` once notified by Pupil."""
+        if len(pupils) < 100:
             logging.error("Calibration: not enough pupil captured for calibration")
             # return
 
         # TODO: check num of quality pupils per fixation points, set quality threshold...
 
-        calib_data = {"ref_list": ref_list, "pupil_list": pupil_list}
-
+        self._last_calibration_notification = None
+        self.calibration_sent_time = time.monotonic()
         logging.info("sending calibration data to pupil")
-        logging.flush()
-        calib_res = self.send_recv_notification(
-            {
-                "subject": "start_plugin",
-                "name": "Gazer2D",
-                "args": {"calib_data": calib_data},
-                "raise_calibration_error": True,
-            }
-        )
-        logging.info("calibration data sent to pupil")
-        logging.flush()
+        # the arrays are only converted by the listener thread, see _calibration_notification
+        self._enqueue("calibrate", pupils, ref_list)
+        logging.info("calibration data queued for pupil")
+
+    def _calibration_notification(self, pupils, ref_list):
+        # Pupil's stock Gazer2D only accepts lists of datum dicts (calib_data
+        # is passed as is to its init), typed arrays would need a patched
+        # Pupil plugin: the dicts, limited to the fields Gazer2D uses, are
+        # built here rather than by the task thread.
+        eye_id = int(self.EYE[-1])
+        topic = f"pupil.{eye_id}"
+        pupil_list = [
+            {"topic": topic, "id": eye_id, "timestamp": timestamp,
+             "norm_pos": norm_pos, "confidence": confidence}
+            for timestamp, norm_pos, confidence in zip(
+                pupils["timestamp"].tolist(),
+                pupils["norm_pos"].tolist(),
+                pupils["confidence"].tolist())
+        ]
+        ref_list = [
+            {"timestamp": ref["timestamp"], "norm_pos": ref["norm_pos"]} for ref in ref_list]
+        return {
+            "topic": "notify.start_plugin",
+            "subject": "start_plugin",
+            "name": "Gazer2D",
+            "args": {"calib_data": {"ref_list": ref_list, "pupil_list": pupil_list}},
+            "raise_calibration_error": True,
+        }
+
+    def calibration_result(self):
+        """Return the calibration successful/failed notification received
+        since the last `calibrate` call, or None."""
+        return self._last_calibration_notification
 
     def validate(self, gaze_list, ref_list, frames_per_marker):
 
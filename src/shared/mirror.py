@@ -0,0 +1,333 @@
+# mirror the experiment window to the control window: tasks draw their frame
+# once in the exp_win FBO, which is copied (downscaled) on the GPU to a
+# texture drawn on ctl_win at a lower rate, with operator overlays, by a
+# thread owning ctl_win so that it never delays the exp_win flips.
+# GL textures and sync objects are shared between the windows (pyglet contexts
+# of a process share objects), framebuffer objects are not and stay in the
+# exp_win context.
+
+import sys, time, threading
+import pyglet.gl as GL
+from psychopy import visual, logging
+
+from . import config, utils
+
+# intervals longer than this number of refresh periods are counted as dropped
+DROPPED_FRAME_THRESHOLD = 1.5
+# copies of the frame: latest, being presented, being written
+N_MIRROR_TEXTURES = 3
+STATUS_MARGIN = 10
+STATUS_TEXT_HEIGHT = 24
+STATUS_TEXT_COLOR = (1, 1, 0)
+
+
+def init_threads():
+    """ctl_win is flipped from the mirror thread: Xlib has to be made
+    thread-safe before the first connection to the X server (libX11 >= 1.8
+    does it by default)."""
+    if sys.platform.startswith("linux"):
+        from pyglet.libs.x11 import xlib
+        xlib.XInitThreads()
+
+
+class WindowMirror(object):
+    """Mirror exp_win (created with useFBO=True) on ctl_win at `rate` Hz.
+
+    `capture` must be called before flipping exp_win, while its FBO holds the
+    frame: when due, the frame is copied to one of N_MIRROR_TEXTURES textures,
+    fenced, and handed to the thread started by `start`, which then owns
+    ctl_win: it draws the latest copy and `overlays` (callables drawing
+    operator information on ctl_win) and flips ctl_win at `rate` Hz.
+    Stimuli drawn by overlays have to be created before `start`.
+    `flipped` must be called after each exp_win flip: intervals from the
+    previous flip, or from the end of a wait of the experiment thread (see
+    `ready`), longer than DROPPED_FRAME_THRESHOLD refresh periods are counted
+    in `dropped_frames`. `expect_gap` excludes the next flip, for intended
+    pauses of the display.
+    With config.MIRROR_X, the copy is flipped back so that the operator sees
+    the display as seen by the participant.
+    """
+
+    def __init__(self, exp_win, ctl_win, rate=config.CTL_WINDOW_RATE):
+        if not exp_win.useFBO:
+            raise ValueError("exp_win must be created with useFBO=True to be mirrored")
+        self.exp_win = exp_win
+        self.ctl_win = ctl_win
+        self.period = 1. / rate
+        self.overlays = []
+        self.dropped_frames = 0
+        self._last_capture = -float("inf")
+        self._last_flip = None
+        self._src_size = tuple(getattr(exp_win, "frameBufferSize", exp_win.size))
+        self._dst_size = tuple(int(s) for s in ctl_win.size)
+        # texture handoff between the experiment and mirror threads
+        self._lock = threading.Lock()
+        self._latest = None
+        self._presenting = None
+        self._written_fences = [None] * N_MIRROR_TEXTURES
+        self._presented_fences = [None] * N_MIRROR_TEXTURES
+        self._stop_request = threading.Event()
+        self._thread = None
+
+        exp_win._setCurrent()
+        self._textures = (GL.GLuint * N_MIRROR_TEXTURES)()
+        GL.glGenTextures(N_MIRROR_TEXTURES, self._textures)
+        self._fbos = (GL.GLuint * N_MIRROR_TEXTURES)()
+        GL.glGenFramebuffers(N_MIRROR_TEXTURES, self._fbos)
+        for texture, fbo in zip(self._textures, self._fbos):
+            GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+            GL.glTexImage2D(
+                GL.GL_TEXTURE_2D, 0, GL.GL_RGBA8, self._dst_size[0], self._dst_size[1], 0,
+                GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, fbo)
+            GL.glFramebufferTexture2D(
+                GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_TEXTURE_2D, texture, 0)
+            status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, exp_win.frameBuffer)
+            if status != GL.GL_FRAMEBUFFER_COMPLETE:
+                raise RuntimeError(f"mirror framebuffer incomplete: {status}")
+
+    def start(self):
+        """Start presenting on ctl_win, which is then only used by the mirror thread."""
+        self._thread = threading.Thread(target=self._present_loop, name="ctl_mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_request.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def capture(self):
+        """Copy the exp_win frame to a mirror texture if due."""
+        now = time.perf_counter()
+        if now - self._last_capture < self.period:
+            return
+        self._last_capture = now
+        with self._lock:
+            idx = next(
+                i for i in range(N_MIRROR_TEXTURES) if i not in (self._latest, self._presenting))
+            presented_fence = self._presented_fences[idx]
+            self._presented_fences[idx] = None
+        if presented_fence is not None:
+            # the GPU waits for the mirror thread to be done drawing that copy
+            GL.glWaitSync(presented_fence, 0, GL.GL_TIMEOUT_IGNORED)
+            GL.glDeleteSync(presented_fence)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.exp_win.frameBuffer)
+        GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self._fbos[idx])
+        dst_x0, dst_x1 = (self._dst_size[0], 0) if config.MIRROR_X else (0, self._dst_size[0])
+        GL.glBlitFramebuffer(
+            0, 0, self._src_size[0], self._src_size[1],
+            dst_x0, 0, dst_x1, self._dst_size[1],
+            GL.GL_COLOR_BUFFER_BIT, GL.GL_LINEAR)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.exp_win.frameBuffer)
+        written_fence = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        GL.glFlush()
+        with self._lock:
+            if self._written_fences[idx] is not None:
+                GL.glDeleteSync(self._written_fences[idx])
+            self._written_fences[idx] = written_fence
+            self._latest = idx
+
+    def flipped(self):
+        """Count a dropped frame if exp_win was flipped late."""
+        now = time.perf_counter()
+        if self._last_flip is not None and \
+                now - self._last_flip > DROPPED_FRAME_THRESHOLD / config.FRAME_RATE:
+            self.dropped_frames += 1
+        self._last_flip = now
+
+    def ready(self):
+        # the experiment thread waited on purpose, the next flip is late
+        # from now on, unless a gap is expected
+        if self._last_flip is not None:
+            self._last_flip = time.perf_counter()
+
+    def expect_gap(self):
+        # the next flip is not meant to follow the previous one
+        self._last_flip = None
+
+    def reset_frame_count(self):
+        # flips are not continuous between tasks
+        self.dropped_frames = 0
+        self._last_flip = None
+
+    def _present_loop(self):
+        # only this thread makes the ctl_win context current from now on
+        self.ctl_win.winHandle.switch_to()
+        next_present = time.perf_counter()
+        while not self._stop_request.is_set():
+            try:
+                self._present()
+            except Exception:
+                logging.error("mirror: presenting failed, stopping the control window")
+                raise
+            next_present += self.period
+            self._stop_request.wait(max(0, next_present - time.perf_counter()))
+
+    def _present(self):
+        with self._lock:
+            idx = self._presenting = self._latest
+            if idx is not None:
+                # the GPU waits for the copy to be complete before drawing it
+                GL.glWaitSync(self._written_fences[idx], 0, GL.GL_TIMEOUT_IGNORED)
+        self.ctl_win._setCurrent()
+        if idx is not None:
+            self._draw_texture(self._textures[idx])
+            presented_fence = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            GL.glFlush()
+            with self._lock:
+                if self._presented_fences[idx] is not None:
+                    GL.glDeleteSync(self._presented_fences[idx])
+                self._presented_fences[idx] = presented_fence
+                self._presenting = None
+        for overlay in self.overlays:
+            overlay(self.ctl_win)
+        self.ctl_win.flip()
+
+    def _draw_texture(self, texture):
+        GL.glUseProgram(0)
+        GL.glMatrixMode(GL.GL_PROJECTION)
+        GL.glPushMatrix()
+        GL.glLoadIdentity()
+        GL.glMatrixMode(GL.GL_MODELVIEW)
+        GL.glPushMatrix()
+        GL.glLoadIdentity()
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        GL.glColor4f(1, 1, 1, 1)
+        GL.glBegin(GL.GL_QUADS)
+        for x, y in [(0, 0), (1, 0), (1, 1), (0, 1)]:
+            GL.glTexCoord2f(x, y)
+            GL.glVertex2f(x * 2 - 1, y * 2 - 1)
+        GL.glEnd()
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glPopMatrix()
+        GL.glMatrixMode(GL.GL_PROJECTION)
+        GL.glPopMatrix()
+        GL.glMatrixMode(GL.GL_MODELVIEW)
+
+    def close(self):
+        self.stop()
+        self.exp_win._setCurrent()
+        for fence in self._written_fences + self._presented_fences:
+            if fence is not None:
+                GL.glDeleteSync(fence)
+        GL.glDeleteFramebuffers(N_MIRROR_TEXTURES, self._fbos)
+        GL.glDeleteTextures(N_MIRROR_TEXTURES, self._textures)
+
+
+class GazeOverlay(object):
+    """Draw the last gaze sample of `eyetracker` with a GazeDrawer."""
+
+    def __init__(self, eyetracker, gaze_drawer):
+        self.eyetracker = eyetracker
+        self.gaze_drawer = gaze_drawer
+
+    def __call__(self, win):
+        gaze = self.eyetracker.get_gaze()
+        if not gaze is None:
+            self.gaze_drawer.draw_gazepoint(gaze)
+
+
+class StatusOverlay(object):
+    """Operator status in the top left corner of the control window: task
+    and phase, progress, trigger state and dropped frames.
+
+    The text is only laid out again when it changes.
+    """
+
+    def __init__(self, win, mirror):
+        self.mirror = mirror
+        self.task = None
+        self.phase = ""
+        self.triggers = ""
+        self._text = ""
+        self._stim = visual.TextStim(
+            win,
+            text="",
+            units="pix",
+            pos=(-win.size[0] / 2 + STATUS_MARGIN, win.size[1] / 2 - STATUS_MARGIN),
+            height=STATUS_TEXT_HEIGHT,
+            anchorHoriz="left",
+            anchorVert="top",
+            alignText="left",
+            color=STATUS_TEXT_COLOR,
+            autoLog=False,
+        )
+
+    def set_task(self, task):
+        self.task = task
+        self.phase = ""
+        self.triggers = ""
+        self.mirror.reset_frame_count()
+
+    def _status_text(self):
+        lines = []
+        task = self.task
+        if task is not None:
+            lines.append(f"{task.name} - {self.phase}")
+            timer = getattr(task, "task_timer", None)
+            if self.phase == "run" and timer is not None:
+                elapsed = timer.getTime()
+                duration = getattr(task, "duration", None)
+                lines.append(
+                    f"{elapsed:.0f}/{duration:.0f}s" if duration else f"{elapsed:.0f}s")
+            if task.use_meg or task.use_eeg:
+                lines.append(f"markers flags: {task.flags}")
+        if self.triggers:
+            lines.append(self.triggers)
+        lines.append(f"dropped frames: {self.mirror.dropped_frames}")
+        return "\n".join(lines)
+
+    def __call__(self, win):
+        text = self._status_text()
+        if text != self._text:
+            self._text = text
+            self._stim.text = text
+        self._stim.draw(win)
+
+
+_mirror = None
+
+
+def start(exp_win, ctl_win, **kwargs):
+    """Create the mirror, its thread is started with `get_mirror().start()`
+    once overlays are set up."""
+    global _mirror
+    _mirror = WindowMirror(exp_win, ctl_win, **kwargs)
+    utils.wait_hooks.append(_mirror.ready)
+    return _mirror
+
+
+def get_mirror():
+    return _mirror
+
+
+def capture():
+    if _mirror is not None:
+        _mirror.capture()
+
+
+def flipped():
+    if _mirror is not None:
+        _mirror.flipped()
+
+
+def ready():
+    if _mirror is not None:
+        _mirror.ready()
+
+
+def expect_gap():
+    if _mirror is not None:
+        _mirror.expect_gap()
+
+
+def stop():
+    if _mirror is not None:
+        _mirror.close()
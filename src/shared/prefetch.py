@@ -0,0 +1,184 @@
+# decode image stimuli in background threads ahead of their onset
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from psychopy import logging, visual
+
+from .stimstore import get_store
+
+PREFETCH_WORKERS = 2
+PREFETCH_LOOKAHEAD = 8
+# number of textures kept resident by ImageStimStream
+PRELOAD_WINDOW = 4
+# minimum time (s) given to workers to decode an image before its onset
+PREFETCH_MIN_LEAD = 1.
+
+
+def decode_image(path):
+    store = get_store()
+    if store is not None and path in store:
+        return store.get_image(path)
+    img = Image.open(path)
+    img.load()  # force decoding here rather than on first texture upload
+    return img
+
+
+class ImagePrefetcher(object):
+    """Decode an ordered sequence of image files in a pool of worker threads.
+
+    Only `lookahead` images are kept decoded/pending at any time: each call to
+    `get` releases the requested image and schedules the next one.
+    """
+
+    def __init__(self, paths, lookahead=PREFETCH_LOOKAHEAD, n_workers=PREFETCH_WORKERS):
+        self._paths = list(paths)
+        self._executor = ThreadPoolExecutor(
+            max_workers=n_workers, thread_name_prefix="prefetch"
+        )
+        self._futures = {}
+        self._next_idx = 0
+        self.hits = 0
+        self.misses = 0
+        for _ in range(lookahead):
+            self._submit_next()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def _submit_next(self):
+        if self._next_idx < len(self._paths):
+            self._futures[self._next_idx] = self._executor.submit(
+                decode_image, self._paths[self._next_idx]
+            )
+            self._next_idx += 1
+
+    def get(self, index):
+        """Return (decoded image, hit), hit being False if the image was not
+        ready and had to be waited for."""
+        future = self._futures.pop(index, None)
+        hit = future is not None and future.done()
+        if future is None:
+            # out of order request, decode in the calling thread
+            image = decode_image(self._paths[index])
+        else:
+            image = future.result()
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+            logging.warning(f"image prefetch miss: {self._paths[index]}")
+        self._submit_next()
+        return image, hit
+
+    def shutdown(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=False)
+
+
+class ImageStimStream(object):
+    """Provide an ImageStim for each image of an ordered sequence while only
+    keeping `window` textures resident.
+
+    Images are decoded by an ImagePrefetcher, and a fixed pool of ImageStim
+    (and their textures) is recycled: `release` gives back the stimulus of a
+    presented trial, `fill` uploads the next images in the freed stimuli and
+    should be called outside of time critical periods. An image that is not
+    resident when requested is uploaded synchronously, with a warning.
+    If a `texture_cache` is given, stimuli are taken from it instead of the
+    pool so that textures can be reused by later runs, and stay pinned in it
+    while resident.
+    """
+
+    def __init__(self, win, paths, onsets=None, window=PRELOAD_WINDOW,
+                 texture_cache=None, **stim_kwargs):
+        self.win = win
+        self._paths = list(paths)
+        self._window = window
+        self._texture_cache = texture_cache
+        self._stim_kwargs = stim_kwargs
+        lookahead = max(PREFETCH_LOOKAHEAD, window * 2)
+        if onsets is not None:
+            validate_lookahead(onsets, lookahead)
+        self._prefetcher = ImagePrefetcher(self._paths, lookahead=lookahead)
+        if texture_cache is None:
+            self._free = [
+                visual.ImageStim(win, image=None, **stim_kwargs) for _ in range(window)
+            ]
+        else:
+            # textures are owned by the shared cache
+            self._free = []
+        self._resident = {}
+        self._next_upload = 0
+        self.fill()
+
+    def __len__(self):
+        return len(self._paths)
+
+    @property
+    def hits(self):
+        return self._prefetcher.hits
+
+    @property
+    def misses(self):
+        return self._prefetcher.misses
+
+    def _upload(self, index, image):
+        if self._texture_cache is None:
+            # the pool only grows if an image is requested out of order
+            stim = self._free.pop() if self._free else visual.ImageStim(
+                self.win, image=None, **self._stim_kwargs)
+            stim.image = image
+        else:
+            # pinned until released, so the cache cannot evict upcoming images
+            stim = self._texture_cache.get_image_stim(
+                self.win, self._paths[index], image=image, pin=True, **self._stim_kwargs
+            )
+        self._resident[index] = stim
+
+    def fill(self):
+        while len(self._resident) < self._window and self._next_upload < len(self._paths):
+            if self._next_upload not in self._resident:
+                image, _ = self._prefetcher.get(self._next_upload)
+                self._upload(self._next_upload, image)
+            self._next_upload += 1
+
+    def get(self, index):
+        if index not in self._resident:
+            # upload in the calling thread rather than failing the trial
+            logging.warning(f"image stream: texture {index} not resident, uploading it")
+            image, _ = self._prefetcher.get(index)
+            self._upload(index, image)
+        return self._resident[index]
+
+    def release(self, index):
+        stim = self._resident.pop(index, None)
+        if stim is None:
+            return
+        if self._texture_cache is None:
+            self._free.append(stim)
+        else:
+            self._texture_cache.unpin(self._paths[index], **self._stim_kwargs)
+
+    def close(self):
+        self._prefetcher.shutdown()
+        for index in list(self._resident):
+            self.release(index)
+        self._resident.clear()
+        self._free.clear()
+
+
+def validate_lookahead(onsets, lookahead, min_lead=PREFETCH_MIN_LEAD):
+    """Check that images scheduled `lookahead` trials ahead are given at
+    least `min_lead` seconds to be decoded before their onset."""
+    onsets = np.asarray(onsets, dtype=float)
+    if len(onsets) <= lookahead:
+        return
+    leads = onsets[lookahead:] - onsets[:-lookahead]
+    if leads.min() < min_lead:
+        raise ValueError(
+            f"prefetch lookahead of {lookahead} images leaves only "
+            f"{leads.min():.3f}s to decode trial {leads.argmin() + lookahead}"
+        )
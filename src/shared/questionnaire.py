@@ -0,0 +1,270 @@
+# Likert scale questionnaires answered with directional buttons
+
+import abc
+import time
+import numpy as np
+from psychopy import visual, logging
+
+from . import text_cache
+
+LINE_COLOR = (-1, -1, -1)
+ACTIVE_LINE_COLOR = (0, -1, -1)
+BULLET_COLOR = (-1, -1, -1)
+SELECTED_BULLET_COLOR = (1, 1, 1)
+# bullets are a filled disk in a black ring
+BULLET_SIZE = 10
+BULLET_RING_SIZE = 30
+Y_SPACING = 80
+# sleep between key polls while the display does not change
+IDLE_SLEEP = .01
+
+
+class Questionnaire(abc.ABC):
+    """Likert scales for a list of (key, question, n_pts).
+
+    The active question is selected with `u`/`d`, its value changed with
+    `l`/`r`, and answers are validated with `a`.
+    All stimuli are created once, bullets are batched in a single
+    ElementArrayStim and the screen is only redrawn when the state changes.
+    Value changes and answers are passed to `log_event` as events including
+    `event_fields`.
+    """
+
+    highlight_active = True
+
+    def __init__(self, win, questions, log_event, event_fields=None):
+        self.win = win
+        self.questions = questions
+        self._log_event = log_event
+        self._event_fields = event_fields or {}
+        self.responses = [n_pts // 2 for _, _, n_pts in questions]
+        self.active = 0
+
+        self._lines = []
+        self._texts = []  # (regular, bold) TextStim for each question
+        self._static = []
+        bullets_xys = []
+        self._layout(bullets_xys)
+
+        self._bullets_offsets = np.cumsum([0] + [n_pts for _, _, n_pts in questions])
+        n_bullets = self._bullets_offsets[-1]
+        self._bullets_colors = np.tile(BULLET_COLOR, (n_bullets * 2, 1)).astype(float)
+        self._bullets = visual.ElementArrayStim(
+            win,
+            units="pix",
+            nElements=n_bullets * 2,
+            elementTex=None,
+            elementMask="circle",
+            xys=np.tile(np.asarray(bullets_xys, dtype=float).reshape(-1, 2), (2, 1)),
+            sizes=np.repeat([BULLET_RING_SIZE, BULLET_SIZE], n_bullets),
+            colors=self._bullets_colors,
+            colorSpace="rgb",
+            autoLog=False,
+        )
+
+    @abc.abstractmethod
+    def _layout(self, bullets_xys):
+        """Create lines, texts and static stimuli, and append the position
+        of each bullet to `bullets_xys`."""
+
+    def _text(self, text, bold=False, **kwargs):
+        # cached stimuli, regular and bold variants are never restyled
+        return text_cache.get_text_stim(self.win, text, units="pix", bold=bold, **kwargs)
+
+    def _update(self):
+        for q_n, line in enumerate(self._lines):
+            line.lineColor = (
+                ACTIVE_LINE_COLOR if self.highlight_active and q_n == self.active else LINE_COLOR)
+        n_bullets = self._bullets_offsets[-1]
+        self._bullets_colors[n_bullets:] = BULLET_COLOR
+        for offset, response in zip(self._bullets_offsets, self.responses):
+            self._bullets_colors[n_bullets + offset + response] = SELECTED_BULLET_COLOR
+        self._bullets.colors = self._bullets_colors
+
+    def draw(self):
+        for line in self._lines:
+            line.draw(self.win)
+        self._bullets.draw(self.win)
+        for q_n, (regular, bold) in enumerate(self._texts):
+            (bold if self.highlight_active and q_n == self.active else regular).draw(self.win)
+        for stim in self._static:
+            stim.draw(self.win)
+
+    def _handle_keys(self, keys):
+        n_pts = self.questions[self.active][2]
+        if "u" in keys and self.active > 0:
+            self.active -= 1
+        elif "d" in keys and self.active < len(self.questions) - 1:
+            self.active += 1
+        elif "r" in keys and self.responses[self.active] < n_pts - 1:
+            self.responses[self.active] += 1
+        elif "l" in keys and self.responses[self.active] > 0:
+            self.responses[self.active] -= 1
+        else:
+            return False
+        return True
+
+    def _log_answers(self, **fields):
+        for (key, question, n_pts), value in zip(self.questions, self.responses):
+            self._log_event({
+                "trial_type": "questionnaire-answer",
+                **self._event_fields,
+                "question": key,
+                "value": value,
+                **fields,
+            })
+
+    def run(self, get_keys, clock=None, timeout=None, log_label="questions"):
+        """Generator to run the questionnaire until answers are validated or
+        `timeout` (s, on `clock`) is reached, returns whether answers were
+        validated. `get_keys` returns the list of newly pressed keys.
+        Responses are logged on flip after `log_label`.
+        """
+        deadline = clock.getTime() + timeout if timeout is not None else None
+        # a timeout adds a confirmation field to answers
+        confirmation = (lambda confirmed: {"confirmation": "yes" if confirmed else "no"}) \
+            if timeout is not None else (lambda confirmed: {})
+        n_flips = 0
+        while deadline is None or clock.getTime() < deadline:
+            keys = get_keys()
+            if "a" in keys:
+                self._log_answers(**confirmation(True))
+                return True
+            changed = self._handle_keys(keys)
+            if changed:
+                self._log_event({
+                    "trial_type": "questionnaire-value-change",
+                    **self._event_fields,
+                    "question": self.questions[self.active][0],
+                    "value": self.responses[self.active],
+                })
+            elif n_flips > 1:  # both buffers are up to date
+                time.sleep(IDLE_SLEEP)
+                yield
+                continue
+            self._update()
+            self.win.logOnFlip(level=logging.EXP, msg="%s %s" % (log_label, self.responses))
+            self.draw()
+            yield True
+            n_flips += 1
+        self._log_answers(**confirmation(False))
+        return False
+
+
+class LikertQuestionnaire(Questionnaire):
+    """Questions stacked on the left of their scales, with a single pair of
+    legends above the scales."""
+
+    def __init__(self, win, questions, log_event, event_fields=None,
+                 legends=("Disagree", "Agree"), legends_y=1.1):
+        self._legends = legends
+        self._legends_y = legends_y
+        super().__init__(win, questions, log_event, event_fields)
+
+    def _layout(self, bullets_xys):
+        win_width = self.win.size[0]
+        scales_block_x = win_width * 0.25
+        scales_block_y = len(self.questions) // 2 * Y_SPACING
+        extent = win_width * 0.2
+        text_kwargs = dict(
+            wrapWidth=win_width * 0.5,
+            height=Y_SPACING / 3,
+            anchorHoriz="right",
+            alignText="right",
+        )
+
+        for legend, x in zip(self._legends, [extent * -0.75, extent * 1.15]):
+            self._static.append(self._text(
+                legend, bold=True,
+                pos=(scales_block_x + x, scales_block_y * self._legends_y),
+                **text_kwargs))
+
+        for q_n, (key, question, n_pts) in enumerate(self.questions):
+            x_spacing = extent * 2 / (n_pts - 1)
+            y_pos = scales_block_y - q_n * Y_SPACING
+            self._lines.append(visual.Line(
+                self.win,
+                (scales_block_x - extent, y_pos),
+                (scales_block_x + extent, y_pos),
+                units="pix",
+                lineWidth=6,
+                autoLog=False,
+            ))
+            bullets_xys.extend(
+                (scales_block_x - extent + i * x_spacing, y_pos) for i in range(n_pts))
+            self._texts.append(tuple(
+                self._text(question, bold=bold, pos=(0, y_pos), **text_kwargs)
+                for bold in [False, True]))
+
+
+class LabeledScale(Questionnaire):
+    """A single question above a scale with a label above each point."""
+
+    highlight_active = False
+
+    def __init__(self, win, question, labels, log_event, event_fields=None):
+        self._labels = labels
+        super().__init__(win, [(question, question, len(labels))], log_event, event_fields)
+
+    def _layout(self, bullets_xys):
+        win_width, win_height = self.win.size
+        half_width = win_width * 0.45
+        x_spacing = half_width * 2 / (len(self._labels) - 1)
+        y_pos = win_height * 0.1 - Y_SPACING
+
+        self._lines.append(visual.Line(
+            self.win,
+            (-half_width, y_pos),
+            (half_width, y_pos),
+            units="pix",
+            lineWidth=6,
+            autoLog=False,
+        ))
+        bullets_xys.extend(
+            (-half_width + i * x_spacing, y_pos) for i in range(len(self._labels)))
+        self._static.extend(
+            self._text(
+                label, bold=True,
+                pos=(-half_width + i * x_spacing, win_height * 0.1),
+                wrapWidth=win_width * 0.12,
+                height=Y_SPACING / 4.5,
+                anchorHoriz="center",
+                alignText="center")
+            for i, label in enumerate(self._labels))
+        question = self.questions[0][1]
+        self._static.append(self._text(
+            question,
+            pos=(-half_width, y_pos + win_height * 0.30),
+            wrapWidth=win_width * 0.9,
+            height=Y_SPACING / 3,
+            anchorHoriz="left",
+            alignText="left"))
+
+
+class SingleScale(Questionnaire):
+    """A single question centered above a scale without labels."""
+
+    highlight_active = False
+
+    def _layout(self, bullets_xys):
+        win_width, win_height = self.win.size
+        half_width = win_width * 0.3
+        _, question, n_pts = self.questions[0]
+        x_spacing = half_width * 2 / (n_pts - 1)
+
+        self._lines.append(visual.Line(
+            self.win,
+            (-half_width, 0),
+            (half_width, 0),
+            units="pix",
+            lineWidth=6,
+            autoLog=False,
+        ))
+        bullets_xys.extend((-half_width + i * x_spacing, 0) for i in range(n_pts))
+        self._static.append(self._text(
+            question,
+            pos=(0, win_height * 0.2),
+            wrapWidth=win_width * 0.8,
+            height=Y_SPACING / 3,
+            anchorHoriz="center",
+            alignText="center"))
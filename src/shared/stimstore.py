@@ -0,0 +1,197 @@
+# packed stimulus store: pre-decoded pixels/samples of many small files in a
+# single memory-mapped file.
+#
+# layout:
+#   MAGIC (8 bytes) | header length (uint64 little-endian) | json header | data
+# the header maps each stimulus key (relative path, `path:array` for npz) to
+# the offset (from data start), shape, dtype and sha1 of its raw array.
+#
+# build with: python -m src.shared.stimstore OUTPUT_FILE PATH [PATH ...]
+
+import os, json, mmap, hashlib, wave, tempfile, shutil, argparse, threading
+import numpy as np
+from PIL import Image
+from psychopy import logging
+
+from . import config
+
+MAGIC = b"TSSTORE1"
+ALIGNMENT = 64
+HEADER_LENGTH_DTYPE = np.dtype("<u8")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+AUDIO_EXTENSIONS = (".wav",)
+
+
+def normalize_key(path):
+    if os.path.isabs(path):
+        path = os.path.relpath(path)
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _read_wav(path):
+    with wave.open(path, "rb") as wav:
+        sampwidth = wav.getsampwidth()
+        if sampwidth not in (1, 2, 4):
+            raise ValueError(f"unsupported wav sample width {sampwidth}: {path}")
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[sampwidth]
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=dtype)
+        samples = samples.reshape(-1, wav.getnchannels())
+        return samples, {"sample_rate": wav.getframerate()}
+
+
+def _decode_file(path):
+    """Yield (key, array, kind, attrs) for each array stored from that file."""
+    ext = os.path.splitext(path)[1].lower()
+    key = normalize_key(path)
+    if ext in IMAGE_EXTENSIONS:
+        with Image.open(path) as img:
+            if img.mode not in ("L", "RGB", "RGBA"):
+                img = img.convert("RGBA")
+            yield key, np.asarray(img), "image", {}
+    elif ext in AUDIO_EXTENSIONS:
+        samples, attrs = _read_wav(path)
+        yield key, samples, "audio", attrs
+    elif ext == ".npy":
+        yield key, np.load(path), "array", {}
+    elif ext == ".npz":
+        with np.load(path) as npz:
+            for name in npz.files:
+                yield f"{key}:{name}", npz[name], "array", {}
+
+
+def _iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for fname in sorted(files):
+                    yield os.path.join(root, fname)
+        else:
+            yield path
+
+
+def build_store(output_file, paths):
+    """Pack all supported files found in `paths` into `output_file`."""
+    entries = {}
+    with tempfile.TemporaryFile() as payload:
+        for path in _iter_files(paths):
+            for key, array, kind, attrs in _decode_file(path):
+                array = np.ascontiguousarray(array)
+                offset = payload.tell()
+                payload.write(b"\0" * (-offset % ALIGNMENT))
+                offset = payload.tell()
+                data = array.tobytes()
+                payload.write(data)
+                entries[key] = {
+                    "offset": offset,
+                    "shape": list(array.shape),
+                    "dtype": array.dtype.str,
+                    "sha1": hashlib.sha1(data).hexdigest(),
+                    "kind": kind,
+                    "attrs": attrs,
+                }
+        header = json.dumps({"version": 1, "entries": entries}).encode("utf-8")
+        # pad header so that data start is aligned
+        header += b" " * (-(len(MAGIC) + HEADER_LENGTH_DTYPE.itemsize + len(header)) % ALIGNMENT)
+        payload.seek(0)
+        with open(output_file, "wb") as fo:
+            fo.write(MAGIC)
+            fo.write(np.array(len(header), HEADER_LENGTH_DTYPE).tobytes())
+            fo.write(header)
+            shutil.copyfileobj(payload, fo)
+    return entries
+
+
+class StimulusStore(object):
+    """Read-only access to a packed stimulus store.
+
+    Arrays returned by `get` are zero-copy views on the memory-mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a stimulus store")
+        header_len = int(np.frombuffer(self._mmap, HEADER_LENGTH_DTYPE, 1, len(MAGIC))[0])
+        header_start = len(MAGIC) + HEADER_LENGTH_DTYPE.itemsize
+        header = json.loads(bytes(self._mmap[header_start : header_start + header_len]))
+        self._entries = header["entries"]
+        self._data_start = header_start + header_len
+
+    def __contains__(self, key):
+        return normalize_key(key) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        return self._entries.keys()
+
+    def info(self, key):
+        return self._entries[normalize_key(key)]
+
+    def get(self, key):
+        entry = self.info(key)
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        return np.frombuffer(
+            self._mmap, dtype, count, self._data_start + entry["offset"]
+        ).reshape(entry["shape"])
+
+    def get_image(self, key):
+        return Image.fromarray(self.get(key))
+
+    def get_sound(self, key):
+        """Return samples as float32 in [-1, 1] and the sample rate."""
+        entry = self.info(key)
+        samples = self.get(key)
+        if samples.dtype == np.uint8:
+            samples = (samples.astype(np.float32) - 128) / 128
+        else:
+            samples = samples.astype(np.float32) / np.iinfo(samples.dtype).max
+        return samples, entry["attrs"]["sample_rate"]
+
+    def verify(self, key):
+        return hashlib.sha1(self.get(key).tobytes()).hexdigest() == self.info(key)["sha1"]
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+_store = None
+# prefetch workers can be the first to request the store
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the session store if config.STIMULI_STORE exists, else None."""
+    global _store
+    if _store is None and config.STIMULI_STORE and os.path.exists(config.STIMULI_STORE):
+        with _store_lock:
+            if _store is None:
+                _store = StimulusStore(config.STIMULI_STORE)
+                logging.info(f"stimulus store: {len(_store)} entries from {config.STIMULI_STORE}")
+    return _store
+
+
+def load_sound(path):
+    """Create a psychopy Sound from the store if packed, else from file."""
+    from psychopy import sound
+
+    store = get_store()
+    if store is not None and path in store:
+        samples, sample_rate = store.get_sound(path)
+        return sound.Sound(samples, sampleRate=sample_rate)
+    return sound.Sound(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a packed stimulus store")
+    parser.add_argument("output", help="store file to create")
+    parser.add_argument("paths", nargs="+", help="files or folders to pack")
+    args = parser.parse_args()
+    entries = build_store(args.output, args.paths)
+    print(f"packed {len(entries)} stimuli in {args.output}")
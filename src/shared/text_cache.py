@@ -0,0 +1,132 @@
+# render or lay out text once, to avoid text layout on time critical flips
+
+import string
+from collections import OrderedDict
+import numpy as np
+from psychopy import logging, visual
+from psychopy.tools.monitorunittools import convertToPix
+
+from . import config
+from .texture_cache import _hashable
+
+# margin (pixels) kept around the text bounding box
+TEXT_MARGIN = 4
+
+
+def render_text(win, text, bg_color=None, **text_kwargs):
+    """Render a TextStim into a BufferImageStim cropped around the text.
+
+    The captured texture includes the window background, `bg_color` (rgb)
+    should be the color of the window when the stimulus is displayed.
+    The text is captured without the window view transform (eg. mirroring),
+    which is applied when the captured stimulus is drawn.
+    """
+    stim = visual.TextStim(win, text=text, **text_kwargs)
+    x, y = convertToPix(np.zeros(2), stim.pos, stim.units, win)
+    half_w, half_h = np.asarray(stim.boundingBox) / 2 + TEXT_MARGIN
+    win_w, win_h = np.asarray(win.size) / 2
+    rect = [(x - half_w) / win_w, (y + half_h) / win_h,
+            (x + half_w) / win_w, (y - half_h) / win_h]
+
+    if bg_color is not None:
+        win_color, win_color_space = win.color, win.colorSpace
+        win.setColor(bg_color, 'rgb')
+    view_scale, win.viewScale = win.viewScale, None
+    # draws text in the cleared back buffer and captures rect
+    rendered = visual.BufferImageStim(win, stim=[stim], rect=rect, name=text)
+    win.viewScale = view_scale
+    if bg_color is not None:
+        win.setColor(win_color, win_color_space)
+    win.clearBuffer()
+    return rendered
+
+
+def prerender_texts(win, texts, bg_color=None, **text_kwargs):
+    """Return a dict mapping each unique text to its rendered stimulus."""
+    return {
+        text: render_text(win, text, bg_color=bg_color, **text_kwargs)
+        for text in dict.fromkeys(texts)
+    }
+
+
+# style of most task instruction screens
+INSTRUCTION_STYLE = dict(alignText="center", color="white", wrapWidth=config.WRAP_WIDTH)
+TEXT_CACHE_SIZE = 64
+WARMUP_GLYPHS = string.ascii_letters + string.digits + string.punctuation + "àâçéèêëîïôùûüÀÂÇÉÈÊÎÔÙÛ"
+
+
+class TextCache(object):
+    """LRU cache of TextStim keyed by window, text and style.
+
+    A TextStim lays out its text (and rasterizes new glyphs) when created or
+    modified, cached stimuli are reused across tasks and runs so must not be
+    modified by callers.
+    """
+
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._stims = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._stims)
+
+    def key(self, win, text, **kwargs):
+        return (win, text) + tuple(sorted((k, _hashable(v)) for k, v in kwargs.items()))
+
+    def get_text_stim(self, win, text, **kwargs):
+        key = self.key(win, text, **kwargs)
+        stim = self._stims.get(key)
+        if stim is not None:
+            self._stims.move_to_end(key)
+            self.hits += 1
+            return stim
+        self.misses += 1
+        stim = visual.TextStim(win, text=text, **kwargs)
+        self._stims[key] = stim
+        while len(self._stims) > self.max_entries:
+            self._stims.popitem(last=False)
+        return stim
+
+    def warmup(self, win, texts, **kwargs):
+        """Create and draw texts to the back buffer, so that layout and glyphs
+        textures are ready before their first time critical draw."""
+        for text in texts:
+            self.get_text_stim(win, text, **kwargs).draw(win)
+        win.clearBuffer()
+
+    def clear(self):
+        self._stims.clear()
+
+    def stats(self):
+        return {"entries": len(self._stims), "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = TextCache()
+    return _cache
+
+
+def get_text_stim(win, text, **kwargs):
+    return get_cache().get_text_stim(win, text, **kwargs)
+
+
+def warmup(win, texts, **kwargs):
+    get_cache().warmup(win, texts, **kwargs)
+
+
+def warmup_glyphs(win, **kwargs):
+    """Rasterize common glyphs of the instruction font, without caching."""
+    visual.TextStim(win, text=WARMUP_GLYPHS, **{**INSTRUCTION_STYLE, **kwargs}).draw(win)
+    win.clearBuffer()
+
+
+def log_stats():
+    if _cache is not None:
+        logging.exp(msg="text cache: %s" % _cache.stats())
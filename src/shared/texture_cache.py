@@ -0,0 +1,133 @@
+# process-wide cache of image textures shared across tasks and runs
+
+import os
+from collections import OrderedDict
+from psychopy import logging, visual
+
+from . import config
+from .prefetch import decode_image
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if hasattr(value, "tolist"):  # numpy arrays and scalars
+        return _hashable(value.tolist())
+    return value
+
+
+class TextureCache(object):
+    """LRU cache of ImageStim keyed by (path, size, units).
+
+    Each ImageStim holds a single texture, the cache evicts the least
+    recently used ones when the estimated texture memory exceeds the budget.
+    Pinned entries (eg. the upcoming images of a stream) are never evicted.
+    """
+
+    def __init__(self, budget_mb=config.TEXTURE_CACHE_BUDGET_MB):
+        self.budget = budget_mb * 2**20
+        self._stims = OrderedDict()
+        self._pinned = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._stims)
+
+    def __contains__(self, key):
+        return key in self._stims
+
+    def key(self, path, size=None, units=None, **kwargs):
+        return (
+            os.path.realpath(path),
+            _hashable(size),
+            units,
+        ) + tuple(sorted((k, _hashable(v)) for k, v in kwargs.items()))
+
+    def get_image_stim(self, win, path, size=None, units=None, image=None, pin=False, **kwargs):
+        """Return a cached ImageStim for that image file, creating it on miss.
+
+        `image` can be an already decoded version of `path` (eg. prefetched)
+        to be used on miss. Extra ImageStim arguments are part of the key.
+        If `pin` is set, the entry is kept until `unpin` is called with the
+        same arguments.
+        """
+        key = self.key(path, size=size, units=units, **kwargs)
+        entry = self._stims.get(key)
+        if entry is not None and entry[0].win is win:
+            self._stims.move_to_end(key)
+            self.hits += 1
+            if pin:
+                self._pin(key)
+            return entry[0]
+        self.misses += 1
+        if entry is not None:
+            self._evict(key)
+
+        if image is None:
+            image = decode_image(path)
+        stim = visual.ImageStim(win, image=image, size=size, units=units, **kwargs)
+        # estimated as RGBA 8bit texture
+        nbytes = image.size[0] * image.size[1] * 4
+        self._stims[key] = (stim, nbytes)
+        self.nbytes += nbytes
+        if pin:
+            self._pin(key)
+        # least recently used first, the new entry is last
+        for lru_key in list(self._stims)[:-1]:
+            if self.nbytes <= self.budget:
+                break
+            if lru_key not in self._pinned:
+                self._evict(lru_key)
+        return stim
+
+    def _pin(self, key):
+        self._pinned[key] = self._pinned.get(key, 0) + 1
+
+    def unpin(self, path, size=None, units=None, **kwargs):
+        key = self.key(path, size=size, units=units, **kwargs)
+        count = self._pinned.pop(key, 0) - 1
+        if count > 0:
+            self._pinned[key] = count
+
+    def _evict(self, key):
+        self._pinned.pop(key, None)
+        stim, nbytes = self._stims.pop(key)
+        stim.clearTextures()
+        self.nbytes -= nbytes
+        self.evictions += 1
+
+    def clear(self):
+        while len(self._stims):
+            self._evict(next(iter(self._stims)))
+
+    def stats(self):
+        return {
+            "entries": len(self._stims),
+            "pinned": len(self._pinned),
+            "mbytes": self.nbytes / 2**20,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = TextureCache()
+    return _cache
+
+
+def get_image_stim(win, path, **kwargs):
+    return get_cache().get_image_stim(win, path, **kwargs)
+
+
+def log_stats():
+    if _cache is not None:
+        logging.exp(msg="texture cache: %s" % _cache.stats())
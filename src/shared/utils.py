@@ -4,6 +4,9 @@ from psychopy import core, logging
 import os, glob
 from inspect import getframeinfo, stack
 
+# callables run by wait_until once the deadline is reached (eg. by the control window mirror)
+wait_hooks = []
+
 def check_power_plugged():
     battery = psutil.sensors_battery()
     if battery:
@@ -23,6 +26,8 @@ def wait_until(clock, deadline, hogCPUperiod=0.1, keyboard_accuracy=.0005):
             time.sleep(keyboard_accuracy)
         poll_windows()
         current_time = clock.getTime()
+    for hook in wait_hooks:
+        hook()
 
 def poll_windows():
     for winWeakRef in core.openWindows:
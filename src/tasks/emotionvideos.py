@@ -8,7 +8,7 @@ import numpy as np
 from colorama import Fore
 import pandas as pd
 
-from ..shared import config, utils, eyetracking
+from ..shared import config, utils, eyetracking, text_cache
 
 FADE_TO_GREY_DURATION = 2
 SCALING_EMOTION_VIDEOS = 900 #pix
@@ -82,7 +82,7 @@ class EmotionVideos(Task):
 
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
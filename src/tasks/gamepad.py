@@ -4,7 +4,7 @@ from psychopy import visual, core, data, logging, event
 
 from .task_base import Task
 from .videogame import _onPygletKeyPress, _onPygletKeyRelease, _keyPressBuffer, _keyReleaseBuffer
-from ..shared import config, utils
+from ..shared import config, utils, text_cache
 
 class ButtonPressTask(Task):
 
@@ -31,7 +31,7 @@ class ButtonPressTask(Task):
         self._progress_bar_refresh_rate = 3 # 3 flips per trial
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
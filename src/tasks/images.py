@@ -2,7 +2,7 @@ import os, sys, time
 from psychopy import visual, core, data, logging
 from .task_base import Task
 
-from ..shared import config
+from ..shared import config, text_cache
 
 STIMULI_DURATION = 3
 BASELINE_BEGIN = 5
@@ -27,7 +27,7 @@ You will see pictures of scenes and objects."""
             raise ValueError("Cannot find the listed images in %s " % images_path)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -35,11 +35,8 @@ You will see pictures of scenes and objects."""
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
 
@@ -1,10 +1,12 @@
 import os, sys, time
+import numpy as np
 from psychopy import visual, core, data, logging, sound, event
 from pandas import read_csv
 from .task_base import Task
 from colorama import Fore
 
-from ..shared import config, utils
+from ..shared import config, utils, text_cache
+from ..shared.stimstore import load_sound
 from ..shared.eyetracking import fixation_dot
 
 TR = 1.49
@@ -49,7 +51,7 @@ Don't think too much and give the first answer that comes to mind.
             raise ValueError("File %s does not exists" % words_file)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -65,17 +67,15 @@ Don't think too much and give the first answer that comes to mind.
         yield True
 
     def _setup(self, exp_win):
-        self.r0_stim = visual.TextStim(
-            exp_win, text="", pos=(0, 0.5), alignText="center", color="white"
-        )
-
-        self.r1_stim = visual.TextStim(
-            exp_win, text="", pos=(0, 0), alignText="center", color="white"
-        )
-
-        self.r2_stim = visual.TextStim(
-            exp_win, text="", pos=(0, -0.5), alignText="center", color="white"
-        )
+        # words are shuffled at run time, render all of them at each position
+        words = [
+            trial[k] for trial in self.words_list for k in ["target", "choice_1", "choice_2"]
+        ]
+        self.word_stims = [
+            text_cache.prerender_texts(
+                exp_win, words, pos=pos, alignText="center", color="white")
+            for pos in [(0, 0.5), (0, 0), (0, -0.5)]
+        ]
 
         self.trials = data.TrialHandler(self.words_list, 1, method="sequential")
 
@@ -94,13 +94,11 @@ Don't think too much and give the first answer that comes to mind.
             all_stim = [trial["target"],trial["choice_1"],trial["choice_2"]]
             from random import shuffle
             shuffle(all_stim)
-            self.r0_stim.text = all_stim[0]
-            self.r1_stim.text = all_stim[1]
-            self.r2_stim.text = all_stim[2]
 
             exp_win.winHandle.activate()
 
-            for stim in [self.r0_stim, self.r1_stim, self.r2_stim]:
+            for word_stims, word in zip(self.word_stims, all_stim):
+                stim = word_stims[word]
                 stim.draw(exp_win)
                 if ctl_win:
                     stim.draw(ctl_win)
@@ -178,7 +176,7 @@ Press B if you don’t know the word."""
 
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -285,7 +283,7 @@ class WordFamiliarity(Task):
 
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -392,7 +390,7 @@ class Reading(Task):
             raise ValueError("File %s does not exists" % words_file)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -403,48 +401,49 @@ class Reading(Task):
         if ctl_win:
             ctl_win.setColor(self.bg_color, "rgb")
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield True
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
         yield True
 
     def _setup(self, exp_win):
 
-        self.txt_stim = visual.TextStim(
-            exp_win,
-            text="+",
-            font=self.txt_font,
-            height=self.txt_size,
-            units='pix',
-            alignText="center",
-            color=self.txt_color,
-        )
+        italic = (self.words_list["format"] == "italic").to_numpy()
+        self.word_stims = {}
+        for style in [False, True]:
+            word_stims = text_cache.prerender_texts(
+                exp_win,
+                self.words_list["word"][italic == style],
+                bg_color=self.bg_color,
+                italic=style,
+                font=self.txt_font,
+                height=self.txt_size,
+                units='pix',
+                alignText="center",
+                color=self.txt_color,
+            )
+            self.word_stims.update(
+                {(word, style): stim for word, stim in word_stims.items()})
         self._progress_bar_refresh_rate = 1 # 1 flip / trial
+        # allocated here so that saving works if the task is quit before running
+        self._restart()
+
+    def _restart(self):
+        self.onset_flips = np.full(len(self.words_list), np.nan)
 
     def _run(self, exp_win, ctl_win):
 
         # Display each word
         for trial_n, trial in self.words_list.iterrows():
-            self.txt_stim.text = trial["word"]
-            self.txt_stim._pygletTextObj.set_style('italic', trial["format"] == "italic")
-            self.txt_stim.draw(exp_win)
+            self.word_stims[(trial["word"], trial["format"] == "italic")].draw(exp_win)
             self.progress_bar.set_description(f"Trial {trial_n}:: {trial['word']} {trial['format']}")
             utils.wait_until(
                 self.task_timer,
                 trial["onset"] - 1 / config.FRAME_RATE,
                 hogCPUperiod=0.2)
             yield True  # flip
-            self.words_list.at[trial_n, "onset_flip"] = (
+            self.onset_flips[trial_n] = (
                 self._exp_win_last_flip_time - self._exp_win_first_flip_time
             )
-            if trial_n > 0:
-                self.words_list.at[trial_n - 1, "offset_flip"] = self.words_list.at[trial_n, "onset_flip"]
-                self.words_list.at[trial_n -1, "duration_flip"] = (
-                    self.words_list.at[trial_n - 1, "offset_flip"]
-                    - self.words_list.at[trial_n - 1, "onset_flip"]
-                )
         # wait for last event duration
         utils.wait_until(
             self.task_timer,
@@ -458,6 +457,11 @@ class Reading(Task):
             yield True
 
     def _save(self):
+        # each word is displayed until the next one
+        self.words_list["onset_flip"] = self.onset_flips
+        self.words_list["offset_flip"] = np.append(self.onset_flips[1:], np.nan)
+        self.words_list["duration_flip"] = (
+            self.words_list["offset_flip"] - self.words_list["onset_flip"])
         #self.words_list.saveAsWideText(self._generate_unique_filename("events", "tsv")
         self.words_list.to_csv(
             self._generate_unique_filename("events", "tsv"),
@@ -467,6 +471,9 @@ class Reading(Task):
         )
         return False
 
+    def unload(self):
+        del self.word_stims
+
 class Listening(Task):
 
     DEFAULT_INSTRUCTION = """You are about to listen to audio stimuli"""
@@ -485,7 +492,7 @@ class Listening(Task):
             raise ValueError("File %s does not exists" % self.filepath)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -531,7 +538,7 @@ class ListeningBlocks(Task):
         self.design = data.importConditions(design_file)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -539,17 +546,14 @@ class ListeningBlocks(Task):
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield True
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _setup(self, exp_win):
         self.trials = data.TrialHandler(self.design, 1, method="sequential")
         self.fixation_dot = fixation_dot(exp_win)
         self._stimuli = [
-            (sound.Sound(
+            (load_sound(
                 os.path.join(self.stimuli_path, trial['stim_file'])) \
                 if trial['stim_file'] else None) \
             for trial in self.design]
@@ -610,20 +614,21 @@ class ReadingBlocks(Task):
         self.press_key = press_key
 
     def _setup(self, exp_win):
-        self.trials = data.TrialHandler(self.design, 1, method="sequential")
         self.fixation_dot = fixation_dot(exp_win)
-        self.txt_stim = visual.TextStim(
+        self.word_stims = text_cache.prerender_texts(
             exp_win,
-            text="+",
+            [':'] + [trial['word'] for trial in self.design if trial['trial_type'] not in ['fix', 'press']],
             font=self.txt_font,
             height=self.txt_size,
             units='pix',
             alignText="center",
             color=self.txt_color,
         )
+        # allocated here so that saving works if the task is quit before running
+        self._restart()
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -631,11 +636,8 @@ class ReadingBlocks(Task):
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield True
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
         last_press_trial = None
@@ -645,33 +647,41 @@ class ReadingBlocks(Task):
                     stim_.draw(exp_win)
             else:
                 if trial['trial_type'] == 'press':
-                    last_press_trial = trial
-                    self.txt_stim.text = ':'
+                    last_press_trial, last_press_n = trial, trial_n
+                    self.word_stims[':'].draw(exp_win)
                 else:
-                    self.txt_stim.text = trial['word']
-                self.txt_stim.draw(exp_win)
+                    self.word_stims[trial['word']].draw(exp_win)
             if trial_n > 0: #
                 utils.wait_until(self.task_timer, trial['onset'] - 1/config.FRAME_RATE)
             else: # force assignt to none, otherwise future trial will just dismiss the added fields
                 for k in ['all_keypresses', 'response_onset', 'response_time']:
                     trial[k] = None
             yield True
-            trial['onset_flip'] = self._exp_win_last_flip_time - self._exp_win_first_flip_time
+            self.onset_flips[trial_n] = self._exp_win_last_flip_time - self._exp_win_first_flip_time
             yield from utils.wait_until_yield(
                 self.task_timer,
                 trial['onset']+trial['duration'] - 2/config.FRAME_RATE,
                 keyboard_accuracy=.1)
-            trial['offset_flip'] = self._exp_win_last_flip_time - self._exp_win_first_flip_time
+            self.offset_flips[trial_n] = self._exp_win_last_flip_time - self._exp_win_first_flip_time
             kpress = event.getKeys([self.press_key], timeStamped=self.task_timer)
             if len(kpress) and last_press_trial:
                 last_press_trial['all_keypresses'] = last_press_trial.get('all_keypresses', []) + kpress
                 if not last_press_trial.get('response_onset', None):
                     last_press_trial['response_onset'] = kpress[0][1]
-                    last_press_trial['response_time'] = kpress[0][1] - last_press_trial['onset_flip']
+                    last_press_trial['response_time'] = kpress[0][1] - self.onset_flips[last_press_n]
 
     def _restart(self):
         self.trials = data.TrialHandler(self.design, 1, method="sequential")
+        self.onset_flips = np.full(len(self.design), np.nan)
+        self.offset_flips = np.full(len(self.design), np.nan)
 
     def _save(self):
+        for trial, onset_flip, offset_flip in zip(
+                self.trials.trialList, self.onset_flips, self.offset_flips):
+            trial['onset_flip'] = onset_flip
+            trial['offset_flip'] = offset_flip
         self.trials.saveAsWideText(self._generate_unique_filename("events", "tsv"))
         return False
+
+    def unload(self):
+        del self.word_stims
@@ -2,14 +2,18 @@ import os, sys, time
 import os.path as op
 import numpy as np
 from glob import glob
+from PIL import Image
 from psychopy import visual, core, data, logging, event
 from pandas import DataFrame, read_csv
 from .task_base import Task
 import json
 
-from ..shared import config, utils
+from ..shared import config, utils, texture_cache, text_cache
 
 STIMULI_DURATION = 4
+FLOC_STIMULI_DIR = op.join('data', 'fLoc', 'stimuli')
+FLOC_ATLAS_DIR = op.join('data', 'fLoc', 'atlases')
+FLOC_STIMULI_SIZE = 768
 BASELINE_BEGIN = 5
 BASELINE_END = 5
 ISI = 2
@@ -38,18 +42,15 @@ class FLoc(Task):
         else:
             instruction_text = 'Fixate. Press a button when an image repeats on sequential trials.'
 
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=instruction_text,
             alignText="center",
             wrapWidth=1.2,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _setup(self, exp_win):
 
@@ -62,19 +63,6 @@ class FLoc(Task):
         #Note: now a list (len=12) for each image in a single 6s block -> 5.98s
         self.constants['TRIAL_DURATION'] = (self.constants['IMAGE_DURATION'] + np.array(self.constants['TARGET_ISI'])).tolist()
 
-        self.stim_image = visual.ImageStim(
-            win=exp_win,
-            name='stimulus',
-            image=None,
-            ori=0,
-            pos=(0, 0),
-            size=(768, 768),
-            units='pix',
-            color=[1, 1, 1],
-            colorSpace='rgb',
-            opacity=1,
-            depth=-1.0,
-            interpolate=False)
         self.fixation = visual.TextStim(
             win=exp_win,
             name='fixation',
@@ -98,18 +86,37 @@ class FLoc(Task):
         n_blocks_per_category = int(np.floor(self.constants['N_BLOCKS'] / n_categories))
 
         self.stimuli = {}
+        # pre-decoded pixels, indexed by stimulus file
+        self._atlas_index = {}
         for category in stimulus_folders.keys():
             if stimulus_folders[category] is not None:
-                stimulus_files = [glob(op.join('data','fLoc', 'stimuli/{}/*.jpg'.format(stimulus_folder))) for
-                                  stimulus_folder in stimulus_folders[category]]
-                # Unravel list of lists
-                stimulus_files = [item for sublist in stimulus_files for item in sublist]
+                stimulus_files = []
+                for stimulus_folder in stimulus_folders[category]:
+                    atlas = load_floc_atlas(stimulus_folder)
+                    if atlas is None:
+                        logging.warning(f"fLoc: no atlas for {stimulus_folder}, decoding jpg files")
+                        stimulus_files.extend(glob(op.join(FLOC_STIMULI_DIR, stimulus_folder, '*.jpg')))
+                        continue
+                    pixels, names = atlas
+                    for stim_idx, name in enumerate(names):
+                        stim_file = op.join(FLOC_STIMULI_DIR, stimulus_folder, name)
+                        self._atlas_index[_clean_path(stim_file)] = (pixels, stim_idx)
+                        stimulus_files.append(stim_file)
                 # Clean up paths
-                stimulus_files = [op.realpath(item).replace('\\', '/') for item in stimulus_files]
+                stimulus_files = [_clean_path(item) for item in stimulus_files]
                 self.stimuli[category] = stimulus_files
             else:
                 self.stimuli[category] = None  # baseline trials just have fixation
 
+        if len(self._atlas_index):
+            self.stim_image = visual.ImageStim(
+                win=exp_win,
+                name='stimulus',
+                image=None,
+                size=(FLOC_STIMULI_SIZE, FLOC_STIMULI_SIZE),
+                units='pix',
+                interpolate=False)
+
         self._progress_bar_refresh_rate = 1 # 1 flip / trial
 
         # Determine which trials will be task
@@ -128,10 +135,78 @@ class FLoc(Task):
 
         self.miniblock_categories = randomize_carefully(standard_categories, n_blocks_per_category)
         np.random.shuffle(self.task_miniblocks)
+        self._compose_miniblocks()
 
         self.duration = self.constants['TOTAL_DURATION']
         self._progress_bar_refresh_rate = 2
 
+    def _compose_miniblocks(self):
+        # draw the stimuli and targets of all blocks ahead of the run
+        mean_trial_duration = np.sum(self.constants['TRIAL_DURATION'])/self.constants['N_STIMULI_PER_BLOCK']
+        nonbaseline_block_counter = 0
+        target_idx = None
+        self.miniblocks = []
+        for j_miniblock, category in enumerate(self.miniblock_categories):
+            if category == 'baseline':
+                self.miniblocks.append((None, None))
+                continue
+            miniblock_stimuli = list(np.random.choice(
+                self.stimuli[category], size=self.constants['N_STIMULI_PER_BLOCK'], replace=False))
+            if self.task_miniblocks[nonbaseline_block_counter] == 1:
+                # Check for last block's target to make sure that two targets don't
+                # occur within the same response exp_win
+                if (j_miniblock > 0) and (target_idx is not None):
+                    #last_target_onset = (((self.constants['N_STIMULI_PER_BLOCK'] + 1) - target_idx) *
+                    #                     self.constants['TRIAL_DURATION'] * -1)
+
+                    last_target_onset = (((self.constants['N_STIMULI_PER_BLOCK'] + 1) - target_idx) *
+                                         mean_trial_duration * -1)
+                    last_target_rw_offset = last_target_onset + self.constants['RESPONSE_WINDOW']
+                    #first_viable_trial = int(np.ceil(last_target_rw_offset /
+                    #                                 self.constants['TRIAL_DURATION']))
+                    first_viable_trial = int(np.ceil(last_target_rw_offset / mean_trial_duration))
+                    first_viable_trial = np.maximum(0, first_viable_trial)
+                    first_viable_trial += 1  # just to give it a one-trial buffer
+                else:
+                    first_viable_trial = 0
+
+                # Adjust stimuli based on task
+                if self.task == 'Oddball':
+                    # target is scrambled image
+                    target_idx = np.random.randint(first_viable_trial, len(miniblock_stimuli))
+                    miniblock_stimuli[target_idx] = np.random.choice(self.stimuli['scrambled'])
+                elif self.task == 'OneBack':
+                    # target is second stim of same kind
+                    first_viable_trial = np.maximum(first_viable_trial, 1)
+                    target_idx = np.random.randint(first_viable_trial, len(miniblock_stimuli))
+                    miniblock_stimuli[target_idx] = miniblock_stimuli[target_idx - 1]
+                elif self.task == 'TwoBack':
+                    # target is second stim of same kind
+                    first_viable_trial = np.maximum(first_viable_trial, 2)
+                    target_idx = np.random.randint(first_viable_trial, len(miniblock_stimuli))
+                    miniblock_stimuli[target_idx] = miniblock_stimuli[target_idx - 2]
+            else:
+                target_idx = None
+
+            self.miniblocks.append((miniblock_stimuli, target_idx))
+            nonbaseline_block_counter += 1
+
+    def _get_stim_image(self, exp_win, stim_file):
+        if stim_file in self._atlas_index:
+            # upload already decoded and resized pixels
+            pixels, stim_idx = self._atlas_index[stim_file]
+            # psychopy textures are float in [-1, 1] with the first row at the bottom
+            self.stim_image.image = np.flipud(pixels[stim_idx]).astype(np.float32) / 127.5 - 1
+            return self.stim_image
+        # stimuli are drawn with replacement across blocks
+        return texture_cache.get_image_stim(
+            exp_win,
+            stim_file,
+            size=(FLOC_STIMULI_SIZE, FLOC_STIMULI_SIZE),
+            units='pix',
+            interpolate=False,
+        )
+
     def _run(self, exp_win, ctl_win):
         exp_win.logOnFlip(
             level=logging.EXP, msg="fLoc: task starting at %f" % time.time()
@@ -141,17 +216,12 @@ class FLoc(Task):
         utils.wait_until(self.task_timer, self.constants['COUNTDOWN_DURATION'])
 
         run_responses, run_response_times = [], []
-        nonbaseline_block_counter = 0
         #block_duration = self.constants['N_STIMULI_PER_BLOCK'] * self.constants['TRIAL_DURATION']
         block_duration = np.sum(self.constants['TRIAL_DURATION'])
 
 
-        last_target_idx = -1
         last_target_event_onset = np.nan
 
-        # since made into a list, estimate average trial duration
-        mean_trial_duration = np.sum(self.constants['TRIAL_DURATION'])/self.constants['N_STIMULI_PER_BLOCK']
-
         for j_miniblock, category in enumerate(self.miniblock_categories):
             #miniblock_clock.reset()
 
@@ -172,50 +242,11 @@ class FLoc(Task):
                     'category': category,
                 })
             else:
-                # Block of stimuli
-                miniblock_stimuli = list(np.random.choice(
-                    self.stimuli[category], size=self.constants['N_STIMULI_PER_BLOCK'], replace=False))
-                if self.task_miniblocks[nonbaseline_block_counter] == 1:
-                    # Check for last block's target to make sure that two targets don't
-                    # occur within the same response exp_win
-                    if (j_miniblock > 0) and (target_idx is not None):
-                        #last_target_onset = (((self.constants['N_STIMULI_PER_BLOCK'] + 1) - target_idx) *
-                        #                     self.constants['TRIAL_DURATION'] * -1)
-
-                        last_target_onset = (((self.constants['N_STIMULI_PER_BLOCK'] + 1) - target_idx) *
-                                             mean_trial_duration * -1)
-                        last_target_rw_offset = last_target_onset + self.constants['RESPONSE_WINDOW']
-                        #first_viable_trial = int(np.ceil(last_target_rw_offset /
-                        #                                 self.constants['TRIAL_DURATION']))
-                        first_viable_trial = int(np.ceil(last_target_rw_offset / mean_trial_duration))
-                        first_viable_trial = np.maximum(0, first_viable_trial)
-                        first_viable_trial += 1  # just to give it a one-trial buffer
-                    else:
-                        first_viable_trial = 0
-
-                    # Adjust stimuli based on task
-                    if self.task == 'Oddball':
-                        # target is scrambled image
-                        target_idx = np.random.randint(first_viable_trial, len(miniblock_stimuli))
-                        miniblock_stimuli[target_idx] = np.random.choice(self.stimuli['scrambled'])
-                    elif self.task == 'OneBack':
-                        # target is second stim of same kind
-                        first_viable_trial = np.maximum(first_viable_trial, 1)
-                        target_idx = np.random.randint(first_viable_trial, len(miniblock_stimuli))
-                        miniblock_stimuli[target_idx] = miniblock_stimuli[target_idx - 1]
-                    elif self.task == 'TwoBack':
-                        # target is second stim of same kind
-                        first_viable_trial = np.maximum(first_viable_trial, 2)
-                        target_idx = np.random.randint(first_viable_trial, len(miniblock_stimuli))
-                        miniblock_stimuli[target_idx] = miniblock_stimuli[target_idx - 2]
-                    last_target_idx = target_idx
-                else:
-                    target_idx = None
-
+                miniblock_stimuli, target_idx = self.miniblocks[j_miniblock]
                 for k_stim, stim_file in enumerate(miniblock_stimuli):
 
-                    self.stim_image.image = stim_file
-                    self.stim_image.draw(exp_win)
+                    stim_image = self._get_stim_image(exp_win, stim_file)
+                    stim_image.draw(exp_win)
                     self.fixation.draw(exp_win)
                     utils.wait_until(
                         self.task_timer,
@@ -259,12 +290,10 @@ class FLoc(Task):
                         self._events.append({
                             'trial_type': 'keypress',
                             'onset': k[1],
-#                            'match_target': (k_stim-last_target_idx < 1 if last_target_idx>=0 else None), #consider a correct response if in current of previous image
                             'reaction_time': rt,
                             'task': self.task,
                         })
 
-                nonbaseline_block_counter += 1
         utils.wait_until(
             self.task_timer,
             self.constants['COUNTDOWN_DURATION'] + \
@@ -278,6 +307,42 @@ class FLoc(Task):
             yield True
 
 
+def _clean_path(path):
+    return op.realpath(path).replace('\\', '/')
+
+
+def build_floc_atlas(stimulus_folder, size=FLOC_STIMULI_SIZE):
+    """Decode and resize all the jpg of a stimulus folder into a single
+    uint8 array saved as .npy, so that it can be memory-mapped at setup."""
+    stimulus_files = sorted(glob(op.join(FLOC_STIMULI_DIR, stimulus_folder, '*.jpg')))
+    os.makedirs(FLOC_ATLAS_DIR, exist_ok=True)
+    with Image.open(stimulus_files[0]) as img:
+        mode = 'L' if img.mode == 'L' else 'RGB'
+    shape = (len(stimulus_files), size, size) + ((3,) if mode == 'RGB' else ())
+    pixels = np.lib.format.open_memmap(
+        op.join(FLOC_ATLAS_DIR, f"{stimulus_folder}.npy"),
+        mode='w+', dtype=np.uint8, shape=shape)
+    for stim_idx, stim_file in enumerate(stimulus_files):
+        with Image.open(stim_file) as img:
+            img = img.convert(mode).resize((size, size), Image.LANCZOS)
+            pixels[stim_idx] = np.asarray(img)
+    pixels.flush()
+    with open(op.join(FLOC_ATLAS_DIR, f"{stimulus_folder}.json"), 'w') as fo:
+        json.dump([op.basename(f) for f in stimulus_files], fo)
+
+
+def load_floc_atlas(stimulus_folder):
+    """Return memory-mapped pixels and file names of a stimulus folder, None
+    if the atlas was not built."""
+    atlas_file = op.join(FLOC_ATLAS_DIR, f"{stimulus_folder}.npy")
+    names_file = op.join(FLOC_ATLAS_DIR, f"{stimulus_folder}.json")
+    if not (op.exists(atlas_file) and op.exists(names_file)):
+        return None
+    with open(names_file, 'r') as fo:
+        names = json.load(fo)
+    return np.load(atlas_file, mmap_mode='r'), names
+
+
 def randomize_carefully(elems, n_repeat=2):
     """
     Shuffle without consecutive duplicates
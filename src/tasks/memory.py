@@ -2,7 +2,7 @@ import os, sys, time
 from psychopy import visual, core, data, logging
 from .task_base import Task
 
-from ..shared import config
+from ..shared import config, text_cache
 
 STIMULI_DURATION = 4
 BASELINE_BEGIN = 5
@@ -26,7 +26,7 @@ Try to remember the items and their location on the screen."""
         self.item_list = data.importConditions(items_list)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -34,11 +34,8 @@ Try to remember the items and their location on the screen."""
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
 
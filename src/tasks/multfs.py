@@ -8,7 +8,8 @@ from .task_base import Task
 from .task_base import Fixation
 #psychopy.useVersion('latest')
 
-from ..shared import config, utils
+from ..shared import config, utils, texture_cache, text_cache
+from ..shared.prefetch import ImagePrefetcher
 
 initial_wait = 6
 final_wait = 9
@@ -74,7 +75,7 @@ class multfs_base(Task):
             win = ctl_win
         else:
             win = exp_win
-        screen_text_bold = visual.TextStim(
+        screen_text_bold = text_cache.get_text_stim(
             win=exp_win,
             name='introtext',
             text=self.abbrev_instruction,
@@ -83,9 +84,8 @@ class multfs_base(Task):
             color="white", colorSpace='rgb', opacity=1,
             languageStyle='LTR',
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             win = exp_win,
             name = 'introtext',
             text=self.instruction,
@@ -94,7 +94,6 @@ class multfs_base(Task):
             color="white", colorSpace = 'rgb', opacity = 1,
             languageStyle = 'LTR',
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
 
         # -- prepare to start Routine "Intro" --
@@ -126,7 +125,6 @@ class multfs_base(Task):
             color="white", colorSpace='rgb', opacity=1,
             languageStyle='LTR',
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
         screen_text = visual.TextStim(
             win=exp_win,
@@ -137,7 +135,6 @@ class multfs_base(Task):
             color="white", colorSpace='rgb', opacity=1,
             languageStyle='LTR',
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
 
         # -- prepare to start Routine "Intro" --
@@ -172,7 +169,6 @@ class multfs_base(Task):
             color="white", colorSpace='rgb', opacity=1,
             languageStyle='LTR',
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
         utils.wait_until(self.task_timer, onset - 1./config.FRAME_RATE)
         # -- prepare to start Routine "Intro" --
@@ -186,6 +182,23 @@ class multfs_base(Task):
         )
         yield True
 
+    def _stimulus_path(self, trial, n_stim):
+        return IMAGES_FOLDER + "/" + str(trial["ref%s" % str(n_stim+1)]) + "/image.png"
+
+    def _init_prefetcher(self):
+        # trials presentation order is drawn by the TrialHandler on creation
+        trials_order = self.trials.sequenceIndices[:, 0][:self.n_blocks * self.n_trials]
+        self._prefetcher = ImagePrefetcher(
+            self._stimulus_path(self.item_list[trial_idx], n_stim)
+            for trial_idx in trials_order
+            for n_stim in range(self.seq_len)
+        )
+
+    def _stop(self, exp_win, ctl_win):
+        if hasattr(self, '_prefetcher'):
+            self._prefetcher.shutdown()
+        yield True
+
     def _save(self):
         if hasattr(self, 'trials'):
             self.trials.saveAsWideText(self._generate_unique_filename("events", "tsv"))
@@ -196,13 +209,13 @@ class multfs_base(Task):
         self.fixation.draw()
         yield True
         self.trials = data.TrialHandler(self.item_list, 1, method=self._trial_sampling_method)
+        self._init_prefetcher()
+        stim_idx = 0
         exp_win.logOnFlip(
             level=logging.EXP, msg=f"memory: {self.name} starting"
         )
         n_blocks = self.n_blocks # TODO: CHANGE THE NUMBER OF BLOCKS PER TASK VARIATION
 
-        img = visual.ImageStim(exp_win, size=STIMULI_SIZE, units="norm", flipHoriz=config.MIRROR_X)
-
         for block in range(n_blocks):
             onset = (
                 initial_wait +
@@ -215,6 +228,7 @@ class multfs_base(Task):
             for trial in self.trials:
                 exp_win.logOnFlip(level=logging.EXP, msg=f"{self.name}_{self.feature}: block {block} trial {trial_idx}")
                 trial_idx += 1
+                prefetch_hits = 0
 
                 for n_stim in range(self.seq_len):
 
@@ -226,7 +240,17 @@ class multfs_base(Task):
                         n_stim*STIMULI_DURATION + sum(self.trial_isis[:n_stim])
                         )
 
-                    img.image = IMAGES_FOLDER + "/" + str(trial["ref%s" % str(n_stim+1)]) + "/image.png"
+                    # images are reused across trials: share their textures
+                    image, hit = self._prefetcher.get(stim_idx)
+                    prefetch_hits += hit
+                    stim_idx += 1
+                    img = texture_cache.get_image_stim(
+                        exp_win,
+                        self._stimulus_path(trial, n_stim),
+                        image=image,
+                        size=STIMULI_SIZE,
+                        units="norm",
+                    )
                     if not 'interdms' in self.name:
                         img.pos = triplet_id_to_pos[trial[f"loc{n_stim+1}"]]
                     else:
@@ -275,6 +299,9 @@ class multfs_base(Task):
                             self.trials.addData("all_responses_%d" % n_stim, multfs_answer_keys)
 
 
+                self.trials.addData("prefetch_hits", prefetch_hits)
+                self.trials.addData("prefetch_misses", self.seq_len - prefetch_hits)
+
                 utils.wait_until(self.task_timer, onset + STIMULI_DURATION + self.trial_isis[-1] - 9./config.FRAME_RATE)
                 yield True
 
@@ -6,8 +6,9 @@ import sounddevice as sd
 sd.default.device = (None, 3)
 
 from .task_base import Task
-from ..shared import config, utils
+from ..shared import config, utils, text_cache
 from ..shared.eyetracking import fixation_dot
+from ..shared.questionnaire import LabeledScale
 
 #task : 1 run = 1 playlist = around 10 audio tracks
 #repeat for n songs in subXX_runXX.csv :
@@ -66,7 +67,7 @@ class Playlist(Task):
         self._progress_bar_refresh_rate = None
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -98,127 +99,27 @@ class Playlist(Task):
     def _handle_controller_presses(self):
         self._new_key_pressed = event.getKeys('lra')
 
+    def _log_answer(self, event):
+        # events keep their previous fields, value changes are not logged
+        if event["trial_type"] == "questionnaire-answer":
+            self._events.append({
+                key: event[key] for key in ["track", "question", "value", "confirmation"]})
+
     def _questionnaire(self, exp_win, ctl_win, question, answers):
         event.getKeys('lra') # flush keys
-        n_pts = len(answers)
-        legends = []
-        default_response = n_pts // 2
-        response = default_response
-
         exp_win.setColor([0] * 3, colorSpace='rgb')
-        win_width = exp_win.size[0]
-        y_spacing=80
-        scales_block_x = win_width * 0.25
-        scales_block_y = exp_win.size[1] * 0.1
-        extent = win_width * 0.2
-        x_spacing= (scales_block_x  + extent) * 2 / (n_pts - 1)
-        y_pos = scales_block_y - y_spacing
-
-        #----------setup-Questionnaire-------------------------
-        line = visual.Line(
-                exp_win,
-                (-(scales_block_x + extent), y_pos),
-                (scales_block_x + extent, y_pos),
-                units="pix",
-                lineWidth=6,
-                autoLog=False,
-                lineColor=(-1, -1, -1)
-            )
-
-        bullets = [
-                visual.Circle(
-                    exp_win,
-                    units="pix",
-                    radius=10,
-                    pos=(
-                        - (scales_block_x + extent) + i * x_spacing,
-                        y_pos,
-                        ),
-                    fillColor= (1, 1, 1) if default_response == i else (-1, -1, -1),
-                    lineColor=(-1, -1, -1),
-                    lineWidth=10,
-                    autoLog=False,
-                )
-                for i in range(n_pts)
-            ]
-
-        legends = [
-            visual.TextStim(
-                exp_win,
-                text = answer,
-                units="pix",
-                pos=(-(scales_block_x + extent) + i * x_spacing, exp_win.size[1] * 0.1),
-                wrapWidth= win_width * 0.12,
-                height= y_spacing / 4.5,
-                anchorHoriz="center",
-                alignText="center",
-                bold=True
-            )
-            for i, answer in enumerate(answers)
-        ]
-
-        text = visual.TextStim(
-            exp_win,
-            text = question,
-            units="pix",
-
-            pos=(-(scales_block_x + extent),
-                    y_pos + exp_win.size[1] * 0.30),
-            wrapWidth= win_width-(win_width*0.1),
-            height= y_spacing / 3,
-            anchorHoriz="left",
-            alignText="left"
-        )
-        #---run-Questionnaire--------------------------------------
-        n_flips = 0
-        for _ in utils.wait_until_yield(
-            self.task_timer,
-            self.task_timer.getTime() + self.question_duration,
-            keyboard_accuracy=.0001):
 
+        def get_keys():
             self._handle_controller_presses()
-            new_key_pressed = [k[0] for k in self._new_key_pressed]
-
-            if "r" in new_key_pressed and response < n_pts - 1:
-                response += 1
-            elif "l" in new_key_pressed and response > 0:
-                response -= 1
-            elif "a" in new_key_pressed:
-                self._events.append({
-                    "track": self.track_name,
-                    "question": question,
-                    "value": response,
-                    "confirmation": "yes"
-                })
-                break
-
-            elif n_flips > 1:
-                time.sleep(.01)
-                continue
-
-            exp_win.logOnFlip(
-                level=logging.EXP,
-                msg="questions %s" % response)
-
-            for bullet_n, bullet in enumerate(bullets):
-                bullet.fillColor = (1, 1, 1) if response == bullet_n else (-1, -1, -1)
-
-            line.draw(exp_win)
-            text.draw(exp_win)
-            for legend, bullet in zip(legends, bullets):
-                legend.draw(exp_win)
-                bullet.draw(exp_win)
+            return [k[0] for k in self._new_key_pressed]
 
-            yield True
-            n_flips += 1
-
-        else:
-            self._events.append({
-                    "track": self.track_name,
-                    "question": question,
-                    "value": response,
-                    "confirmation": "no"})
-            pass
+        yield from LabeledScale(
+            exp_win,
+            question,
+            answers,
+            self._log_answer,
+            event_fields={"track": self.track_name},
+        ).run(get_keys, clock=self.task_timer, timeout=self.question_duration)
 
         #Flush questionnaire from screen
         yield True
@@ -4,8 +4,9 @@ import pandas
 from .task_base import Task
 from colorama import Fore
 
-from ..shared import config, utils
+from ..shared import config, utils, text_cache
 from ..shared.eyetracking import fixation_dot
+from ..shared.questionnaire import LikertQuestionnaire
 
 INSTRUCTION_DURATION = 4
 
@@ -20,7 +21,7 @@ class SoundTaskBase(Task):
             raise ValueError("File %s does not exists" % sound_file)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -110,7 +111,7 @@ class AudioRecording(Task):
 
         self._pyaudio_if = pyaudio.PyAudio()
 
-        self.screen_text = visual.TextStim(
+        self.screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -121,7 +122,7 @@ class AudioRecording(Task):
 
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -300,7 +301,7 @@ Use up/down buttons to answer.
         self.trials = data.TrialHandler(self.design, 1, method="random")
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -438,144 +439,13 @@ Use up/down buttons to answer.
         if questions is None:
             return
         exp_win.setColor([0] * 3, colorSpace='rgb')
-        lines = []
-        bullets = []
-        responses = []
-        texts = []
-        legends = []
-        y_spacing = 80
-        win_width = exp_win.size[0]
-        scales_block_x = win_width * 0.25
-        scales_block_y = len(questions) // 2 * y_spacing
-        extent = win_width * 0.2
-
-        # add legends to Likert scale
-        legends.append(visual.TextStim(
-            exp_win,
-            text = 'Disagree',
-            units="pix",
-            pos=(scales_block_x - extent*0.75, scales_block_y*1.4),
-            wrapWidth= win_width * 0.5,
-            height= y_spacing / 3,
-            anchorHoriz="right",
-            alignText="right",
-            bold=True
-        ))
-        legends.append(visual.TextStim(
-            exp_win,
-            text = 'Agree',
-            units="pix",
-            pos=(scales_block_x + extent*1.15, scales_block_y*1.4),
-            wrapWidth= win_width * 0.5,
-            height= y_spacing / 3,
-            anchorHoriz="right",
-            alignText="right",
-            bold=True
-        ))
-
-
-        active_question = 0
-
-        # create all stimuli
-        #all_questions_text = ""
-        for q_n, (key, question, n_pts) in enumerate(questions):
-            default_response = n_pts // 2
-            responses.append(default_response)
-            x_spacing = extent * 2 / (n_pts - 1)
-            #all_questions_text += question + "\n\n"
-
-            y_pos = scales_block_y - q_n * y_spacing
-
-            lines.append(
-                visual.Line(
-                    exp_win,
-                    (scales_block_x - extent, y_pos),
-                    (scales_block_x + extent, y_pos),
-                    units="pix",
-                    lineWidth=6,
-                    autoLog=False,
-                    lineColor=(0, -1, -1) if q_n == 0 else (-1, -1, -1),
-                )
-            )
-            bullets.append(
-                [
-                    visual.Circle(
-                        exp_win,
-                        units="pix",
-                        radius=10,
-                        pos=(
-                            scales_block_x - extent + i * x_spacing,
-                            y_pos,
-                        ),
-                        fillColor= (1, 1, 1) if default_response == i else (-1, -1, -1),
-                        lineColor=(-1, -1, -1),
-                        lineWidth=10,
-                        autoLog=False,
-                    )
-                    for i in range(n_pts)
-                ]
-            )
-            texts.append(visual.TextStim(
-                exp_win,
-                text = question,
-                units="pix",
-                bold = q_n == active_question,
-                pos=(0, y_pos),
-                wrapWidth= win_width * 0.5,
-                height= y_spacing / 3,
-                anchorHoriz="right",
-                alignText="right"
-            ))
-            responses[q_n] = default_response
-
-
-
-        # questionnaire interaction loop
-        n_flips = 0
-        while True:
+
+        def get_keys():
             self._handle_controller_presses(exp_win)
-            new_key_pressed = [k[0] for k in self._new_key_pressed]
-            if "u" in new_key_pressed and active_question > 0:
-                active_question -= 1
-            elif "d" in new_key_pressed and active_question < len(questions)-1:
-                active_question += 1
-            elif "r" in new_key_pressed and responses[active_question] < n_pts - 1:
-                responses[active_question] += 1
-            elif "l" in new_key_pressed and responses[active_question] > 0:
-                responses[active_question] -= 1
-            elif "a" in new_key_pressed:
-                for (key, question, n_pts), value in zip(questions, responses):
-                    self._log_event({
-                        "trial_type": "questionnaire-answer",
-                        "question": key,
-                        "value": value
-                    })
-                break
-            elif n_flips > 1:
-                time.sleep(.01)
-                continue
-
-            if n_flips > 0: #avoid double log when first loading questionnaire
-                self._log_event({
-                    "trial_type": "questionnaire-value-change",
-                    "question": questions[active_question][0],
-                    "value": responses[active_question]
-                })
-
-            exp_win.logOnFlip(
-                level=logging.EXP,
-                msg="questions %s" % responses)
-            for q_n, (txt, line, bullet_q) in enumerate(zip(texts, lines, bullets)):
-                #txt.bold = q_n == active_question
-                txt._pygletTextObj.set_style('bold', q_n == active_question)
-                line.lineColor = (0, -1, -1) if q_n == active_question else (-1, -1, -1)
-                for bullet_n, bullet in enumerate(bullet_q):
-                    bullet.fillColor = (1, 1, 1) if responses[q_n] == bullet_n else (-1, -1, -1)
-
-            for stim in lines + sum(bullets, []) + texts + legends:
-                stim.draw(exp_win)
-            yield True
-            n_flips += 1
+            return [k[0] for k in self._new_key_pressed]
+
+        yield from LikertQuestionnaire(
+            exp_win, questions, self._log_event, legends_y=1.4).run(get_keys)
 
 
     def _save(self):
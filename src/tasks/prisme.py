@@ -4,7 +4,8 @@ from .task_base import Task
 import numpy as np
 from colorama import Fore
 
-from ..shared import config, utils
+from ..shared import config, utils, text_cache
+from ..shared.prefetch import ImageStimStream
 
 RESPONSE_KEY = "d"
 RESPONSE_TIME = 2.49*2
@@ -36,21 +37,14 @@ class Prisme(Task):
             units='deg',
         )
 
-        # preload all images
-        self._stimuli = []
-        for trial in self.design:
-            self._stimuli.append(visual.ImageStim(
-                exp_win, os.path.join(self.images_path, trial["image_path"]),
-                size=10,
-                units='deg',
-            ))
+        self._init_stimuli(exp_win)
         self.trials = data.TrialHandler(self.design, 1, method="sequential")
         self.duration = len(self.design)
         self._progress_bar_refresh_rate = 2  # 2 flips per trial
         super()._setup(exp_win)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -58,11 +52,8 @@ class Prisme(Task):
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
 
@@ -75,7 +66,8 @@ class Prisme(Task):
         yield True
 
         last_type = 'none'
-        for trial_n, (trial, stimuli) in enumerate(zip(self.trials, self._stimuli)):
+        for trial_n, trial in enumerate(self.trials):
+            stimuli = self._stimuli.get(trial_n)
             # If there is a transition
             transition = None
             type = "shown" if trial['condition'] == "shown" else "test"
@@ -98,11 +90,8 @@ class Prisme(Task):
                     wrapWidth=config.WRAP_WIDTH,
                 )
 
-                for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-                    screen_text.draw(exp_win)
-                    if ctl_win:
-                        screen_text.draw(ctl_win)
-                    yield frameN < 3
+                yield from self._static_frames(
+                    exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
                 yield True
 
             if isDisplayTask:
@@ -164,6 +153,10 @@ class Prisme(Task):
                 trial["onset_flip"] = (
                     self._exp_win_last_flip_time - self._exp_win_first_flip_time
                 )
+                # the image stays on screen without redraw until the next
+                # trial, recycle its texture now rather than before that onset
+                self._stimuli.release(trial_n)
+                self._stimuli.fill()
                 # no fixation cross only
 
                 # 3. wait for 5s
@@ -181,16 +174,35 @@ class Prisme(Task):
                 )
                 trial["duration_flip"] = trial["offset_flip"] - trial["onset_flip"]
 
+            # recycle the texture for an upcoming trial, already done for
+            # test trials
+            self._stimuli.release(trial_n)
+            self._stimuli.fill()
+
         utils.wait_until(self.task_timer, trial["onset"] + RESPONSE_TIME + FINAL_WAIT)
 
+    def _init_stimuli(self, exp_win):
+        # stream images, only keeping the textures of the upcoming trials
+        self._stimuli = ImageStimStream(
+            exp_win,
+            [os.path.join(self.images_path, trial["image_path"]) for trial in self.design],
+            onsets=[trial["onset"] for trial in self.design],
+            size=10,
+            units='deg',
+        )
+
     def _restart(self):
         self.trials = data.TrialHandler(self.design, 1, method="sequential")
+        win = self._stimuli.win
+        self._stimuli.close()
+        self._init_stimuli(win)
 
     def _save(self):
         self.trials.saveAsWideText(self._generate_unique_filename("events", "tsv"))
         return False
 
     def unload(self):
+        self._stimuli.close()
         del self._stimuli
 
 
@@ -219,7 +231,7 @@ The button mapping will change from trial to trial as indicated at the center of
     RESPONSE_VALUES = np.asarray([[2,1],[-2,-1]])
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -227,13 +239,16 @@ The button mapping will change from trial to trial as indicated at the center of
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield frameN < 3
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
         yield True
-        screen_text.text = self.EXTRA_INSTRUCTION
+        screen_text = text_cache.get_text_stim(
+            exp_win,
+            text=self.EXTRA_INSTRUCTION,
+            alignText="center",
+            color="white",
+            wrapWidth=config.WRAP_WIDTH,
+        )
         if self.run_id == 1:
             for  frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION * 2):
                 screen_text.draw(exp_win)
@@ -263,7 +278,8 @@ The button mapping will change from trial to trial as indicated at the center of
             self.fixation_cross.draw(ctl_win)
         yield True
 
-        for trial_n, (trial, stimuli) in enumerate(zip(self.trials, self._stimuli)):
+        for trial_n, trial in enumerate(self.trials):
+            stimuli = self._stimuli.get(trial_n)
             exp_win.logOnFlip(
                 level=logging.EXP,
                 msg=f"image: {trial['condition']}:{trial['image_path']}",
@@ -299,6 +315,9 @@ The button mapping will change from trial to trial as indicated at the center of
             trial["offset_flip"] = (
                 self._exp_win_last_flip_time - self._exp_win_first_flip_time
             )
+            # recycle the texture for an upcoming trial
+            self._stimuli.release(trial_n)
+            self._stimuli.fill()
 
             utils.wait_until(self.task_timer, trial["onset"] + RESPONSE_TIME - 1 / config.FRAME_RATE)
 
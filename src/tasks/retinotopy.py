@@ -1,15 +1,417 @@
-import os, sys, time, random
+import os, sys, time, random, json, hashlib
+import pyglet.gl as GL
 from psychopy import visual, core, data, logging, event
+from psychopy.tools import gltools
+from psychopy.tools.monitorunittools import convertToPix
 from .task_base import Task
 import numpy as np
 from colorama import Fore
 import pandas
 
-from ..shared import config, utils
-
+from ..shared import config, utils, text_cache
+
+
+APERTURES_CACHE_DIR = 'data/retinotopy/apertures_cache'
+APERTURE_RESOLUTION = 768
+APERTURE_FRAME_RATE = 15
+# ring and bar sweeps (s) are shorter than a cycle, leaving a blank
+SWEEP_DURATION = 28
+SWEEP_FRAMES = SWEEP_DURATION * APERTURE_FRAME_RATE
+WEDGE_WIDTH = 90 # degrees of polar angle
+RING_WIDTH = .5 # ratio of ring width to its inner eccentricity
+RING_MIN_ECCENTRICITY = .05
+BAR_WIDTH = .25 # ratio of the aperture diameter
+BAR_ANGLES = (0, 90, 45, 135)
+APERTURES_CHUNK = 32 # frames generated at once
+# part of the cache key, to be incremented when generated frames change
+APERTURES_GENERATOR_VERSION = 1
+# aperture files found identical to generated ones by utils/check_retinotopy_apertures.py
+APERTURES_VERIFIED_FILE = os.path.join(APERTURES_CACHE_DIR, 'verified.json')
+
+
+def _polar_grid(resolution):
+    """Eccentricity (1 at the aperture border) and polar angle of pixels."""
+    coords = (np.arange(resolution, dtype=np.float32) + .5) / resolution * 2 - 1
+    x, y = np.meshgrid(coords, coords)
+    return np.hypot(x, y), np.arctan2(y, x), x, y
+
+
+def _aperture_frames(kind, n_frames, resolution, frame_range, params):
+    ecc, angle, x, y = (a[np.newaxis] for a in _polar_grid(resolution))
+    phase = (np.arange(*frame_range, dtype=np.float32) % n_frames / n_frames)[:, np.newaxis, np.newaxis]
+    if kind == 'wedge':
+        half_width = np.deg2rad(params['wedge_width']) / 2
+        dist = np.abs((angle - 2 * np.pi * phase + np.pi) % (2 * np.pi) - np.pi)
+        inside = dist <= half_width
+    elif kind == 'ring':
+        # ring expands log-linearly, from the center until it exits the field
+        min_ecc, width = params['ring_min_eccentricity'], params['ring_width']
+        outer = np.exp(np.log(min_ecc) + phase * (np.log(1 + width) - np.log(min_ecc)))
+        inside = (ecc >= outer / (1 + width)) & (ecc < outer)
+    elif kind == 'bars':
+        direction = np.arange(*frame_range) // n_frames
+        theta = np.deg2rad(np.asarray(params['bar_angles'], dtype=np.float32)[direction])
+        theta = theta[:, np.newaxis, np.newaxis]
+        half_width = params['bar_width']
+        position = -1 - half_width + phase * 2 * (1 + half_width)
+        inside = np.abs(x * np.cos(theta) + y * np.sin(theta) - position) <= half_width
+    else:
+        raise ValueError(f"unknown aperture kind {kind}")
+    return ((inside & (ecc <= 1)) * 255).astype(np.uint8)
+
+
+def _aperture_params(params):
+    return {
+        'wedge_width': WEDGE_WIDTH,
+        'ring_width': RING_WIDTH,
+        'ring_min_eccentricity': RING_MIN_ECCENTRICITY,
+        'bar_width': BAR_WIDTH,
+        'bar_angles': list(BAR_ANGLES),
+        **params,
+    }
+
+
+def generate_apertures(kind, cycle_duration, frame_rate=APERTURE_FRAME_RATE,
+                       resolution=APERTURE_RESOLUTION, **params):
+    """Generate uint8 apertures (frames, resolution, resolution) for one
+    cycle of `kind` in (wedge, ring, bars), bars including all directions.
+
+    Results are cached on disk keyed by parameters and generator version,
+    and memory-mapped.
+    """
+    params = _aperture_params(params)
+    n_frames = int(cycle_duration * frame_rate)
+    n_cycles = len(params['bar_angles']) if kind == 'bars' else 1
+    key = json.dumps(
+        [APERTURES_GENERATOR_VERSION, kind, n_frames, resolution, params], sort_keys=True)
+    cache_file = os.path.join(
+        APERTURES_CACHE_DIR,
+        f"{kind}_{hashlib.sha1(key.encode()).hexdigest()[:12]}.npy")
+    if os.path.exists(cache_file):
+        return np.load(cache_file, mmap_mode='r')
+
+    logging.info(f"generating {kind} apertures in {cache_file}")
+    os.makedirs(APERTURES_CACHE_DIR, exist_ok=True)
+    tmp_file = cache_file + '.tmp.npy'
+    out = np.lib.format.open_memmap(
+        tmp_file, mode='w+', dtype=np.uint8,
+        shape=(n_frames * n_cycles, resolution, resolution))
+    for start in range(0, len(out), APERTURES_CHUNK):
+        stop = min(start + APERTURES_CHUNK, len(out))
+        out[start:stop] = _aperture_frames(kind, n_frames, resolution, (start, stop), params)
+    out.flush()
+    del out
+    os.replace(tmp_file, cache_file)
+    return np.load(cache_file, mmap_mode='r')
+
+
+def _frames_file(npz_file):
+    return os.path.splitext(os.path.normpath(npz_file))[0] + '.npy'
+
+
+def convert_frames(npz_file, key):
+    """Save array `key` of `npz_file` as a frame-major uint8 .npy next to it."""
+    frames = np.load(npz_file)[key]
+    if frames.dtype != np.uint8:
+        raise ValueError(f"{npz_file}: expected uint8 {key}, got {frames.dtype}")
+    frames = np.moveaxis(frames, -1, 0)
+    out = np.lib.format.open_memmap(
+        _frames_file(npz_file), mode='w+', dtype=np.uint8, shape=frames.shape)
+    out[:] = frames
+    out.flush()
+    return out.filename
+
+
+def _apertures_signature(aperture_file):
+    npy_file = _frames_file(aperture_file)
+    path = npy_file if os.path.exists(npy_file) else os.path.normpath(aperture_file)
+    stat = os.stat(path)
+    return {
+        'file': path,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'generator_version': APERTURES_GENERATOR_VERSION}
+
+
+def _load_verified_apertures():
+    if not os.path.exists(APERTURES_VERIFIED_FILE):
+        return []
+    with open(APERTURES_VERIFIED_FILE) as fd:
+        return json.load(fd)
+
+
+def apertures_verified(aperture_file):
+    """Whether utils/check_retinotopy_apertures.py found the current
+    generator to reproduce `aperture_file` as it is on disk."""
+    return _apertures_signature(aperture_file) in _load_verified_apertures()
+
+
+def mark_apertures_verified(aperture_file):
+    verified = _load_verified_apertures()
+    signature = _apertures_signature(aperture_file)
+    if signature not in verified:
+        os.makedirs(APERTURES_CACHE_DIR, exist_ok=True)
+        with open(APERTURES_VERIFIED_FILE, 'w') as fd:
+            json.dump(verified + [signature], fd, indent=1)
+
+
+def load_frames(npz_file, key):
+    """Return frames (first axis) as uint8, memory-mapped if converted."""
+    npy_file = _frames_file(npz_file)
+    if os.path.exists(npy_file):
+        return np.load(npy_file, mmap_mode='r')
+    logging.warning(f"{npy_file} not found, loading {npz_file} in memory")
+    return np.moveaxis(np.load(npz_file)[key], -1, 0)
+
+
+APERTURE_VERTEX_SHADER = """
+#version 120
+void main() {
+    gl_TexCoord[0] = gl_MultiTexCoord0;
+    gl_Position = ftransform();
+}
+"""
+
+# renders as an ImageStim with image=images/255. and mask=apertures/128.-1,
+# ring and bar apertures are computed as in _aperture_frames on the same
+# pixel grid, from the sweep phase and parameters
+APERTURE_FRAGMENT_SHADER = """
+#version 120
+#extension GL_EXT_texture_array : enable
+uniform sampler2DArray images;
+uniform sampler2DArray apertures;
+uniform float image_idx;
+uniform float aperture_idx;
+uniform int aperture_kind; // 0: texture, 1: ring, 2: bar
+uniform float aperture_resolution;
+uniform float aperture_phase;
+uniform vec3 aperture_params; // ring: min ecc, width; bar: half width, cos, sin
+float aperture_mask() {
+    if (aperture_kind == 0)
+        return texture2DArray(apertures, vec3(gl_TexCoord[0].st, aperture_idx)).r;
+    vec2 xy = (floor(gl_TexCoord[0].st * aperture_resolution) + 0.5) / aperture_resolution * 2.0 - 1.0;
+    float ecc = length(xy);
+    bool inside;
+    if (aperture_kind == 1) {
+        float min_ecc = aperture_params.x;
+        float width = aperture_params.y;
+        float outer = exp(log(min_ecc) + aperture_phase * (log(1.0 + width) - log(min_ecc)));
+        inside = ecc >= outer / (1.0 + width) && ecc < outer;
+    } else {
+        float half_width = aperture_params.x;
+        float position = -1.0 - half_width + aperture_phase * 2.0 * (1.0 + half_width);
+        inside = abs(dot(xy, aperture_params.yz) - position) <= half_width;
+    }
+    return (inside && ecc <= 1.0) ? 1.0 : 0.0;
+}
+void main() {
+    vec3 rgb = texture2DArray(images, vec3(gl_TexCoord[0].st, image_idx)).rgb;
+    gl_FragColor = vec4((rgb + 1.0) / 2.0, aperture_mask() * 255.0 / 256.0);
+}
+"""
+
+_PROCEDURAL_APERTURE_KINDS = {'ring': 1, 'bars': 2}
+
+_TEXTURE_FORMATS = {3: (GL.GL_LUMINANCE8, GL.GL_LUMINANCE), 4: (GL.GL_RGB8, GL.GL_RGB)}
+
+
+# frames kept resident on the GPU above this size are streamed instead
+TEXTURE_ARRAY_MAX_BYTES = 512 * 2 ** 20
+
+
+def _max_texture_layers():
+    max_layers = GL.GLint()
+    GL.glGetIntegerv(GL.GL_MAX_ARRAY_TEXTURE_LAYERS, max_layers)
+    return max_layers.value
+
+
+def _create_texture_array(frames):
+    internal_format, pixel_format = _TEXTURE_FORMATS[frames.ndim]
+    frames = np.ascontiguousarray(frames, dtype=np.uint8)
+    tex_id = GL.GLuint()
+    GL.glGenTextures(1, tex_id)
+    GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, tex_id)
+    GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+    GL.glTexImage3D(
+        GL.GL_TEXTURE_2D_ARRAY, 0, internal_format,
+        frames.shape[2], frames.shape[1], frames.shape[0], 0,
+        pixel_format, GL.GL_UNSIGNED_BYTE, frames.ctypes.data)
+    for param, value in [
+        (GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR),
+        (GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR),
+        (GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE),
+        (GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)]:
+        GL.glTexParameteri(GL.GL_TEXTURE_2D_ARRAY, param, value)
+    GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, 0)
+    return tex_id
+
+
+class TextureFrames(object):
+    """uint8 frames (n, h, w[, 3]) sampled as layers of 2D texture arrays.
+
+    Frames are uploaded once, split across several arrays if above the GL
+    layers limit. Above TEXTURE_ARRAY_MAX_BYTES, only the displayed frame is
+    kept in a single layer array, updated when the displayed frame changes.
+    """
+
+    def __init__(self, frames):
+        self._frames = frames
+        self.streamed = frames.nbytes > TEXTURE_ARRAY_MAX_BYTES
+        if self.streamed:
+            logging.info(f"streaming {len(frames)} frames ({frames.nbytes / 2**20:.0f}MB)")
+            self._chunk_size = 1
+            self._textures = [_create_texture_array(frames[:1])]
+            self._streamed_idx = None
+        else:
+            self._chunk_size = _max_texture_layers()
+            self._textures = [
+                _create_texture_array(frames[start:start + self._chunk_size])
+                for start in range(0, len(frames), self._chunk_size)]
+
+    def bind(self, idx):
+        """Bind the array holding frame `idx` to the active texture unit,
+        return the layer of the frame."""
+        idx = int(idx)
+        if self.streamed:
+            GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, self._textures[0])
+            if idx != self._streamed_idx:
+                frame = np.ascontiguousarray(self._frames[idx])
+                _, pixel_format = _TEXTURE_FORMATS[frame.ndim + 1]
+                GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+                GL.glTexSubImage3D(
+                    GL.GL_TEXTURE_2D_ARRAY, 0, 0, 0, 0,
+                    frame.shape[1], frame.shape[0], 1,
+                    pixel_format, GL.GL_UNSIGNED_BYTE, frame.ctypes.data)
+                self._streamed_idx = idx
+            return 0
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, self._textures[idx // self._chunk_size])
+        return idx % self._chunk_size
+
+    def clear(self):
+        GL.glDeleteTextures(
+            len(self._textures), (GL.GLuint * len(self._textures))(*self._textures))
+
+
+class ProceduralApertures(object):
+    """Ring or bar apertures computed in the fragment shader, matching the
+    frames of generate_apertures without any texture upload."""
+
+    def __init__(self, kind, cycle_duration, frame_rate=APERTURE_FRAME_RATE,
+                 resolution=APERTURE_RESOLUTION, **params):
+        if kind not in _PROCEDURAL_APERTURE_KINDS:
+            raise ValueError(f"no procedural {kind} apertures")
+        self.kind = kind
+        self.resolution = resolution
+        self.params = _aperture_params(params)
+        self.n_frames = int(cycle_duration * frame_rate)
+        self._n_cycles = len(self.params['bar_angles']) if kind == 'bars' else 1
+
+    def __len__(self):
+        return self.n_frames * self._n_cycles
+
+    def uniforms(self, idx):
+        """Return kind, phase and parameters of frame `idx` for the shader."""
+        idx = int(idx)
+        phase = np.float32(idx % self.n_frames) / np.float32(self.n_frames)
+        if self.kind == 'ring':
+            params = (self.params['ring_min_eccentricity'], self.params['ring_width'], 0)
+        else:
+            theta = np.deg2rad(np.float32(self.params['bar_angles'][idx // self.n_frames]))
+            params = (self.params['bar_width'], np.cos(theta), np.sin(theta))
+        return _PROCEDURAL_APERTURE_KINDS[self.kind], float(phase), [float(p) for p in params]
+
+
+class ApertureArrayStim(object):
+    """Images seen through apertures, both kept on the GPU as texture arrays.
+
+    The displayed image and aperture are selected by setting `image_idx`
+    and `aperture_idx`, which only updates shader uniforms at draw time
+    (see TextureFrames for frames that do not fit on the GPU).
+    `apertures` can also be ProceduralApertures, computed in the shader.
+    """
+
+    def __init__(self, win, images, apertures, size, units='deg', flipVert=False):
+        win._setCurrent()
+        self._images = TextureFrames(images)
+        if isinstance(apertures, ProceduralApertures):
+            self._procedural_apertures = apertures
+            self._apertures = None
+        else:
+            self._procedural_apertures = None
+            self._apertures = TextureFrames(apertures)
+
+        self._program = gltools.createProgram()
+        self._shaders = [
+            gltools.compileShader(APERTURE_VERTEX_SHADER, GL.GL_VERTEX_SHADER),
+            gltools.compileShader(APERTURE_FRAGMENT_SHADER, GL.GL_FRAGMENT_SHADER)]
+        for shader in self._shaders:
+            gltools.attachShader(self._program, shader)
+        gltools.linkProgram(self._program)
+        self._uniforms = {
+            name: GL.glGetUniformLocation(self._program, name.encode())
+            for name in [
+                'images', 'apertures', 'image_idx', 'aperture_idx', 'aperture_kind',
+                'aperture_resolution', 'aperture_phase', 'aperture_params']}
+        GL.glUseProgram(self._program)
+        GL.glUniform1i(self._uniforms['images'], 0)
+        GL.glUniform1i(self._uniforms['apertures'], 1)
+        GL.glUniform1i(self._uniforms['aperture_kind'], 0)
+        if self._procedural_apertures is not None:
+            GL.glUniform1f(
+                self._uniforms['aperture_resolution'], self._procedural_apertures.resolution)
+        GL.glUseProgram(0)
+
+        half_w, half_h = convertToPix(
+            np.array([size, size]) / 2., (0, 0), units, win)
+        # numpy rows are displayed bottom to top unless flipped
+        t0, t1 = (1, 0) if flipVert else (0, 1)
+        self._quad = [
+            ((0, t0), (-half_w, -half_h)),
+            ((1, t0), (half_w, -half_h)),
+            ((1, t1), (half_w, half_h)),
+            ((0, t1), (-half_w, half_h))]
+
+        self.image_idx = 0
+        self.aperture_idx = 0
+        self.visible = False
+
+    def draw(self, win):
+        if not self.visible:
+            return
+        win._setCurrent()
+        GL.glPushMatrix()
+        win.setScale('pix')
+        GL.glUseProgram(self._program)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glUniform1f(self._uniforms['image_idx'], self._images.bind(self.image_idx))
+        if self._procedural_apertures is None:
+            GL.glActiveTexture(GL.GL_TEXTURE1)
+            GL.glUniform1f(self._uniforms['aperture_idx'], self._apertures.bind(self.aperture_idx))
+        else:
+            kind, phase, params = self._procedural_apertures.uniforms(self.aperture_idx)
+            GL.glUniform1i(self._uniforms['aperture_kind'], kind)
+            GL.glUniform1f(self._uniforms['aperture_phase'], phase)
+            GL.glUniform3f(self._uniforms['aperture_params'], *params)
+        GL.glBegin(GL.GL_QUADS)
+        for texcoord, vertex in self._quad:
+            GL.glTexCoord2f(*texcoord)
+            GL.glVertex2f(*vertex)
+        GL.glEnd()
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, 0)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D_ARRAY, 0)
+        GL.glUseProgram(0)
+        GL.glPopMatrix()
+
+    def clear(self):
+        self._images.clear()
+        if self._apertures is not None:
+            self._apertures.clear()
+        for shader in self._shaders:
+            gltools.detachShader(self._program, shader)
+            gltools.deleteObject(shader)
+        gltools.deleteObject(self._program)
 
-def generate_wedge():
-    pass
 
 class Retinotopy(Task):
 
@@ -60,25 +462,67 @@ class Retinotopy(Task):
             units='deg'
         )
 
-        self.img = visual.ImageStim(
-            exp_win,
-            name='texture',
-            size=10,
-            units='deg',
-            flipVert=True)
-
-        self._images = np.load(self._images_file)['images'].astype(np.float32)/255.
+        self._images = load_frames(self._images_file, 'images')
 
+        self.cycle_length = 21*config.TR # a bit less than 32s for TR=1.49
         if self.condition in ['RETCW', 'RETCCW', 'RETWEDGES']:
             aperture_file = 'apertures_wedge_newtr.npz'
+            aperture_kind, aperture_frames = 'wedge', int(self.cycle_length*15)
         elif self.condition in ['RETEXP', 'RETCON', 'RETRINGS']:
             aperture_file = '/apertures_ring.npz'
+            aperture_kind, aperture_frames = 'ring', SWEEP_FRAMES
         elif self.condition == 'RETBAR':
             self.ncycles = 8
             aperture_file =  'apertures_bars.npz'
-        self._apertures = np.load(f"data/retinotopy/{aperture_file}")['apertures'].astype(np.float32)/128.-1
+            aperture_kind, aperture_frames = 'bars', len(BAR_ANGLES) * SWEEP_FRAMES
+        aperture_file = f"data/retinotopy/{aperture_file}"
+        has_file = os.path.exists(_frames_file(aperture_file)) or os.path.exists(aperture_file)
+        procedural = aperture_kind in _PROCEDURAL_APERTURE_KINDS
+        self._apertures = None
+        if has_file and not procedural:
+            self._apertures = load_frames(aperture_file, 'apertures')
+        # saved in the events sidecar
+        self.sidecar['apertures'] = {
+            'kind': aperture_kind,
+            'source': aperture_file,
+            'generator_version': APERTURES_GENERATOR_VERSION}
+        if self._apertures is None or len(self._apertures) < aperture_frames:
+            # generated frames can only replace a file they were checked to reproduce
+            if has_file:
+                if not apertures_verified(aperture_file):
+                    raise RuntimeError(
+                        f"generated {aperture_kind} apertures were not checked against "
+                        f"{aperture_file}, run utils/check_retinotopy_apertures.py")
+                self.sidecar['apertures']['checked_against'] = aperture_file
+            else:
+                logging.warning(
+                    f"{aperture_file} not found, using generated {aperture_kind} "
+                    f"apertures (version {APERTURES_GENERATOR_VERSION})")
+            self.sidecar['apertures']['source'] = 'generated'
+            if procedural:
+                # ring and bar apertures (~1GB for bars) are computed in the
+                # shader rather than uploaded
+                self._apertures = ProceduralApertures(aperture_kind, SWEEP_DURATION)
+            else:
+                # no file made for that TR
+                self._apertures = generate_apertures(aperture_kind, self.cycle_length)
+
+        # draw random order with different successive stimuli
+        self._images_random = np.random.randint(0, len(self._images), size=(8*32*self._images_fps)) #max nframe in CW conditions
+        while any(np.ediff1d(self._images_random, to_begin=[-1])==0):
+            self._images_random[np.ediff1d(self._images_random, to_begin=[-1])==0] += 1
+            self._images_random[self._images_random==len(self._images)] = 0
+        # only the images drawn for this run are uploaded
+        self._images_used = np.unique(self._images_random)
+
+        self.img = ApertureArrayStim(
+            exp_win,
+            self._images[self._images_used],
+            self._apertures,
+            size=10,
+            units='deg',
+            flipVert=True)
 
-        self.cycle_length = 21*config.TR # a bit less than 32s for TR=1.49
         self.initial_wait = 16 # if self.condition == 'RETBAR' else 22
         self.middle_blank = 12 if self.condition in ['RETRINGS', 'RETWEDGES', 'RETBAR'] else 0
         self.duration = (
@@ -86,11 +530,6 @@ class Retinotopy(Task):
             + self.initial_wait * 2
             + self.middle_blank)
 
-        # draw random order with different successive stimuli
-        self._images_random = np.random.randint(0, self._images.shape[-1], size=(8*32*self._images_fps)) #max nframe in CW conditions
-        while any(np.ediff1d(self._images_random, to_begin=[-1])==0):
-            self._images_random[np.ediff1d(self._images_random, to_begin=[-1])==0] += 1
-            self._images_random[self._images_random==self._images.shape[-1]] = 0
 
         self._progress_bar_refresh_rate = False
 
@@ -98,7 +537,7 @@ class Retinotopy(Task):
         super()._setup(exp_win)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -106,11 +545,8 @@ class Retinotopy(Task):
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield frameN < 2
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
         yield True
 
     def _run(self, exp_win, ctl_win):
@@ -185,14 +621,19 @@ class Retinotopy(Task):
 
 
     def draw_img(self, exp_win, ctl_win):
-        if self.img.image is None:
-            return
         self.img.draw(exp_win)
         if ctl_win:
             self.img.draw(ctl_win)
 
     def reset_img(self):
-        self.img.image = None
+        self.img.visible = False
+
+    def set_image(self, image_idx):
+        self.img.image_idx = np.searchsorted(self._images_used, image_idx)
+        self.img.visible = True
+
+    def set_aperture(self, aperture_idx):
+        self.img.aperture_idx = aperture_idx
 
     def _run_condition(self, exp_win, ctl_win):
 
@@ -211,10 +652,10 @@ class Retinotopy(Task):
 
         if 'BAR' in self.condition:
             conds = np.asarray([0,1,0,1,2,3,2,3])
-            for ci, start_idx in enumerate(conds*28*15):
+            for ci, start_idx in enumerate(conds*SWEEP_FRAMES):
                 order = 1-(ci%4>1)*2
                 exp_win.timeOnFlip(self, '_cycle_start')
-                for fi, frame in enumerate(range(28*15)[::order]):
+                for fi, frame in enumerate(range(SWEEP_FRAMES)[::order]):
                     flip_time = (self.initial_wait + (ci>3) * self.middle_blank +
                         (ci*self.cycle_length*15+fi) * frame_duration
                         - 1/config.FRAME_RATE)
@@ -229,8 +670,8 @@ class Retinotopy(Task):
                     #flipHoriz = 1 - 2*(ci in [2])
                     if fi%(15//self._images_fps) == 0:
                         image_idx = self._images_random[ci*32*self._images_fps+fi//(15//self._images_fps)]
-                        self.img.image = self._images[..., image_idx]
-                    self.img.mask = self._apertures[..., start_idx+frame]
+                        self.set_image(image_idx)
+                    self.set_aperture(start_idx+frame)
 
                     exp_win.callOnFlip(
                         self._log_event,
@@ -256,7 +697,7 @@ class Retinotopy(Task):
             for ci, order in enumerate(orders):
                 display_length = (self.cycle_length
                     if self.condition in ['RETCW', 'RETCCW', 'RETWEDGES']
-                    else 28) # shorten next loop, adds 4s blank
+                    else SWEEP_DURATION) # shorten next loop, adds 4s blank
                 exp_win.timeOnFlip(self, '_cycle_start')
                 for fi, frame in enumerate(range(int(display_length*15))[::order]): # 32/28 sec at 15Hz
                     flip_time = (self.initial_wait +
@@ -271,9 +712,9 @@ class Retinotopy(Task):
 
                     if fi%(15//self._images_fps) == 0:
                         image_idx = self._images_random[ci*32*self._images_fps+fi//(15//self._images_fps)]
-                        self.img.image = self._images[..., image_idx]
+                        self.set_image(image_idx)
 
-                    self.img.mask = self._apertures[..., frame]
+                    self.set_aperture(frame)
 
                     exp_win.callOnFlip(
                         self._log_event,
@@ -302,5 +743,6 @@ class Retinotopy(Task):
             keyboard_accuracy=.001)
 
     def unload(self):
+        self.img.clear()
         del self._apertures, self._images
-        del self.img, self._images_random, self.fixation_dot
+        del self.img, self._images_random, self._images_used, self.fixation_dot
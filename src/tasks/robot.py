@@ -17,7 +17,7 @@ from pylsl import local_clock as lsl_local_clock
 from psychopy import visual, core, logging, event
 from ast import literal_eval
 from .task_base import Task
-from ..shared import config
+from ..shared import config, text_cache
 
 
 # keyset of the MRI controller :
@@ -203,7 +203,7 @@ class CozmoFirstTaskPsychoPy(CozmoBaseTask):
         self.cnter = 0
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -211,11 +211,8 @@ class CozmoFirstTaskPsychoPy(CozmoBaseTask):
             wrapWidth=1.2,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _setup(self, exp_win):
         self.controller.reset()
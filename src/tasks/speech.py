@@ -2,7 +2,7 @@ import os, sys, time
 from psychopy import visual, core, data, logging
 from .task_base import Task
 
-from ..shared import config
+from ..shared import config, text_cache
 
 STIMULI_DURATION = 4
 BASELINE_BEGIN = 5
@@ -23,7 +23,7 @@ class Speech(Task):
             raise ValueError("File %s does not exists" % words_file)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -31,11 +31,8 @@ class Speech(Task):
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
 
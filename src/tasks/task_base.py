@@ -1,16 +1,26 @@
 import os
 import tqdm
 import time
+import json
 import pandas
 from psychopy import logging, visual, core, event
 
-from ..shared import fmri, meg, eeg, config
+from ..shared import fmri, meg, eeg, config, text_cache, mirror
+
+
+# yielded by tasks when the scene is unchanged since the previous frame and
+# exp_win renders to an FBO (useFBO=True), which still holds that frame:
+# exp_win is flipped without clearing and the task does not need to redraw it.
+# The back buffer content after a swap is undefined, so frames cannot be
+# retained without FBO.
+RETAIN_FRAME = "retain"
 
 
 class Task(object):
 
     DEFAULT_INSTRUCTION = ""
     PROGRESS_BAR_FORMAT = '{l_bar}{bar}{r_bar}'
+    RETAIN_FRAME = RETAIN_FRAME
 
     def __init__(self, name, instruction=None, use_eyetracking=False, et_calibrate=True):
         self.name = name
@@ -40,10 +50,13 @@ class Task(object):
         self.use_meg = use_meg
         self.use_eeg = use_eeg
         self._events = []
+        # metadata saved in the events sidecar (json) with the first flip time
+        self.sidecar = {}
 
         self._exp_win_first_flip_time = None
         self._exp_win_last_flip_time = None
         self._ctl_win_last_flip_time = None
+        self.retaining_frame = False
         self._task_completed = False
         self._extra_markers = 0
 
@@ -88,21 +101,32 @@ class Task(object):
         return "%s : %s" % (self.__class__, self.name)
 
     def _flip_all_windows(self, exp_win, ctl_win=None, clearBuffer=True):
-        if not ctl_win is None:
+        if clearBuffer is RETAIN_FRAME:
+            # the FBO holds the last drawn scene, ctl_win keeps showing it
+            clearBuffer = False
+        elif not ctl_win is None:
             ctl_win.timeOnFlip(self, '_ctl_win_last_flip_time')
             ctl_win.flip(clearBuffer=clearBuffer)
 
         if not clearBuffer is None:
+            # copy the frame to the control window mirror before the FBO is cleared
+            mirror.capture()
             exp_win.flip(clearBuffer=clearBuffer)
             # set callback for next flip, to be the first callback for other callbacks to use
             exp_win.timeOnFlip(self, '_exp_win_last_flip_time')
+            mirror.flipped()
 
     def instructions(self, exp_win, ctl_win):
         if hasattr(self, "_instructions"):
             for clearBuffer in self._instructions(exp_win, ctl_win):
+                self.retaining_frame = clearBuffer is RETAIN_FRAME
                 yield
                 if clearBuffer is not None:
                     self._flip_all_windows(exp_win, ctl_win, clearBuffer)
+                else:
+                    # not flipped on purpose, the next flip is due a frame from now
+                    mirror.ready()
+        self.retaining_frame = False
         # 2 flips to clear screen
         for i in range(2):
             yield
@@ -120,6 +144,7 @@ class Task(object):
         flip_idx = 0
 
         for clearBuffer in self._run(exp_win, ctl_win):
+            self.retaining_frame = clearBuffer is RETAIN_FRAME
             # yield first to allow external draw before flip
             yield
 
@@ -130,6 +155,9 @@ class Task(object):
 
             if clearBuffer is not None:
                 self._flip_all_windows(exp_win, ctl_win, clearBuffer)
+            else:
+                # not flipped on purpose, the next flip is due a frame from now
+                mirror.ready()
 
             # increment the progress bar depending on task flip rate
             if self.progress_bar:
@@ -141,12 +169,17 @@ class Task(object):
     def stop(self, exp_win, ctl_win):
         if hasattr(self, "_stop"):
             for clearBuffer in self._stop(exp_win, ctl_win):
+                self.retaining_frame = clearBuffer is RETAIN_FRAME
                 yield
                 if clearBuffer is not None:
                     self._flip_all_windows(exp_win, ctl_win, clearBuffer)
+                else:
+                    # not flipped on purpose, the next flip is due a frame from now
+                    mirror.ready()
         if self.progress_bar:
             self.progress_bar.clear()
             self.progress_bar.close()
+        self.retaining_frame = False
         # 2 flips to clear screen and backbuffer
         for i in range(2):
             self._flip_all_windows(exp_win, ctl_win, True)
@@ -160,6 +193,29 @@ class Task(object):
         if hasattr(self, "_restart"):
             self._restart()
 
+    def _static_frames(self, exp_win, ctl_win, stims, n_frames=None, until=None):
+        """Display stims for `n_frames` flips, or until `until()` is True.
+
+        With an FBO, the scene is only drawn on the first frame, then
+        retained, otherwise it is redrawn on every frame.
+        """
+        wins = [exp_win, ctl_win] if ctl_win else [exp_win]
+        retain = getattr(exp_win, "useFBO", False)
+        frame_n = 0
+        while (n_frames is None or frame_n < n_frames) and not (until and until()):
+            if frame_n < 1 or not retain:
+                for win in wins:
+                    win.clearBuffer()
+                    for stim in stims:
+                        stim.draw(win)
+                yield False
+            else:
+                yield RETAIN_FRAME
+            frame_n += 1
+        # do not leave the scene in the back buffer
+        for win in wins:
+            win.clearBuffer()
+
     def _log_event(self, event, clock='task'):
         if clock == 'task':
             onset = self.task_timer.getTime()
@@ -177,10 +233,18 @@ class Task(object):
     def save(self):
         # call custom task _save()
         save_events = self._save()
+        fname = None
         if save_events is None and len(self._events):
             fname = self._generate_unique_filename("events", "tsv")
             df = pandas.DataFrame(self._events)
             df.to_csv(fname, sep="\t", index=False)
+        if self.sidecar:
+            sidecar_fname = os.path.splitext(fname)[0] + ".json" if fname \
+                else self._generate_unique_filename("events", "json")
+            with open(sidecar_fname, "w") as fd:
+                json.dump(
+                    {"first_flip_time": self._exp_win_first_flip_time, **self.sidecar},
+                    fd, indent=2)
 
 
 class Pause(Task):
@@ -203,17 +267,11 @@ class Pause(Task):
             alignText="center",
             color="white",
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
 
-        while True:
-            if not self.wait_key is False:
-                if len(event.getKeys(self.wait_key)):
-                    break
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield True
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text],
+            until=lambda: self.wait_key is not False and len(event.getKeys(self.wait_key)))
 
     def _stop(self, exp_win, ctl_win):
         yield True
@@ -233,29 +291,22 @@ Do not think about something in particular, let your mind wander..."""
         self.symbol = symbol
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
             color="white",
             wrapWidth=config.WRAP_WIDTH,
-            flipHoriz=config.MIRROR_X,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield True
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
         screen_text = visual.TextStim(
-            exp_win, text=self.symbol, alignText="center", color="white", flipHoriz=config.MIRROR_X
+            exp_win, text=self.symbol, alignText="center", color="white"
         )
         screen_text.height = 0.2
 
-        for frameN in range(config.FRAME_RATE * self.duration):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield True
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * self.duration)
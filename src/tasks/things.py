@@ -4,7 +4,8 @@ from .task_base import Task
 import numpy as np
 from colorama import Fore
 
-from ..shared import config, utils
+from ..shared import config, utils, texture_cache, text_cache
+from ..shared.prefetch import ImageStimStream
 
 RESPONSE_KEY = "d"
 RESPONSE_TIME = 4
@@ -15,6 +16,8 @@ class Things(Task):
     DEFAULT_INSTRUCTION = """You will see images on the screen.
 
 Press the button when you see an unrecognizable object that was generated."""
+    # keep textures in the shared cache for images shown again in later runs
+    USE_TEXTURE_CACHE = False
 
     def __init__(self, design, images_path, run, *args, **kwargs):
         super().__init__(**kwargs)
@@ -37,21 +40,14 @@ Press the button when you see an unrecognizable object that was generated."""
             units='deg',
         )
 
-        # preload all images
-        self._stimuli = []
-        for trial in self.design:
-            self._stimuli.append(visual.ImageStim(
-                exp_win, os.path.join(self.images_path, trial["image_path"]),
-                size=10,
-                units='deg',
-            ))
+        self._init_stimuli(exp_win)
         self.trials = data.TrialHandler(self.design, 1, method="sequential")
         self.duration = len(self.design)
         self._progress_bar_refresh_rate = 2  # 2 flips per trial
         super()._setup(exp_win)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -59,11 +55,8 @@ Press the button when you see an unrecognizable object that was generated."""
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield ()
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
 
     def _run(self, exp_win, ctl_win):
 
@@ -75,7 +68,8 @@ Press the button when you see an unrecognizable object that was generated."""
             self.fixation_cross.draw(ctl_win)
         yield True
 
-        for trial_n, (trial, stimuli) in enumerate(zip(self.trials, self._stimuli)):
+        for trial_n, trial in enumerate(self.trials):
+            stimuli = self._stimuli.get(trial_n)
             exp_win.logOnFlip(
                 level=logging.EXP,
                 msg=f"image: {trial['condition']}:{trial['image_path']}",
@@ -107,6 +101,9 @@ Press the button when you see an unrecognizable object that was generated."""
             trial["offset_flip"] = (
                 self._exp_win_last_flip_time - self._exp_win_first_flip_time
             )
+            # recycle the texture for an upcoming trial
+            self._stimuli.release(trial_n)
+            self._stimuli.fill()
 
             utils.wait_until(self.task_timer, trial["onset"] + RESPONSE_TIME - 1 / config.FRAME_RATE)
 
@@ -119,14 +116,29 @@ Press the button when you see an unrecognizable object that was generated."""
 
         utils.wait_until(self.task_timer, trial["onset"] + RESPONSE_TIME + FINAL_WAIT)
 
+    def _init_stimuli(self, exp_win):
+        # stream images, only keeping the textures of the upcoming trials
+        self._stimuli = ImageStimStream(
+            exp_win,
+            [os.path.join(self.images_path, trial["image_path"]) for trial in self.design],
+            onsets=[trial["onset"] for trial in self.design],
+            texture_cache=texture_cache.get_cache() if self.USE_TEXTURE_CACHE else None,
+            size=10,
+            units='deg',
+        )
+
     def _restart(self):
         self.trials = data.TrialHandler(self.design, 1, method="sequential")
+        win = self._stimuli.win
+        self._stimuli.close()
+        self._init_stimuli(win)
 
     def _save(self):
         self.trials.saveAsWideText(self._generate_unique_filename("events", "tsv"))
         return False
 
     def unload(self):
+        self._stimuli.close()
         del self._stimuli
 
 
@@ -154,9 +166,10 @@ The button mapping will change from trial to trial as indicated at the center of
     RESPONSE_KEYS = ['x','a','y','b']
     RESPONSE_MAPPING = np.asarray(RESPONSE_KEYS).reshape(2,2)
     RESPONSE_VALUES = np.asarray([[2,1],[-2,-1]])
+    USE_TEXTURE_CACHE = True
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -164,13 +177,16 @@ The button mapping will change from trial to trial as indicated at the center of
             wrapWidth=config.WRAP_WIDTH,
         )
 
-        for frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION):
-            screen_text.draw(exp_win)
-            if ctl_win:
-                screen_text.draw(ctl_win)
-            yield frameN < 3
+        yield from self._static_frames(
+            exp_win, ctl_win, [screen_text], config.FRAME_RATE * config.INSTRUCTION_DURATION)
         yield True
-        screen_text.text = self.EXTRA_INSTRUCTION
+        screen_text = text_cache.get_text_stim(
+            exp_win,
+            text=self.EXTRA_INSTRUCTION,
+            alignText="center",
+            color="white",
+            wrapWidth=config.WRAP_WIDTH,
+        )
         if self.run_id == 1:
             for  frameN in range(config.FRAME_RATE * config.INSTRUCTION_DURATION * 2):
                 screen_text.draw(exp_win)
@@ -200,7 +216,8 @@ The button mapping will change from trial to trial as indicated at the center of
             self.fixation_cross.draw(ctl_win)
         yield True
 
-        for trial_n, (trial, stimuli) in enumerate(zip(self.trials, self._stimuli)):
+        for trial_n, trial in enumerate(self.trials):
+            stimuli = self._stimuli.get(trial_n)
             exp_win.logOnFlip(
                 level=logging.EXP,
                 msg=f"image: {trial['condition']}:{trial['image_path']}",
@@ -237,6 +254,9 @@ The button mapping will change from trial to trial as indicated at the center of
             trial["offset_flip"] = (
                 self._exp_win_last_flip_time - self._exp_win_first_flip_time
             )
+            # recycle the texture for an upcoming trial
+            self._stimuli.release(trial_n)
+            self._stimuli.fill()
 
             utils.wait_until(self.task_timer, trial["onset"] + RESPONSE_TIME - 1 / config.FRAME_RATE)
 
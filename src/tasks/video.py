@@ -6,7 +6,7 @@ import numpy as np
 from psychopy import visual, core, data, logging
 from .task_base import Task
 
-from ..shared import config
+from ..shared import config, text_cache
 
 FADE_TO_GREY_DURATION = 2
 
@@ -34,7 +34,7 @@ and fixate the dot whenever it appears."""
             raise ValueError("File %s does not exists" % self.filepath)
 
     def _instructions(self, exp_win, ctl_win):
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=self.instruction,
             alignText="center",
@@ -197,7 +197,7 @@ and fixate the dot whenever it appears."""
         if self._inmovie_fixations:
             window_size_frame = exp_win.size - 100 * 2
             instruction_text = """Eyetracker Validation"""
-            screen_text = visual.TextStim(
+            screen_text = text_cache.get_text_stim(
                 exp_win,
                 text=instruction_text,
                 alignText="center",
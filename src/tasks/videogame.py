@@ -5,7 +5,8 @@ import threading
 from psychopy import visual, core, data, logging, event, sound, constants
 from .task_base import Task
 
-from ..shared import config, utils
+from ..shared import config, utils, text_cache
+from ..shared.questionnaire import LikertQuestionnaire, SingleScale
 from PIL import Image
 import retro
 
@@ -238,7 +239,7 @@ class VideoGame(VideoGameBase):
             **{'game_name':self.game_name,
              'state_name':self.state_name})
 
-        screen_text = visual.TextStim(
+        screen_text = text_cache.get_text_stim(
             exp_win,
             text=instruction,
             alignText="center",
@@ -434,8 +435,19 @@ class VideoGame(VideoGameBase):
             ctl_win.setColor([0] * 3, colorSpace='rgb255')
 
     def _run_ratings(self, exp_win, ctl_win):
+        # one question per screen, answers are only logged
         for question, n_pts in self.post_level_ratings:
-            yield from self._likert_scale_answer(exp_win, ctl_win, question, n_pts)
+            scale = SingleScale(exp_win, [(question, question, n_pts)], lambda event: None)
+            yield from scale.run(lambda: self._get_new_keys(exp_win))
+            scale.draw()
+            exp_win.logOnFlip(
+                level=logging.EXP,
+                msg="nlevel: %d, question: %s, answer: %d"
+                % (self._nlevels, question, scale.responses[0]),
+            )
+            for i in range(config.FRAME_RATE):
+                yield True
+            yield True
 
         text = visual.TextStim(exp_win, "Thanks for your answers", pos=(0, 0))
         for i in range(config.FRAME_RATE):
@@ -445,215 +457,25 @@ class VideoGame(VideoGameBase):
         for i in range(2):
             yield True
 
+    def _get_new_keys(self, exp_win):
+        self._handle_controller_presses(exp_win)
+        return [k[0] for k in self._new_key_pressed]
+
     def _questionnaire(self, exp_win, ctl_win, questions):
         if questions is None:
             return
         exp_win.setColor([0] * 3, colorSpace='rgb')
-        lines = []
-        bullets = []
-        responses = []
-        texts = []
-        legends = []
-        y_spacing = 80
-        win_width = exp_win.size[0]
-        scales_block_x = win_width * 0.25
-        scales_block_y = len(questions) // 2 * y_spacing
-        extent = win_width * 0.2
-
-        # add legends to Likert scale
-        legends.append(visual.TextStim(
-            exp_win,
-            text = 'Disagree',
-            units="pix",
-            pos=(scales_block_x - extent*0.75, scales_block_y*1.1),
-            wrapWidth= win_width * 0.5,
-            height= y_spacing / 3,
-            anchorHoriz="right",
-            alignText="right",
-            bold=True
-        ))
-        legends.append(visual.TextStim(
-            exp_win,
-            text = 'Agree',
-            units="pix",
-            pos=(scales_block_x + extent*1.15, scales_block_y*1.1),
-            wrapWidth= win_width * 0.5,
-            height= y_spacing / 3,
-            anchorHoriz="right",
-            alignText="right",
-            bold=True
-        ))
-
-
-        active_question = 0
-
-        # create all stimuli
-        #all_questions_text = ""
-        for q_n, (key, question, n_pts) in enumerate(questions):
-            default_response = n_pts // 2
-            responses.append(default_response)
-            x_spacing = extent * 2 / (n_pts - 1)
-            #all_questions_text += question + "\n\n"
-
-            y_pos = scales_block_y - q_n * y_spacing
-
-            lines.append(
-                visual.Line(
-                    exp_win,
-                    (scales_block_x - extent, y_pos),
-                    (scales_block_x + extent, y_pos),
-                    units="pix",
-                    lineWidth=6,
-                    autoLog=False,
-                    lineColor=(0, -1, -1) if q_n == 0 else (-1, -1, -1),
-                )
-            )
-            bullets.append(
-                [
-                    visual.Circle(
-                        exp_win,
-                        units="pix",
-                        radius=10,
-                        pos=(
-                            scales_block_x - extent + i * x_spacing,
-                            y_pos,
-                        ),
-                        fillColor= (1, 1, 1) if default_response == i else (-1, -1, -1),
-                        lineColor=(-1, -1, -1),
-                        lineWidth=10,
-                        autoLog=False,
-                    )
-                    for i in range(n_pts)
-                ]
-            )
-            texts.append(visual.TextStim(
-                exp_win,
-                text = question,
-                units="pix",
-                bold = q_n == active_question,
-                pos=(0, y_pos),
-                wrapWidth= win_width * 0.5,
-                height= y_spacing / 3,
-                anchorHoriz="right",
-                alignText="right"
-            ))
-            responses[q_n] = default_response
-
-
-
-        # questionnaire interaction loop
-        n_flips = 0
-        while True:
-            self._handle_controller_presses(exp_win)
-            new_key_pressed = [k[0] for k in self._new_key_pressed]
-            if "u" in new_key_pressed and active_question > 0:
-                active_question -= 1
-            elif "d" in new_key_pressed and active_question < len(questions)-1:
-                active_question += 1
-            elif "r" in new_key_pressed and responses[active_question] < n_pts - 1:
-                responses[active_question] += 1
-            elif "l" in new_key_pressed and responses[active_question] > 0:
-                responses[active_question] -= 1
-            elif "a" in new_key_pressed:
-                for (key, question, n_pts), value in zip(questions, responses):
-                    self._log_event({
-                        "trial_type": "questionnaire-answer",
-                        "game": self.game_name,
-                        "level": self.state_name,
-                        "stim_file": self.movie_path,
-                        "question": key,
-                        "value": value
-                    })
-                break
-            elif n_flips > 1:
-                time.sleep(.01)
-                continue
-
-            if n_flips > 0: #avoid double log when first loading questionnaire
-                self._log_event({
-                    "trial_type": "questionnaire-value-change",
-                    "game": self.game_name,
-                    "level": self.state_name,
-                    "stim_file": self.movie_path,
-                    "question": questions[active_question][0],
-                    "value": responses[active_question]
-                })
-
-            exp_win.logOnFlip(
-                level=logging.EXP,
-                msg="level ratings %s" % responses)
-            for q_n, (txt, line, bullet_q) in enumerate(zip(texts, lines, bullets)):
-                #txt.bold = q_n == active_question
-                txt._pygletTextObj.set_style('bold', q_n == active_question)
-                line.lineColor = (0, -1, -1) if q_n == active_question else (-1, -1, -1)
-                for bullet_n, bullet in enumerate(bullet_q):
-                    bullet.fillColor = (1, 1, 1) if responses[q_n] == bullet_n else (-1, -1, -1)
-
-            for stim in lines + sum(bullets, []) + texts + legends:
-                stim.draw(exp_win)
-            yield True
-            n_flips += 1
 
-    def _likert_scale_answer(
-        self, exp_win, ctl_win, question, n_pts=7, extent=0.6, autoLog=False
-    ):
-        extent *= config.EXP_WINDOW["size"][0]
-        value = n_pts // 2
-        answered = False
-        text = visual.TextStim(exp_win, question, pos=(0, 0.5))
-        line = visual.Line(
+        yield from LikertQuestionnaire(
             exp_win,
-            (-extent, 0),
-            (extent, 0),
-            units="pix",
-            lineWidth=2,
-            autoLog=False,
-        )
-        x_spacing = extent * 2 / (n_pts - 1)
-        circles = [
-            visual.Circle(
-                exp_win,
-                units="pix",
-                radius=40,
-                pos=(-extent + i * x_spacing, 0),
-                fillColor=(-1, -1, -1),
-                lineColor=(-1, -1, -1),
-                lineWidth=10,
-                autoLog=False,
-            )
-            for i in range(n_pts)
-        ]
-        circles[value].fillColor = (1, 1, 1)
-        frame = 0
-        while not answered:
-            frame += 1
-            for stim in [text, line] + circles:
-                stim.draw(exp_win)
-            self._handle_controller_presses(exp_win)
-            if "a" in self.pressed_keys:
-                exp_win.logOnFlip(
-                    level=logging.EXP,
-                    msg="nlevel: %d, question: %s, answer: %d"
-                    % (self._nlevels, question, value),
-                )
-                for i in range(config.FRAME_RATE):
-                    yield True
-                self.pressed_keys.clear()
-                break
-            if "r" in self.pressed_keys and value < n_pts - 1:
-                value += 1
-            elif "l" in self.pressed_keys and value > 0:
-                value -= 1
-            else:
-                yield frame < 4
-                continue
-            self.pressed_keys.clear()
-            for c in circles:
-                c.fillColor = (-1, -1, -1)
-            circles[value].fillColor = (1, 1, 1)
-
-            yield True
-        yield True
+            questions,
+            self._log_event,
+            event_fields={
+                "game": self.game_name,
+                "level": self.state_name,
+                "stim_file": self.movie_path,
+            },
+        ).run(lambda: self._get_new_keys(exp_win), log_label="level ratings")
 
     def _stop(self, exp_win, ctl_win):
         self._unset_key_handler(exp_win)
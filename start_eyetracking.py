@@ -17,6 +17,11 @@ def start_eyetracker(args):
         profile=False,
         debug=True,
     )
+    # replies are received by the client thread
+    eyetracker_client.start()
+    eyetracker_client.startup_done.wait()
+    if eyetracker_client.startup_error is not None:
+        raise RuntimeError(f"pupil startup failed: {eyetracker_client.startup_error!r}")
 
     eyetracker_client.send_recv_notification(
         {
@@ -30,7 +35,8 @@ def start_eyetracker(args):
                 "fixed_screen": True,
                 "selected_gazer_class_name": "Gazer2D",
             },
-        }
+        },
+        timeout=eyetracking.STARTUP_STEP_TIMEOUT,
     )
 
     eyetracker_client.send_recv_notification(
@@ -40,12 +46,12 @@ def start_eyetracker(args):
             "args": {
                 "annotation_definitions": [['Trigger','T'], ['Trigger5','5'], ['Trigger%','%']]
             },
-        }
+        },
+        timeout=eyetracking.STARTUP_STEP_TIMEOUT,
     )
 
-
-    #print("starting et client")
-    #eyetracker_client.start()
+    # leave pupil running, only stop the client thread
+    eyetracker_client.stoprequest.set()
 
     #eyetracker_client.join(5)
 
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from src.shared import eyetracking
+from src.shared.eyetracking import SAMPLE_DTYPE, SampleBuffer, as_samples
+
+
+def fill(buffer, timestamps):
+    for t in timestamps:
+        buffer.append(t, (t / 100, 1 - t / 100), .9, 40.)
+
+
+def test_sample_buffer_before_wraparound():
+    buffer = SampleBuffer(size=8)
+    assert buffer.latest() is None
+    assert len(buffer.ordered()) == 0
+    fill(buffer, range(5))
+    assert buffer.latest()["timestamp"] == 4
+    np.testing.assert_array_equal(buffer.ordered()["timestamp"], range(5))
+
+
+def test_sample_buffer_wraparound():
+    buffer = SampleBuffer(size=8)
+    fill(buffer, range(19))
+    ordered = buffer.ordered()
+    # only the last `size` samples are kept, oldest first
+    np.testing.assert_array_equal(ordered["timestamp"], range(11, 19))
+    np.testing.assert_allclose(ordered["norm_pos"][:, 0], np.arange(11, 19) / 100)
+    assert buffer.latest()["timestamp"] == 18
+    assert buffer.received_since(17.5)
+    assert not buffer.received_since(18)
+
+
+def test_sample_buffer_window_across_wraparound():
+    buffer = SampleBuffer(size=8)
+    fill(buffer, range(19))
+    # the buffer is split after timestamp 15, window bounds are (start, stop]
+    np.testing.assert_array_equal(buffer.window(13, 17)["timestamp"], [14, 15, 16, 17])
+    np.testing.assert_array_equal(buffer.window(stop=12)["timestamp"], [11, 12])
+    np.testing.assert_array_equal(buffer.window(16)["timestamp"], [17, 18])
+    assert len(buffer.window(18)) == 0
+
+
+def test_sample_buffer_window_is_a_copy():
+    buffer = SampleBuffer(size=8)
+    fill(buffer, range(4))
+    window = buffer.window()
+    fill(buffer, range(4, 12))
+    np.testing.assert_array_equal(window["timestamp"], range(4))
+
+
+def test_as_samples_from_datum_dicts():
+    datums = [
+        {"timestamp": t, "norm_pos": [t / 10, .5], "confidence": .8, "id": 0}
+        for t in (3., 1., 2.)
+    ]
+    samples = as_samples(datums)
+    assert samples.dtype == SAMPLE_DTYPE
+    # order of the datums is kept
+    np.testing.assert_array_equal(samples["timestamp"], [3, 1, 2])
+    np.testing.assert_allclose(samples["norm_pos"], [[.3, .5], [.1, .5], [.2, .5]])
+    np.testing.assert_allclose(samples["confidence"], .8)
+    assert np.isnan(samples["diameter"]).all()
+
+
+def test_as_samples_passthrough_and_empty():
+    buffer = SampleBuffer(size=4)
+    fill(buffer, range(6))
+    ordered = buffer.ordered()
+    assert as_samples(ordered) is ordered
+    assert as_samples([]).dtype == SAMPLE_DTYPE
+    assert len(as_samples([])) == 0
+
+
+def loop_gaze_marker_angles(gaze_norm_pos, marker_norm_pos):
+    # per-sample computation of the validation quality control before it was vectorized
+    dist_in_pix = eyetracking.QC_EYE_TO_SCREEN_PIX
+    m_vecpos = np.concatenate(
+        ((np.array(marker_norm_pos) - 0.5) * eyetracking.QC_SCREEN_SIZE, [dist_in_pix]))
+    distances = []
+    for g_pos in gaze_norm_pos:
+        gz_vec = np.concatenate(
+            ((np.array(g_pos) - 0.5) * eyetracking.QC_SCREEN_SIZE, [dist_in_pix]))
+        cosine = np.dot(m_vecpos, gz_vec) / (np.linalg.norm(m_vecpos) * np.linalg.norm(gz_vec))
+        distances.append(np.rad2deg(np.arccos(cosine)))
+    return np.array(distances)
+
+
+def test_gaze_marker_angles_matches_loop():
+    rng = np.random.default_rng(0)
+    gaze = rng.uniform(-.1, 1.1, (500, 2))
+    for marker in [(.5, .5), (.1, .9), (.83, .22)]:
+        np.testing.assert_allclose(
+            eyetracking.gaze_marker_angles(gaze, marker),
+            loop_gaze_marker_angles(gaze, marker),
+            atol=1e-6)
+
+
+def test_gaze_marker_angles_values():
+    assert eyetracking.gaze_marker_angles([.3, .7], [.3, .7]) == pytest.approx(0, abs=1e-6)
+    # marker at the center, gaze shifted horizontally
+    expected = np.rad2deg(np.arctan(.1 * 1280 / eyetracking.QC_EYE_TO_SCREEN_PIX))
+    assert eyetracking.gaze_marker_angles([.6, .5], [.5, .5]) == pytest.approx(expected)
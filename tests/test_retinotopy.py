@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.tasks import retinotopy
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "apertures_cache")
+    monkeypatch.setattr(retinotopy, "APERTURES_CACHE_DIR", cache_dir)
+    monkeypatch.setattr(
+        retinotopy, "APERTURES_VERIFIED_FILE", os.path.join(cache_dir, "verified.json"))
+    return cache_dir
+
+
+def cached_files(cache_dir):
+    return sorted(f for f in os.listdir(cache_dir) if f.endswith(".npy"))
+
+
+@pytest.mark.parametrize("kind", ["wedge", "ring", "bars"])
+def test_generate_apertures_deterministic(cache_dir, kind):
+    apertures = np.array(retinotopy.generate_apertures(kind, 4, frame_rate=10, resolution=32))
+    n_cycles = len(retinotopy.BAR_ANGLES) if kind == "bars" else 1
+    assert apertures.shape == (40 * n_cycles, 32, 32)
+    assert apertures.dtype == np.uint8
+    assert set(np.unique(apertures)) <= {0, 255}
+    assert apertures.any() and not apertures.all()
+
+    # generated again from scratch
+    for f in cached_files(cache_dir):
+        os.remove(os.path.join(cache_dir, f))
+    regenerated = retinotopy.generate_apertures(kind, 4, frame_rate=10, resolution=32)
+    np.testing.assert_array_equal(regenerated, apertures)
+    # frames do not depend on how they are chunked
+    params = retinotopy._aperture_params({})
+    np.testing.assert_array_equal(
+        retinotopy._aperture_frames(kind, 40, 32, (0, len(apertures)), params), apertures)
+
+
+def test_generate_apertures_cache_key(cache_dir, monkeypatch):
+    retinotopy.generate_apertures("ring", 2, frame_rate=10, resolution=16)
+    files = cached_files(cache_dir)
+    assert len(files) == 1
+
+    # same parameters: the cached file is reused
+    mtime = os.stat(os.path.join(cache_dir, files[0])).st_mtime_ns
+    retinotopy.generate_apertures("ring", 2, frame_rate=10, resolution=16)
+    assert cached_files(cache_dir) == files
+    assert os.stat(os.path.join(cache_dir, files[0])).st_mtime_ns == mtime
+
+    # any parameter change is a new entry
+    retinotopy.generate_apertures("ring", 2, frame_rate=10, resolution=16, ring_width=.6)
+    assert len(cached_files(cache_dir)) == 2
+
+    monkeypatch.setattr(
+        retinotopy, "APERTURES_GENERATOR_VERSION", retinotopy.APERTURES_GENERATOR_VERSION + 1)
+    retinotopy.generate_apertures("ring", 2, frame_rate=10, resolution=16)
+    assert len(cached_files(cache_dir)) == 3
+
+
+def test_apertures_verification_invalidated(cache_dir, tmp_path, monkeypatch):
+    aperture_file = str(tmp_path / "apertures_ring.npz")
+    np.savez(aperture_file, apertures=np.zeros((4, 4, 3), dtype=np.uint8))
+    assert not retinotopy.apertures_verified(aperture_file)
+    retinotopy.mark_apertures_verified(aperture_file)
+    assert retinotopy.apertures_verified(aperture_file)
+
+    version = retinotopy.APERTURES_GENERATOR_VERSION
+    monkeypatch.setattr(retinotopy, "APERTURES_GENERATOR_VERSION", version + 1)
+    assert not retinotopy.apertures_verified(aperture_file)
+    monkeypatch.setattr(retinotopy, "APERTURES_GENERATOR_VERSION", version)
+    assert retinotopy.apertures_verified(aperture_file)
+
+    # the file changed since it was checked
+    np.savez(aperture_file, apertures=np.ones((4, 4, 4), dtype=np.uint8))
+    assert not retinotopy.apertures_verified(aperture_file)
@@ -0,0 +1,87 @@
+import wave
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.shared import stimstore
+
+
+@pytest.fixture
+def stimuli(tmp_path, monkeypatch):
+    # store keys are paths relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    arrays = {
+        "stimuli/images/rgb.png": rng.integers(0, 256, (5, 7, 3), dtype=np.uint8),
+        "stimuli/images/gray.png": rng.integers(0, 256, (4, 3), dtype=np.uint8),
+        "stimuli/apertures.npy": rng.random((3, 8, 8)).astype(np.float32),
+    }
+    (tmp_path / "stimuli" / "images").mkdir(parents=True)
+    for key, array in arrays.items():
+        if key.endswith(".png"):
+            Image.fromarray(array).save(key)
+        else:
+            np.save(key, array)
+    samples = rng.integers(-2 ** 15, 2 ** 15, (100, 2), dtype=np.int16)
+    with wave.open("stimuli/sound.wav", "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(samples.tobytes())
+    arrays["stimuli/sound.wav"] = samples
+    np.savez("stimuli/sequences.npz", a=np.arange(10), b=np.eye(3))
+    arrays["stimuli/sequences.npz:a"] = np.arange(10)
+    arrays["stimuli/sequences.npz:b"] = np.eye(3)
+    return arrays
+
+
+def test_store_round_trip(stimuli):
+    entries = stimstore.build_store("stimuli.store", ["stimuli"])
+    assert set(entries) == set(stimuli)
+
+    store = stimstore.StimulusStore("stimuli.store")
+    try:
+        assert len(store) == len(stimuli)
+        for key, array in stimuli.items():
+            assert key in store
+            loaded = store.get(key)
+            assert loaded.dtype == array.dtype
+            np.testing.assert_array_equal(loaded, array)
+            assert loaded.ctypes.data % stimstore.ALIGNMENT == 0
+            assert store.verify(key)
+        # views on the mapped file have to be released before closing
+        del loaded
+        samples, sample_rate = store.get_sound("stimuli/sound.wav")
+        assert sample_rate == 44100
+        np.testing.assert_allclose(samples, stimuli["stimuli/sound.wav"] / 32767)
+    finally:
+        store.close()
+
+
+def test_store_verify_detects_corruption(stimuli):
+    entries = stimstore.build_store("stimuli.store", ["stimuli"])
+    header_start = len(stimstore.MAGIC) + stimstore.HEADER_LENGTH_DTYPE.itemsize
+    with open("stimuli.store", "rb") as f:
+        header_len = int(np.frombuffer(
+            f.read(header_start)[len(stimstore.MAGIC):], stimstore.HEADER_LENGTH_DTYPE)[0])
+    offset = header_start + header_len + entries["stimuli/apertures.npy"]["offset"]
+    with open("stimuli.store", "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xff]))
+
+    store = stimstore.StimulusStore("stimuli.store")
+    try:
+        assert not store.verify("stimuli/apertures.npy")
+        assert store.verify("stimuli/images/rgb.png")
+    finally:
+        store.close()
+
+
+def test_store_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a.store"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        stimstore.StimulusStore(str(path))
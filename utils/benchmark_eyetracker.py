@@ -0,0 +1,92 @@
+# load test the eyetracker client against the fake Pupil server (utils/fake_pupil)
+# usage (from the repository root): python utils/benchmark_eyetracker.py [--rates 250 500 1000]
+# For each rate, measures the client startup, Pupil Remote round-trips, and for
+# display only (latest sample) and buffered (calibration) modes: received
+# pupils, gaps, listener thread CPU and the latency from pupil timestamps to
+# samples being available to the render thread.
+import os, sys, time, argparse, tempfile, threading
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.shared import eyetracking
+
+parser = argparse.ArgumentParser(description="Benchmark the eyetracker client")
+parser.add_argument("--rates", type=float, nargs="+", default=[250, 500, 1000])
+parser.add_argument("--duration", type=float, default=5, help="duration of each mode (s)")
+parser.add_argument("--latency", type=float, default=2, help="injected latency (ms)")
+parser.add_argument("--dropout-rate", type=float, default=0, help="injected dropouts per second")
+parser.add_argument("--replay", help="calib-data npz file to replay")
+parser.add_argument("--requests", type=int, default=200, help="timestamp requests")
+args = parser.parse_args()
+
+os.environ["PUPIL_PATH"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_pupil")
+POLL_INTERVAL = .001
+
+
+def sample_latencies(client, stop, start):
+    # latency of the samples seen by a 1kHz render-like loop, Pupil and
+    # the client share the monotonic clock here
+    latencies = []
+    last_timestamp = start
+    while not stop.is_set():
+        pupil = client.get_pupil()
+        if pupil is not None and pupil["timestamp"] > last_timestamp:
+            last_timestamp = pupil["timestamp"]
+            latencies.append(time.monotonic() - last_timestamp)
+        time.sleep(POLL_INTERVAL)
+    return latencies
+
+
+def run_mode(client, buffered):
+    if buffered:
+        client.start_buffering()
+    stop = threading.Event()
+    result = {}
+    # samples received before pausing are ignored
+    start = time.monotonic()
+    sampler = threading.Thread(
+        target=lambda: result.setdefault("latencies", sample_latencies(client, stop, start)))
+    client.resume()
+    sampler.start()
+    time.sleep(args.duration)
+    client.pause()
+    stop.set()
+    sampler.join()
+    if buffered:
+        client.stop_buffering()
+    # stats are completed once the listener unsubscribed
+    time.sleep(eyetracking.LISTENER_POLL_TIMEOUT / 1e3 * 5)
+    return dict(client.com_stats), np.asarray(result["latencies"]) * 1e3
+
+
+for rate in args.rates:
+    os.environ["FAKE_PUPIL_ARGS"] = (
+        f"--rate {rate} --latency {args.latency} --dropout-rate {args.dropout_rate}"
+        + (f" --replay {args.replay}" if args.replay else ""))
+    # gaps are counted against the camera frame rate
+    eyetracking.CAPTURE_SETTINGS["frame_rate"] = rate
+    t0 = time.monotonic()
+    client = eyetracking.EyeTrackerClient(tempfile.mkdtemp(), "sub-benchmark")
+    client.start()
+    client.startup_done.wait()
+    startup_time = time.monotonic() - t0
+    if client.startup_error is not None:
+        sys.exit(f"startup failed: {client.startup_error!r}")
+    client.pause()
+
+    t0 = time.perf_counter()
+    for _ in range(args.requests):
+        client.get_pupil_timestamp(timeout=1)
+    round_trip = (time.perf_counter() - t0) / args.requests
+
+    print(f"{rate:g}Hz: startup {startup_time:.2f}s, "
+          f"remote round-trip {round_trip * 1e3:.2f}ms")
+    for buffered in [False, True]:
+        stats, latencies = run_mode(client, buffered)
+        print(f"  {'buffered' if buffered else 'latest':>8}: "
+              f"{stats['n_pupils'] / args.duration:.0f} pupils/s, "
+              f"{stats['n_gaps']} gaps (max {stats['max_gap'] * 1e3:.1f}ms), "
+              f"listener cpu {stats['cpu'] * 100:.1f}%, "
+              f"latency median {np.median(latencies):.2f}ms, "
+              f"p95 {np.percentile(latencies, 95):.2f}ms, max {latencies.max():.2f}ms")
+    client.join(5)
@@ -0,0 +1,116 @@
+# compare the vectorized eyetracking validation QC with the former per-sample loop
+# usage (from the repository root): python utils/benchmark_validation_qc.py [--samples N]
+import os, sys, io, time, argparse, contextlib
+import numpy as np
+from scipy.spatial.distance import pdist
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.shared.eyetracking import EyeTrackerClient, MARKER_POSITIONS_9
+
+parser = argparse.ArgumentParser(description="Benchmark validation QC")
+parser.add_argument("--samples", type=int, default=500, help="gaze samples per marker")
+parser.add_argument("--repeats", type=int, default=10)
+args = parser.parse_args()
+
+
+def loop_qc(markers_dict, frames_per_marker, conf_thresh=0.80, dist_in_pix=4164):
+    # per-sample pdist, as computed before vectorization
+    all_distances = []
+    val_qc = []
+    for count in range(len(markers_dict)):
+        m = markers_dict[count]
+        num_gz = len(m['gaze_data']['timestamps'])
+        expected_gz_count = 250*(frames_per_marker/60)
+        if not num_gz:
+            all_distances.append(np.array([]))
+            val_qc.append({'marker': count, 'norm_pos': m['norm_pos'], 'num_gz': 0})
+            continue
+        m_vecpos = np.concatenate(((np.array(m['norm_pos']) - 0.5)*(1280, 1024), np.array([dist_in_pix])), axis=0)
+        g_conf = np.array(m['gaze_data']['confidence'])
+        g_filter = g_conf > conf_thresh
+        gaze = (np.array(m['gaze_data']['norm_pos'])[g_filter] - 0.5)*(1280, 1024)
+        gaze_vecpos = np.concatenate((gaze, np.repeat(dist_in_pix, len(gaze)).reshape((-1, 1))), axis=1)
+        distances = []
+        for gz_vec in gaze_vecpos:
+            vectors = np.stack((m_vecpos, gz_vec), axis=0)
+            distances.append(np.rad2deg(np.arccos(1.0 - pdist(vectors, metric='cosine')))[0])
+        distances = np.array(distances)
+        all_distances.append(distances)
+        num_dist = len(distances)
+        val_qc.append({
+            'marker': count,
+            'norm_pos': m['norm_pos'],
+            'num_gz': num_gz,
+            'gz_count_ratio': num_gz/expected_gz_count,
+            'above_70conf_ratio': np.sum(g_conf > 0.7)/num_gz,
+            'above_80conf_ratio': np.sum(g_conf > 0.8)/num_gz,
+            'above_90conf_ratio': np.sum(g_conf > 0.9)/num_gz,
+            'median_distance': np.median(distances),
+            'good': np.sum(distances < 0.5) / num_dist,
+            'fair': np.sum((distances >= 0.5)*(distances < 1.5)) / num_dist,
+            'poor': np.sum(distances >= 1.5) / num_dist,
+        })
+    return all_distances, val_qc
+
+
+def qc_differences(val_qc, reference):
+    # fields differing (beyond float rounding) between QC records
+    differences = []
+    for record, ref in zip(val_qc, reference):
+        if record.keys() != ref.keys():
+            differences.append((ref['marker'], 'fields', sorted(record), sorted(ref)))
+            continue
+        for key, ref_value in ref.items():
+            if not np.allclose(record[key], ref_value, rtol=1e-9, atol=1e-9):
+                differences.append((ref['marker'], key, record[key], ref_value))
+            elif type(record[key]) is not type(ref_value):
+                differences.append((ref['marker'], key, type(record[key]), type(ref_value)))
+    if len(val_qc) != len(reference):
+        differences.append(('records', len(val_qc), len(reference)))
+    return differences
+
+
+def synthetic_markers(n_samples, rng):
+    markers_dict = {}
+    for count, norm_pos in enumerate(MARKER_POSITIONS_9):
+        markers_dict[count] = {
+            'norm_pos': norm_pos.tolist(),
+            'gaze_data': {
+                'timestamps': (count + np.arange(n_samples) / n_samples).tolist(),
+                'norm_pos': (norm_pos + rng.normal(0, .02, (n_samples, 2))).tolist(),
+                'confidence': rng.uniform(.5, 1, n_samples).tolist(),
+            },
+        }
+    return markers_dict
+
+
+FRAMES_PER_MARKER = 120
+
+rng = np.random.default_rng(0)
+markers_dict = synthetic_markers(args.samples, rng)
+# a marker without gaze samples
+markers_dict[len(markers_dict) - 1]['gaze_data'] = {'timestamps': [], 'norm_pos': [], 'confidence': []}
+# the method does not use the client state
+client = EyeTrackerClient.__new__(EyeTrackerClient)
+
+t0 = time.perf_counter()
+for _ in range(args.repeats):
+    reference, reference_qc = loop_qc(markers_dict, FRAMES_PER_MARKER)
+loop_time = (time.perf_counter() - t0) / args.repeats
+
+t0 = time.perf_counter()
+# silence the QC summary printed on each call
+with contextlib.redirect_stdout(io.StringIO()):
+    for _ in range(args.repeats):
+        markers_dict, val_qc = client.gaze_qc_per_marker(markers_dict, FRAMES_PER_MARKER)
+vectorized_time = (time.perf_counter() - t0) / args.repeats
+
+max_diff = max(
+    np.abs(markers_dict[count]['gaze_data']['distances']['distances'] - ref).max(initial=0)
+    for count, ref in enumerate(reference) if len(ref))
+differences = qc_differences(val_qc, reference_qc)
+print(f"{len(markers_dict)} markers x {args.samples} samples")
+print(f"loop: {loop_time * 1e3:.2f}ms, vectorized: {vectorized_time * 1e3:.2f}ms "
+      f"(x{loop_time / vectorized_time:.0f})")
+print(f"max distance difference: {max_diff:.2e} deg")
+print(f"QC records: {'identical' if not differences else differences}")
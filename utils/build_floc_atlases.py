@@ -0,0 +1,18 @@
+# pre-decode fLoc stimuli into memory-mapped atlases loaded by the FLoc task
+# usage (from the repository root): python utils/build_floc_atlases.py [folder ...]
+import os, sys, argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.tasks.localizers import build_floc_atlas, FLOC_STIMULI_DIR, FLOC_STIMULI_SIZE
+
+parser = argparse.ArgumentParser(description="Build fLoc stimuli atlases")
+parser.add_argument("folders", nargs="*", help="stimulus folders (default: all)")
+parser.add_argument("--size", type=int, default=FLOC_STIMULI_SIZE)
+args = parser.parse_args()
+
+folders = args.folders or sorted(
+    f for f in os.listdir(FLOC_STIMULI_DIR) if os.path.isdir(os.path.join(FLOC_STIMULI_DIR, f))
+)
+for folder in folders:
+    print(f"building atlas for {folder}")
+    build_floc_atlas(folder, size=args.size)
@@ -0,0 +1,43 @@
+# compare procedurally generated retinotopy apertures with the aperture files
+# usage (from the repository root): python utils/check_retinotopy_apertures.py [--tr 1.49]
+# files found identical are recorded as verified for the current generator version
+import os, sys, argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.tasks.retinotopy import (
+    generate_apertures, load_frames, mark_apertures_verified, _frames_file, SWEEP_DURATION)
+from src.shared import config
+
+parser = argparse.ArgumentParser(description="Check generated retinotopy apertures")
+parser.add_argument("--tr", type=float, default=config.TR, help="TR the wedge file was made for")
+args = parser.parse_args()
+
+APERTURE_FILES = [
+    ("wedge", "data/retinotopy/apertures_wedge_newtr.npz", 21 * args.tr),
+    ("ring", "data/retinotopy/apertures_ring.npz", SWEEP_DURATION),
+    ("bars", "data/retinotopy/apertures_bars.npz", SWEEP_DURATION),
+]
+
+failed = False
+for kind, aperture_file, cycle_duration in APERTURE_FILES:
+    if not (os.path.exists(aperture_file) or os.path.exists(_frames_file(aperture_file))):
+        print(f"{kind}: {aperture_file} not found")
+        failed = True
+        continue
+    reference = load_frames(aperture_file, "apertures")
+    generated = generate_apertures(kind, cycle_duration)
+    if reference.shape != generated.shape:
+        print(f"{kind}: shape {generated.shape} differs from {reference.shape}")
+        failed = True
+        continue
+    # masks are compared binarized, per frame
+    mismatch = np.array([
+        np.mean((ref > 127) != (gen > 127)) for ref, gen in zip(reference, generated)])
+    identical = all(np.array_equal(ref, gen) for ref, gen in zip(reference, generated))
+    print(f"{kind}: {'identical' if identical else 'different'}, mismatching pixels "
+          f"mean {mismatch.mean():.2%}, max {mismatch.max():.2%} (frame {mismatch.argmax()})")
+    if identical:
+        mark_apertures_verified(aperture_file)
+    failed |= not identical
+sys.exit(failed)
@@ -0,0 +1,19 @@
+# convert retinotopy npz assets to frame-major uint8 .npy memory-mapped by the task
+# usage (from the repository root): python utils/convert_retinotopy_assets.py [npz_file ...]
+import os, sys, glob, argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.tasks.retinotopy import convert_frames
+
+parser = argparse.ArgumentParser(description="Convert retinotopy assets to .npy")
+parser.add_argument("files", nargs="*", help="npz files (default: images and apertures)")
+args = parser.parse_args()
+
+files = args.files or sorted(
+    glob.glob("data/retinotopy/apertures_*.npz")
+    + [f for f in ["data/retinotopy/images.npz", "data/retinotopy/scenes.npz"] if os.path.exists(f)]
+)
+for npz_file in files:
+    key = "apertures" if os.path.basename(npz_file).startswith("apertures") else "images"
+    print(f"converting {npz_file}")
+    print(f"wrote {convert_frames(npz_file, key)}")
@@ -0,0 +1,251 @@
+# local stand-in for Pupil Capture, to run and load test the eyetracker client off-rig
+# usage: PUPIL_PATH=utils/fake_pupil python main.py ... (launched by EyeTrackerClient,
+#        options below can be passed in FAKE_PUPIL_ARGS, eg. "--rate 500 --dropout-rate 1")
+#    or: python utils/fake_pupil/pupil_src/main.py capture --port 50123 [--rate 500 ...]
+# Serves Pupil Remote (REQ/REP) and an IPC backbone (XSUB/XPUB proxy) on which
+# synthetic or replayed (calib-data npz) pupil/gaze data is published, with
+# injectable latency and dropouts, and answers the notifications used by the
+# client (eye process, Aravis source, calibration, recording, stop).
+import os, sys, time, argparse, threading, shlex
+import numpy as np
+import msgpack
+import zmq
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from src.shared.zmq_tools import Msg_Receiver, Msg_Streamer
+
+parser = argparse.ArgumentParser(description="Fake Pupil Capture")
+parser.add_argument("app", nargs="?", default="capture")
+parser.add_argument("--port", type=int, default=50020, help="Pupil Remote port")
+parser.add_argument("--rate", type=float, default=250, help="pupil/gaze rate (Hz)")
+parser.add_argument("--latency", type=float, default=2, help="mean publication latency (ms)")
+parser.add_argument("--jitter", type=float, default=.5, help="latency standard deviation (ms)")
+parser.add_argument("--dropout-rate", type=float, default=0, help="dropouts per second")
+parser.add_argument("--dropout-duration", type=float, default=50, help="dropout duration (ms)")
+parser.add_argument("--replay", help="calib-data npz file to replay instead of synthetic data")
+parser.add_argument("--calibration-delay", type=float, default=.5, help="calibration duration (s)")
+parser.add_argument("--fail-calibration", action="store_true")
+parser.add_argument("--startup-delay", type=float, default=0, help="delay before serving (s)")
+parser.add_argument("--debug", action="store_true")
+parser.add_argument("--profile", action="store_true")
+args = parser.parse_args(sys.argv[1:] + shlex.split(os.environ.get("FAKE_PUPIL_ARGS", "")))
+
+EYE_ID = 0
+
+
+def pupil_time():
+    # Pupil timestamps are on a monotonic clock
+    return time.monotonic()
+
+
+class SampleSource(object):
+    """Endless pupil (norm_pos, confidence, diameter) and gaze norm_pos
+    streams, replayed from a calib-data npz or synthetic fixations."""
+
+    def __init__(self, replay=None, seed=0):
+        self._rng = np.random.default_rng(seed)
+        self._n = 0
+        if replay is not None:
+            data = np.load(replay)
+            self._pupils = data["pupils"]
+            self._gaze = data["gaze"]["norm_pos"] if "gaze" in data else self._pupils["norm_pos"]
+            if not len(self._pupils):
+                raise ValueError(f"no pupils to replay in {replay}")
+        else:
+            self._pupils = None
+            self._fixation = np.full(2, .5)
+
+    def next(self):
+        if self._pupils is not None:
+            pupil = self._pupils[self._n % len(self._pupils)]
+            gaze = self._gaze[self._n % len(self._gaze)]
+            self._n += 1
+            return (
+                pupil["norm_pos"].tolist(), float(pupil["confidence"]),
+                float(pupil["diameter"]), gaze.tolist())
+        # a new fixation every second on average
+        self._n += 1
+        if self._rng.random() < 1. / args.rate:
+            self._fixation = self._rng.uniform(.1, .9, 2)
+        gaze = self._fixation + self._rng.normal(0, .01, 2)
+        pupil = .5 + (gaze - .5) * .3 + self._rng.normal(0, .002, 2)
+        confidence = float(np.clip(self._rng.normal(.95, .05), 0, 1))
+        diameter = float(self._rng.normal(40, 1))
+        return pupil.tolist(), confidence, diameter, gaze.tolist()
+
+
+class FakePupil(object):
+
+    def __init__(self, ctx, port):
+        self.ctx = ctx
+        self.source = SampleSource(args.replay)
+        self._rng = np.random.default_rng(1)
+
+        # IPC backbone: PUB sockets connect to the XSUB, SUB sockets to the XPUB
+        xsub = ctx.socket(zmq.XSUB)
+        self.pub_port = xsub.bind_to_random_port("tcp://127.0.0.1")
+        xpub = ctx.socket(zmq.XPUB)
+        self.sub_port = xpub.bind_to_random_port("tcp://127.0.0.1")
+        threading.Thread(target=self._proxy, args=(xsub, xpub), daemon=True).start()
+
+        self.streamer = Msg_Streamer(ctx, f"tcp://127.0.0.1:{self.pub_port}")
+        self.notifications = Msg_Receiver(
+            ctx, f"tcp://127.0.0.1:{self.sub_port}", topics=("notify.",))
+        self.remote = ctx.socket(zmq.REP)
+        self.remote.bind(f"tcp://*:{port}")
+
+        self.running = True
+        self.eye_started = False
+        self.capturing = False
+        self.recording = None
+        self.stats = {"published": 0, "dropped": 0, "notifications": 0}
+        self._calibration_due = None
+        self._dropout_end = 0
+
+    @staticmethod
+    def _proxy(xsub, xpub):
+        try:
+            zmq.proxy(xsub, xpub)
+        except zmq.ContextTerminated:
+            xsub.close(linger=0)
+            xpub.close(linger=0)
+
+    def notify(self, n):
+        self.streamer.send({"topic": "notify." + n["subject"], **n})
+
+    def _handle_request(self):
+        frames = self.remote.recv_multipart()
+        request = frames[0].decode()
+        if request == "SUB_PORT":
+            reply = str(self.sub_port)
+        elif request == "PUB_PORT":
+            reply = str(self.pub_port)
+        elif request == "t":
+            reply = repr(pupil_time())
+        elif request == "v":
+            reply = "fake"
+        elif request.startswith("notify."):
+            # Pupil Remote forwards notifications to the IPC backbone
+            self.streamer.send({**msgpack.loads(frames[1]), "topic": request})
+            reply = "Notification received"
+        else:
+            reply = "Unknown command."
+        self.remote.send_string(reply)
+
+    def _handle_notification(self, n):
+        self.stats["notifications"] += 1
+        subject = n["subject"]
+        if args.debug:
+            print("notification", subject, flush=True)
+        if subject == f"eye_process.should_start.{EYE_ID}":
+            self.eye_started = True
+            self.notify({"subject": "eye_process.started", "eye_id": EYE_ID})
+        elif subject == f"eye_process.should_stop.{EYE_ID}":
+            self.eye_started = False
+        elif subject == "start_eye_plugin" and n.get("name") == "Aravis_Source":
+            self.capturing = True
+            self.notify({
+                "subject": "aravis.start_capture.successful",
+                "target": n.get("target", f"eye{EYE_ID}"),
+                "name": "Aravis_Source",
+            })
+        elif subject == "capture.should_stop":
+            self.capturing = False
+        elif subject == "capture.should_start":
+            self.capturing = True
+        elif subject == "start_plugin" and n.get("name") == "Gazer2D":
+            self._calibration_due = time.monotonic() + args.calibration_delay
+        elif subject == "recording.should_start" and self.recording is None:
+            self.recording = n.get("session_name", "")
+            self.notify({
+                "subject": "recording.started",
+                "rec_path": self.recording,
+                "session_name": self.recording,
+                "start_time_synced": pupil_time(),
+            })
+        elif subject == "recording.should_stop" and self.recording is not None:
+            self.notify({"subject": "recording.stopped", "rec_path": self.recording})
+            self.recording = None
+        elif subject == "launcher_process.should_stop":
+            self.running = False
+
+    def _publish_sample(self, timestamp):
+        now = time.monotonic()
+        if now < self._dropout_end:
+            self.stats["dropped"] += 1
+            return
+        if args.dropout_rate and self._rng.random() < args.dropout_rate / args.rate:
+            self._dropout_end = now + args.dropout_duration / 1e3
+        pupil_pos, confidence, diameter, gaze_pos = self.source.next()
+        pupil = {
+            "topic": f"pupil.{EYE_ID}.2d",
+            "id": EYE_ID,
+            "method": "2d c++",
+            "timestamp": timestamp,
+            "norm_pos": pupil_pos,
+            "confidence": confidence,
+            "diameter": diameter,
+            "ellipse": {
+                "center": [pupil_pos[0] * 640, (1 - pupil_pos[1]) * 480],
+                "axes": [diameter, diameter * .9],
+                "angle": 0.,
+            },
+        }
+        self.streamer.send(pupil)
+        self.streamer.send({
+            "topic": f"gaze.2d.{EYE_ID}.",
+            "timestamp": timestamp,
+            "norm_pos": gaze_pos,
+            "confidence": confidence,
+            "base_data": [pupil],
+        })
+        self.stats["published"] += 1
+
+    def run(self):
+        poller = zmq.Poller()
+        poller.register(self.remote, zmq.POLLIN)
+        poller.register(self.notifications.socket, zmq.POLLIN)
+        period = 1. / args.rate
+        next_sample = time.monotonic()
+        # samples are published when their latency has elapsed
+        pending = []
+        while self.running:
+            timeout = max(0, (min([next_sample] + [p for p, _ in pending[:1]]) - time.monotonic()) * 1e3)
+            events = dict(poller.poll(timeout))
+            if self.remote in events:
+                self._handle_request()
+            while self.notifications.new_data:
+                _, n = self.notifications.recv()
+                self._handle_notification(n)
+
+            now = time.monotonic()
+            if self._calibration_due is not None and now >= self._calibration_due:
+                self._calibration_due = None
+                self.notify({
+                    "subject": "calibration.failed" if args.fail_calibration
+                    else "calibration.successful",
+                    "reason": "fake calibration failure" if args.fail_calibration else "",
+                    "timestamp": pupil_time(),
+                })
+            while next_sample <= now:
+                if self.eye_started and self.capturing:
+                    latency = max(0, self._rng.normal(args.latency, args.jitter)) / 1e3
+                    pending.append((next_sample + latency, next_sample))
+                next_sample += period
+            if pending:
+                pending.sort()
+                while pending and pending[0][0] <= now:
+                    self._publish_sample(pending.pop(0)[1])
+        print("fake pupil: stopping, %s" % self.stats, flush=True)
+
+
+if __name__ == "__main__":
+    time.sleep(args.startup_delay)
+    ctx = zmq.Context()
+    fake_pupil = FakePupil(ctx, args.port)
+    print(f"fake pupil: remote on port {args.port}, {args.rate:g}Hz", flush=True)
+    fake_pupil.run()
+    for socket in [fake_pupil.streamer.socket, fake_pupil.notifications.socket, fake_pupil.remote]:
+        socket.close(linger=0)
+    # ends the proxy thread, which closes the backbone sockets
+    ctx.term()